@@ -1,15 +1,9 @@
+from typing import TYPE_CHECKING
 import networkx as nx
-import re
-import pandas as pd
+from utils.node_labels import labels, relabel_graph, SNAKE, PASCAL, ASTERISK
 
-TOKEN_PATTERN = r"""
-        (?P<LPAREN>\() |
-        (?P<RPAREN>\)) |
-        (?P<NOT>NOT\b) |
-        (?P<AND>AND\b) |
-        (?P<OR>OR\b) |
-        (?P<COND>(?P<NODE>[A-Za-z0-9_]+)\s*(?P<OP>==|!=|<=|>=|<|>)\s*(?P<VAL>("[^"]*"|'[^']*'|[A-Za-z0-9_.]+)))
-    """
+if TYPE_CHECKING:
+    import pandas as pd
 
 def ensure_string_labels(G):
     """
@@ -46,52 +40,11 @@ def is_valid_condition(expr: str, valid_nodes: list[str]):
 
     Return (True, "") if valid, else (False, errorMessage).
     """
+    from algorithms.conditions import validate_condition
 
-    expr = expr.strip()
-    if not expr:
-        return (False, "Empty expression.")
-
-    tokens = []
-    for match in re.finditer(TOKEN_PATTERN, expr, re.VERBOSE):
-        kind = match.lastgroup
-        text = match.group(kind)
-        if kind == 'COND':
-            node_name = match.group("NODE")
-            op = match.group("OP")
-            val = match.group("VAL")
-
-            if node_name not in valid_nodes:
-                return (False, f"Unknown node '{node_name}' in condition.")
-
-            tokens.append(("COND", node_name, op, val))
-        else:
-            tokens.append((kind, text))
-
-    # consumed_len = sum(len(m.group(0)) for m in re.finditer(TOKEN_PATTERN, expr, re.VERBOSE))
-
-    check_expr = re.sub(TOKEN_PATTERN, '', expr, flags=re.VERBOSE)
-    if not re.fullmatch(r"\s*", check_expr):
-        return (False, f"Unrecognized portion in expression: {check_expr.strip()}")
-
-    if not tokens:
-        return (False, "No valid tokens found in expression.")
-
-    paren_stack = []
-    for t in tokens:
-        kind = t[0]
-        if kind == "LPAREN":
-            paren_stack.append("(")
-        elif kind == "RPAREN":
-            if not paren_stack:
-                return (False, "Unmatched closing parenthesis.")
-            paren_stack.pop()
+    return validate_condition(expr, valid_nodes)
 
-    if paren_stack:
-        return (False, "Unmatched opening parenthesis.")
-
-    return (True, "")
-
-def convert_df_columns_snake_to_pascal_inplace(df: pd.DataFrame):
+def convert_df_columns_snake_to_pascal_inplace(df: "pd.DataFrame"):
     """
     In-place conversion of all column names from snake_case to PascalCase.
     e.g. 'result_cache_hit' -> 'ResultCacheHit'.
@@ -106,27 +59,19 @@ def convert_df_columns_snake_to_pascal_inplace(df: pd.DataFrame):
     return df_copy
 
 def convert_nodes_pascal_to_snake_case_inplace(G: nx.Graph):
-    def is_snake_case(s: str) -> bool:
-
-        return bool(re.match(r'^[a-z0-9]+(?:_[a-z0-9]+)*$', s))
-
-    def pascal_to_snake(s: str) -> str:
-        # e.g., "QueryTemplate" -> "query_template"
-        return re.sub(r'(?<!^)(?=[A-Z])', '_', s).lower()
-
-    mapping = {}
-    for node in list(G.nodes()):
-        if isinstance(node, str) and not is_snake_case(node):
-            new_label = pascal_to_snake(node)
-            mapping[node] = new_label
-
-    if mapping:
-        nx.relabel_nodes(G, mapping, copy=False)
+    # Label table lookups; nodes already in snake_case are not touched
+    relabel_graph(G, SNAKE, copy=False)
 
 def convert_nodes_snake_to_pascal_case(old_graph: nx.Graph) -> nx.Graph:
-    def snake_to_pascal(name: str) -> str:
-        """Convert a snake_case string to PascalCase."""
-        return "".join(part.capitalize() for part in name.split("_"))
+    """
+    PascalCase copy of old_graph (each node keeps its previous name as 'old_name').
+    Names come from the label table; a graph that is already in PascalCase is
+    returned as is instead of being rebuilt, so the result may be old_graph
+    itself: copy it before modifying it (see utils.node_labels.relabel_graph).
+    """
+    mapping = labels.mapping(old_graph.nodes, PASCAL)
+    if not mapping:
+        return old_graph
 
     # Detect if the old graph is directed or not
     if old_graph.is_directed():
@@ -135,21 +80,14 @@ def convert_nodes_snake_to_pascal_case(old_graph: nx.Graph) -> nx.Graph:
         new_graph = nx.Graph()
 
     # Map old node -> new node
-    node_mapping = {}
-    for node in old_graph.nodes:
-        # If it has underscores, convert to PascalCase;
-        # otherwise, leave it unchanged
-        if "_" in str(node):
-            new_node = snake_to_pascal(str(node))
-        else:
-            new_node = str(node)
-        node_mapping[node] = new_node
+    node_mapping = {node: mapping.get(node, str(node)) for node in old_graph.nodes}
 
     # Add nodes to the new graph with updated names and copied attributes
     for old_node, new_node in node_mapping.items():
         new_graph.add_node(new_node, **old_graph.nodes[old_node])
         # Optionally store the old name, if needed
         new_graph.nodes[new_node]["old_name"] = old_node
+    new_graph.graph.update(old_graph.graph)
 
     # Add edges to the new graph, mapping old endpoints to new ones
     for u, v, data in old_graph.edges(data=True):
@@ -159,7 +97,7 @@ def convert_nodes_snake_to_pascal_case(old_graph: nx.Graph) -> nx.Graph:
 
     return new_graph
 
-def convert_underscores_to_asterisks_inplace(df: pd.DataFrame):
+def convert_underscores_to_asterisks_inplace(df: "pd.DataFrame"):
     """
     Replaces underscores ('_') with asterisks ('*') in both columns and index, in place.
     """
@@ -177,24 +115,13 @@ def convert_ast_underscore_nodes(old_graph: nx.Graph) -> nx.Graph:
         "ResultCacheHit,\nExecutionTime"
     following this procedure:
     1) Split the node name on underscore (_).
-    2) For each underscore-chunk, split on asterisk (*),
-       capitalize each sub-chunk, then join them together.
+    2) Look up the PascalCase form of each underscore-chunk in the label table.
     3) Join the underscore-chunks with ',\\n'.
     Returns the new graph (does not modify the old one in-place).
     """
     
     def convert_node_name(old_name: str) -> str:
-        # Split by underscore
-        underscore_parts = old_name.split('_')
-        new_parts = []
-        for part in underscore_parts:
-            # Split each underscore-part by asterisk
-            asterisk_subparts = part.split('*')
-            # Capitalize each asterisk subpart and concatenate
-            capitalized = "".join(sub.capitalize() for sub in asterisk_subparts)
-            new_parts.append(capitalized)
-        # Join the underscore-based chunks with ",\n"
-        return ",\n".join(new_parts)
+        return labels.cluster_label(old_name)
 
     # Preserve the graph type (directed / undirected)
     if old_graph.is_directed():
@@ -214,6 +141,9 @@ def convert_ast_underscore_nodes(old_graph: nx.Graph) -> nx.Graph:
         # If you want to keep track of the original name in an attribute:
         new_graph.nodes[new_node]['old_name'] = old_node
 
+    # Keep graph-level attributes such as the CaGreS merge log
+    new_graph.graph.update(old_graph.graph)
+
     # Add edges with updated node names, copying edge attributes
     for u, v, data in old_graph.edges(data=True):
         new_u = node_mapping[u]
@@ -228,17 +158,18 @@ def prepare_graph_format(G):
     Inputs:
       G (nx.DiGraph)   : The original causal DAG.
     Returns:
-      A DAG (NetworkX DiGraph) where each node has a '*' in its name instead of '_'.
+      A DAG (NetworkX DiGraph) where each node is in snake_case with '*' in place of '_'
+      (e.g. 'QueryTemplate' -> 'query*template'). G itself if no label changes.
     """
-    d = {x: x.replace("_", "*") for x in list(G.nodes)}
-    H = nx.relabel_nodes(G, d)
-    return H
+    return relabel_graph(G, ASTERISK)
 
 
 ############### Graph Algo Utilities ###############
 
 def semantic_sim(n1, n2, similarity_df, semantic_threshold):
     if similarity_df is not None:
+        if hasattr(similarity_df, "min_similarity"):
+            return similarity_df.min_similarity(n1, n2) >= semantic_threshold
         sim = max(similarity_df[n1][n2], similarity_df[n2][n1])
         if sim < semantic_threshold:
             return False
@@ -247,40 +178,37 @@ def semantic_sim(n1, n2, similarity_df, semantic_threshold):
 def a_valid_pair(node1, node2, similarity_df, summary_dag, semantic_threshold):
     if not check_semantic_for_cluster_nodes(node1, node2,similarity_df, semantic_threshold):
         return False
-    G = summary_dag.copy()
-    if summary_dag.has_edge(node1,node2):
-        G.remove_edge(node1, node2)
-
-    elif summary_dag.has_edge(node2,node1):
-        G.remove_edge(node2, node1)
+    return structurally_valid_pair(summary_dag, node1, node2)
 
-    if nx.has_path(G, node1, node2):
-        length =  nx.shortest_path_length(G, node1, node2)
-        if length >= 2:
-        # paths = nx.all_simple_paths(summary_dag, node1, node2)
-        # path_exists = any(len(path) >= 3 for path in paths)
-        # if path_exists:
-            return False
-    elif nx.has_path(G, node2, node1):
-        length = nx.shortest_path_length(G, node2, node1)
-        if length >= 2:
-            # #and nx.shortest_path_length(dag, node1, node2) >= 2:
-            # paths = nx.all_simple_paths(summary_dag, node2, node1)
-            # path_exists = any(len(path) >= 3 for path in paths)
-            # if path_exists:
-                return False
+def structurally_valid_pair(summary_dag, node1, node2):
+    """
+    A pair can be merged unless a path of length >= 2 joins them (in either
+    direction), i.e. a path that does not use a direct node1-node2 edge.
+    Searches from the other successors of each node, without copying the graph.
+    """
+    for source, target in ((node1, node2), (node2, node1)):
+        stack = [c for c in summary_dag.successors(source) if c != target]
+        seen = set(stack)
+        while stack:
+            n = stack.pop()
+            for c in summary_dag.successors(n):
+                if c == target:
+                    return False
+                if c not in seen:
+                    seen.add(c)
+                    stack.append(c)
     return True
 
 def check_semantic_for_cluster_nodes(node1, node2, similarity_df, semantic_threshold):
-    nodes1 = node1.split('_')
-    nodes2 = node2.split('_')
-    # print("check valid pair: ", nodes1,nodes2)
-    # print(similarity_df)
     if similarity_df is None:
         return True
+    if hasattr(similarity_df, "min_similarity"):
+        return similarity_df.min_similarity(node1, node2) >= semantic_threshold
+    nodes1 = node1.split('_')
+    nodes2 = node2.split('_')
     for n1 in nodes1:
         for n2 in nodes2:
             sim = max(similarity_df[n1][n2], similarity_df[n2][n1])
             if sim < semantic_threshold:
                 return False
-    return True
\ No newline at end of file
+    return True
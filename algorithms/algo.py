@@ -1,14 +1,15 @@
-from dowhy import CausalModel
-import causallearn.utils.GraphUtils as GU
-from causallearn.search.ConstraintBased import PC
 import math
 import networkx as nx
 import itertools
 import random
-import pandas as pd
+from typing import TYPE_CHECKING
 import Utils
-from utils import graph_utils
-import itertools
+from algorithms import discovery
+from algorithms.semantic_index import graph_key
+from utils.node_labels import labels, PASCAL
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def is_special_pair(graph, node1, node2):
     # Check if there is an edge between node1 and node2
@@ -27,7 +28,12 @@ def is_special_pair(graph, node1, node2):
 def low_cost_merges(dag, similarity_df, not_valid, semantic_threshold):
     nodes = dag.nodes()
     to_merge = []
-    node_pairs = sorted(list(itertools.combinations(sorted(nodes), 2)))
+    if hasattr(similarity_df, "pairs_above"):
+        # Only the pairs passing the threshold, a binary search in the semantic index
+        node_pairs = sorted(tuple(sorted(pair)) for pair in similarity_df.pairs_above(semantic_threshold)
+                            if pair[0] in nodes and pair[1] in nodes)
+    else:
+        node_pairs = sorted(list(itertools.combinations(sorted(nodes), 2)))
     for pair in node_pairs:
         n1 = pair[0]
         n2 = pair[1]
@@ -48,9 +54,7 @@ def low_cost_merges(dag, similarity_df, not_valid, semantic_threshold):
         node1 = pair[0]
         node2 = pair[1]
         if node1 in G.nodes and node2 in G.nodes:
-            G = nx.contracted_nodes(G, node1, node2, self_loops=False)
-            new_node_name = node1 + '_' + node2
-            G = nx.relabel_nodes(G, {node1: str(new_node_name), node2: str(new_node_name)})
+            G = merge_nodes(G, node1, node2)
 
     return G, not_valid
 
@@ -79,16 +83,18 @@ def zero_cost(G, n1, n2):
 
 
 
-def CaGreS(dag, k, similarity_df, semantic_threshold):
+def CaGreS(dag, k, similarity_df, semantic_threshold, progress=None):
     """
     Implements Algorithm 1 (CaGreS) from the paper
     Inputs:
       dag (nx.DiGraph) : The original causal DAG.
       k (int)          : Target number of summary nodes.
       similarity_df    : (Optional) A DataFrame or dict with semantic similarities.
+      progress         : (Optional) progress(fraction, message), called after every merge.
     
     Returns:
-      A summary DAG (NetworkX DiGraph) with k (or fewer) nodes.
+      A summary DAG (NetworkX DiGraph) with k (or fewer) nodes, or None if
+      no valid merge is left before k nodes are reached.
     """
     if len(dag.nodes) <= k:
         return dag
@@ -96,6 +102,7 @@ def CaGreS(dag, k, similarity_df, semantic_threshold):
     G, not_valid = low_cost_merges(dag, similarity_df, not_valid, semantic_threshold)
 
     cost_scores = {}
+    n_start = len(G.nodes)
     while len(G.nodes) > k:
         G, not_valid, cost_scores = fast_merge_pair(G, dag, similarity_df,
                                                      not_valid, cost_scores,
@@ -104,26 +111,35 @@ def CaGreS(dag, k, similarity_df, semantic_threshold):
         # Fallback, could not summarize the DAG with given constraints
         if not G:
             break
+        if progress is not None:
+            progress((n_start - len(G.nodes)) / max(n_start - k, 1), f"{len(G.nodes)} nodes left")
     return G
 
 def fast_merge_pair(G, dag, similarity_df, not_valid, cost_scores, semantic_threshold, verbos = False):
     node_pairs = sorted(list(itertools.combinations(sorted(G.nodes()), 2)))
     min_cost   = math.inf
     max_pair   = []
+    # A semantic index remembers threshold-independent results across runs
+    index = similarity_df if hasattr(similarity_df, "structurally_valid") else None
+    key = graph_key(G) if index is not None else None
 
     for pair in node_pairs:
         node1 = pair[0]
         node2 = pair[1]
         if pair in not_valid:
             continue
-        valid = Utils.a_valid_pair(node1,node2, similarity_df, G, semantic_threshold)
+        if index is not None:
+            valid = (Utils.check_semantic_for_cluster_nodes(node1, node2, index, semantic_threshold)
+                     and index.structurally_valid(G, key, node1, node2, Utils.structurally_valid_pair))
+        else:
+            valid = Utils.a_valid_pair(node1,node2, similarity_df, G, semantic_threshold)
         if valid == False:
             not_valid.add(pair)
         else:
             if pair in cost_scores:
                 cost = cost_scores[pair]
             else:
-                cost = get_cost(node1,node2,G)
+                cost = index.cost(G, key, node1, node2, get_cost) if index is not None else get_cost(node1,node2,G)
                 cost_scores[pair] = cost
             if verbos:
                 print(pair,cost)
@@ -150,11 +166,27 @@ def fast_merge_pair(G, dag, similarity_df, not_valid, cost_scores, semantic_thre
 
     cost_scores = update_cost_scores(cost_scores, node1, node2, G)
     #print("choose to merge: ", node1,node2)
+    G = merge_nodes(G, node1, node2)
+
+    return G, not_valid, cost_scores
+
+def merge_nodes(G, node1, node2):
+    """
+    Contract node2 into node1 and name the cluster 'node1_node2'.
+    The merge is appended to G.graph['merge_log'] (a tuple of (node1, node2)
+    pairs in merge order), which records the provenance of every cluster.
+    """
+    merge_log = G.graph.get("merge_log", ()) + ((node1, node2),)
     G = nx.contracted_nodes(G, node1, node2, self_loops=False)
+    # The merge log is the provenance: drop networkx's nested 'contraction' dicts,
+    # which would otherwise grow with every merge and be pickled along with the graph
+    G.nodes[node1].pop("contraction", None)
+    for _, _, data in itertools.chain(G.in_edges(node1, data=True), G.out_edges(node1, data=True)):
+        data.pop("contraction", None)
     new_node_name = node1 + '_' + node2
     G = nx.relabel_nodes(G, {node1: str(new_node_name), node2: str(new_node_name)})
-
-    return G, not_valid, cost_scores
+    G.graph["merge_log"] = merge_log
+    return G
 
 def update_cost_scores(cost_scores, node1, node2, G):
     nodes = [node1,node2]
@@ -211,110 +243,201 @@ def get_cost(node1, node2,G):
 
     return cost
 
-def estimate_binary_treatment_effect(df, treatment_column, logic_condition, outcome_column, graph:nx.DiGraph):
-    if not nx.has_path(graph, treatment_column, outcome_column):
-        return -1, -1
-    # 1) Load the DataFrame and convert columns to PascalCase if needed
-    df = Utils.convert_df_columns_snake_to_pascal_inplace(df)
-
-    # 2) Back up the original values from the treatment column
-    original_values = df[treatment_column].copy()
-
-    # 3) Overwrite the column in-place with 0 or 1, according to logic_condition
-    #    - Replace 'treatment_column' in the condition with the actual column name
-    #    - Translate "AND" -> "&", "OR" -> "|" for pandas.eval, etc.
-    parsed_condition = (
-        logic_condition
-        .replace("AND", "&")
-        .replace("OR", "|")
-    )
-
-    # Evaluate the condition, set matching rows to 1
-    matching_rows = df.eval(parsed_condition)
-    df[treatment_column] = 0
-    df.loc[matching_rows, treatment_column] = 1
+def identify_backdoor(graph: nx.DiGraph, treatment_column, outcome_column, columns):
+    """
+    DoWhy's identification of treatment -> outcome on 'graph', given only the
+    dataset's column (node) names: the backdoor adjustment set and the effect
+    modifiers its backdoor.linear_regression would use.
+    Returns:
+      (adjustment, effect_modifiers), two lists of node names.
+    """
+    import pandas as pd
+    from dowhy import CausalModel  # heavy, loaded on the first estimate
+    from utils.graph_utils import to_digraph_string
 
-    # 4) Build a DoWhy causal model using the altered treatment column
-    graph_str = graph_utils.to_digraph_string(graph)
+    # Identification is graph-only: the model sees the columns, not the rows
     model = CausalModel(
-        data=df,
+        data=pd.DataFrame(columns=list(columns)),
         treatment=treatment_column,
         outcome=outcome_column,
-        graph=graph_str
+        graph=to_digraph_string(graph)
     )
-
-    # 5) Identify the effect
     identified_estimand = model.identify_effect(proceed_when_unidentifiable=True)
+    adjustment = list(identified_estimand.get_adjustment_set() or [])
+    modifiers = [n for n in model.get_effect_modifiers() if n in set(columns)]
+    return adjustment, modifiers
 
-    # 6) Estimate effect with a simple backdoor method (e.g. linear regression)
-    causal_estimate_reg = model.estimate_effect(
-        identified_estimand,
-        method_name="backdoor.linear_regression",
-        test_significance=True,
-    )
+def estimate_binary_treatment_effect(df, treatment_column, logic_condition, outcome_column, graph:nx.DiGraph):
+    """
+    DoWhy's backdoor.linear_regression estimate of the binarized treatment's
+    effect on 'graph', without fitting it on the in-memory frame: DoWhy only
+    identifies the effect (identify_backdoor) and the regression is fitted out
+    of core from accumulated normal equations (see streaming_estimators), so
+    'df' may also be a .csv/.parquet path.
+    Returns:
+      (LinearEffect, p_value), or (-1, -1) without a directed path.
+    """
+    if not nx.has_path(graph, treatment_column, outcome_column):
+        return -1, -1
+    from algorithms.streaming_estimators import streaming_backdoor_ate
+    from utils.chunked_io import iter_chunks
+
+    # 1) Identify the effect on the graph and the dataset's (PascalCase) columns
+    columns = [labels.label(c, PASCAL) for c in next(iter_chunks(df, 1)).columns]
+    adjustment, modifiers = identify_backdoor(graph, treatment_column, outcome_column, columns)
+
+    # 2) Estimate it with the streamed linear regression
+    return streaming_backdoor_ate(df, treatment_column, logic_condition, outcome_column, adjustment,
+                                  effect_modifiers=modifiers)
 
-    # 7) Restore the original column values
-    df[treatment_column] = original_values
-    return causal_estimate_reg, causal_estimate_reg.test_stat_significance()['p_value']
+CLUSTER_SEPARATOR = ',\n'
+
+def cluster_membership(summary_dag):
+    """
+    Map every summary node to the exact tuple of original variables it stands for.
+    Cluster labels join their members with ',\\n'; plain nodes map to themselves.
+    """
+    return {n: tuple(n.split(CLUSTER_SEPARATOR)) for n in summary_dag.nodes}
 
-def get_grounded_dag(summary_dag):
-    nodes = list(nx.topological_sort(summary_dag))
-    return get_grounded_dag_auxiliary(summary_dag, nodes)
+def topological_ranks(order):
+    """Rank of every node in a topological order (e.g. of the original DAG)."""
+    return {n: i for i, n in enumerate(order)}
 
-def get_grounded_dag_auxiliary(summary_dag,nodes):
+def get_grounded_dag(summary_dag, ranks=None, membership=None):
     """
-    Logic copied from Utils Lib.
+    Expand a summary DAG back over the original variables:
+      - every summary edge A->B becomes all member(A) -> member(B) edges,
+      - the members of a cluster form a clique oriented by their topological rank.
+    'ranks' orders the members inside a cluster (see topological_ranks); members
+    without a rank keep the order they appear in the cluster label.
+    Runs in O(output edges) given the membership map and the ranks.
     """
-    G = summary_dag.copy()
+    if membership is None:
+        membership = cluster_membership(summary_dag)
+    return get_grounded_dag_auxiliary(summary_dag, membership, ranks or {})
+
+def _cluster_order(members, ranks):
+    """Members of a cluster in the order get_grounded_dag orients their clique."""
+    label_pos = {m: i for i, m in enumerate(members)}
+    return sorted(members, key=lambda m: (ranks.get(m, math.inf), label_pos[m]))
+
+def cluster_identification_graph(summary_dag, treatment, outcome, ranks=None, membership=None):
+    """
+    The graph identification runs on for treatment -> outcome over a summary DAG:
+    get_grounded_dag(summary_dag) with every cluster other than the treatment's
+    and the outcome's kept contracted. A contracted cluster's members share all
+    their parents and children, so a backdoor set made of whole clusters is valid
+    on the grounded DAG whenever it is valid here.
+    Returns:
+      (graph, members): contracted clusters get plain aliases (safe in DOT) and
+      'members' maps every node of the graph to the original variables it stands for.
+    """
+    ranks = ranks or {}
+    if membership is None:
+        membership = cluster_membership(summary_dag)
+    cluster_of = {m: c for c, members in membership.items() for m in members}
+    expanded = {cluster_of[treatment], cluster_of[outcome]}
+
+    # 1) Expanded clusters become their members, the others an alias each
+    names, members = {}, {}
+    taken = set(cluster_of)
+    for c in summary_dag.nodes:
+        if c in expanded or len(membership[c]) == 1:
+            names[c] = _cluster_order(membership[c], ranks)
+            members.update((m, (m,)) for m in names[c])
+        else:
+            alias = f"Cluster{len(members)}"
+            while alias in taken:
+                alias += "_"
+            taken.add(alias)
+            names[c] = [alias]
+            members[alias] = membership[c]
+
+    # 2) Cliques inside the expanded clusters, and every summary edge between the nodes standing for its ends
+    G = nx.DiGraph()
+    for c in summary_dag.nodes:
+        nodes = names[c]
+        G.add_nodes_from(nodes)
+        G.add_edges_from((nodes[i], nodes[j]) for i in range(len(nodes)) for j in range(i + 1, len(nodes)))
+    for u, v in summary_dag.edges:
+        G.add_edges_from((a, b) for a in names[u] for b in names[v])
+    return G, members
+
+def estimate_binary_treatment_effect_on_summary(df, treatment_column, logic_condition, outcome_column,
+                                                summary_dag: nx.DiGraph, ranks=None):
+    """
+    Same estimate as estimate_binary_treatment_effect on get_grounded_dag(summary_dag),
+    but identified at the cluster level: DoWhy identifies the effect on
+    cluster_identification_graph (only the treatment's and the outcome's clusters
+    are expanded) and the adjustment set and effect modifiers it finds are
+    mapped back to their member columns, so identification scales with the
+    summary, not with the grounded cliques. On an identity summary (every
+    cluster a single variable) this is exactly estimate_binary_treatment_effect.
+    The regression is fitted out of core from accumulated normal equations
+    (see streaming_estimators), 'df' may also be a .csv/.parquet path.
+    """
+    graph, members = cluster_identification_graph(summary_dag, treatment_column, outcome_column, ranks)
+    if not nx.has_path(graph, treatment_column, outcome_column):
+        return -1, -1
+    from algorithms.streaming_estimators import streaming_backdoor_ate
+    from utils.chunked_io import iter_chunks
+
+    # 1) Identify on the cluster-level graph; a cluster is observed if all its members are columns
+    columns = {labels.label(c, PASCAL) for c in next(iter_chunks(df, 1)).columns}
+    observed = [n for n, m in members.items() if set(m) <= columns]
+    adjustment, modifiers = identify_backdoor(graph, treatment_column, outcome_column, observed)
+
+    # 2) Estimate with the member columns of the chosen clusters
+    adjustment = [m for n in adjustment for m in members[n]]
+    modifiers = [m for n in modifiers for m in members[n]]
+    return streaming_backdoor_ate(df, treatment_column, logic_condition, outcome_column, adjustment,
+                                  effect_modifiers=modifiers)
+
+def get_grounded_dag_auxiliary(summary_dag, membership, ranks):
+    G = nx.DiGraph()
     for n in summary_dag.nodes:
-        if ',\n' in n:
-            new_nodes = n.split(',\n')
-            node_to_split = n
-
-            # Identify parents and children of the original node
-            parents = list(G.predecessors(node_to_split))
-            children = list(G.successors(node_to_split))
-
-            # Add edges between new nodes and parents/children
-            for parent in parents:
-                for new_node in new_nodes:
-                    G.add_edge(parent, new_node)
-
-            for child in children:
-                for new_node in new_nodes:
-                    G.add_edge(new_node, child)
-
-            for new_node in new_nodes:
-                for node_before in nodes:
-                    if node_before not in n:
-                        continue
-                    if node_before == new_node:
-                        break  # Stop connecting nodes once we reach the target node
-                    G.add_edge(node_before, new_node)
-            # Remove the original node
-            G.remove_node(node_to_split)
-    #show_dag(G,'grounded_dag')
+        members = membership[n]
+        if len(members) > 1:
+            members = _cluster_order(members, ranks)
+        G.add_nodes_from(members)
+        # Members earlier in the order point to the later ones
+        G.add_edges_from((members[i], members[j])
+                         for i in range(len(members)) for j in range(i + 1, len(members)))
+
+    for u, v in summary_dag.edges:
+        G.add_edges_from((a, b) for a in membership[u] for b in membership[v])
     return G
 
-def discover_causal_dag(df: pd.DataFrame, alpha: float = 0.05, verbose: bool = False):
-    """Run PC on a DataFrame, keep only the fully-directed edges (color='black'), and return a DAG."""
-    causal_graph = PC.pc(df.values, alpha=alpha, verbose=verbose)
-    causal_graph.to_nx_graph() 
-    
-    graph_int = causal_graph.nx_graph
-    edges_to_remove = [(u, v) for u, v, d in graph_int.edges(data=True) if d.get('color') != 'b']
-    graph_int.remove_edges_from(edges_to_remove)
+def discover_causal_dag(df: "pd.DataFrame", alpha: float = 0.05, verbose: bool = False, n_jobs=None, store=None,
+                        progress=None):
+    """
+    Run PC on a DataFrame, keep only the fully-directed edges (color='black'), and return a DAG.
+    The correlation matrix is computed once and the CI tests of each depth level run on a
+    worker pool (see algorithms.discovery); the result matches causallearn's PC.pc.
+    Pass a discovery.PValueStore built from the same df to reuse p-values across alphas.
+    """
+    if store is None:
+        store = discovery.PValueStore.from_dataframe(df)
+    causal_graph = discovery.pc_from_store(store, alpha=alpha, n_jobs=n_jobs, progress=progress)
+    if verbose:
+        print(causal_graph.G)
+    return discovery.directed_dag_from_causal_graph(causal_graph, df.columns)
 
-    for _, _, data in graph_int.edges(data=True):
-        data['color'] = 'black'
-        
-    mapping = {i: df.columns[i] for i in graph_int.nodes()}
-    return nx.relabel_nodes(graph_int, mapping)
+
+def discover_causal_dag_from_store(store, columns, alpha: float = 0.05, n_jobs=None, progress=None):
+    """
+    Same as discover_causal_dag, but for a PValueStore built from sufficient statistics
+    (e.g. discovery.StreamingCovariance) when the dataset does not fit in memory.
+    """
+    causal_graph = discovery.pc_from_store(store, alpha=alpha, n_jobs=n_jobs, progress=progress)
+    return discovery.directed_dag_from_causal_graph(causal_graph, columns)
 
 
 def debug_print(graph, matching_rows, treatment_column, outcome_column, parsed_condition):
+    from utils.graph_utils import to_digraph_string
+
     print("===============")
-    graph_str = graph_utils.to_digraph_string(graph)
+    graph_str = to_digraph_string(graph)
     print("matching rows : ")
     print(matching_rows)
     print("Graph: " + graph_str)
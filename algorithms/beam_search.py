@@ -0,0 +1,177 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import Utils
+from algorithms.algo import CaGreS, low_cost_merges, merge_nodes, get_cost, update_cost_scores
+from algorithms.semantic_index import graph_key
+from utils.graph_serialization import dumps_graph, loads_graph
+
+logger = logging.getLogger(__name__)
+
+# Interactive paths keep today's greedy CaGreS; batch jobs can afford wider beams.
+INTERACTIVE_BEAM_WIDTH = 1
+# Below this many nodes per beam, candidate scoring is cheaper than shipping graphs to a pool.
+MIN_NODES_FOR_POOL = 40
+
+# Per-worker copy of the similarity matrix, shipped once by the pool initializer.
+_worker_similarity = None
+_worker_threshold = None
+
+
+class _Beam:
+    """One partial summary: the graph, the summed get_cost of its merges and its pair caches."""
+    __slots__ = ("G", "cost", "not_valid", "cost_scores")
+
+    def __init__(self, G, cost, not_valid, cost_scores):
+        self.G = G
+        self.cost = cost
+        self.not_valid = not_valid
+        self.cost_scores = cost_scores
+
+
+def summary_cost(dag, summary) -> int:
+    """
+    Edges the summary adds over the original DAG once grounded: every summary
+    edge A->B stands for |A|*|B| edges and every cluster for a clique.
+    Both graphs are in the CaGreS form (cluster members joined by '_').
+    """
+    members = {n: len(n.split('_')) for n in summary.nodes}
+    edges = sum(members[u] * members[v] for u, v in summary.edges)
+    edges += sum(m * (m - 1) // 2 for m in members.values())
+    return edges - dag.number_of_edges()
+
+
+def score_merge_candidates(G, not_valid, cost_scores, similarity_df, semantic_threshold, limit):
+    """
+    Cost of every valid merge in G, cheapest first (ties in pair order), at most 'limit' of them.
+    With a semantic index (algorithms.semantic_index) the similarity, validity and
+    cost of each pair come from its caches, as in algo.fast_merge_pair, so beams
+    that reach the same graph state share the work.
+    Returns (candidates, newly invalid pairs, new cost_scores entries).
+    """
+    candidates, invalid, scored = [], set(), {}
+    index = similarity_df if hasattr(similarity_df, "structurally_valid") else None
+    key = graph_key(G) if index is not None else None
+    nodes = sorted(G.nodes())
+    for i, node1 in enumerate(nodes):
+        for node2 in nodes[i + 1:]:
+            pair = (node1, node2)
+            if pair in not_valid:
+                continue
+            if index is not None:
+                valid = (Utils.check_semantic_for_cluster_nodes(node1, node2, index, semantic_threshold)
+                         and index.structurally_valid(G, key, node1, node2, Utils.structurally_valid_pair))
+            else:
+                valid = Utils.a_valid_pair(node1, node2, similarity_df, G, semantic_threshold)
+            if not valid:
+                invalid.add(pair)
+                continue
+            cost = cost_scores.get(pair)
+            if cost is None:
+                cost = index.cost(G, key, node1, node2, get_cost) if index is not None else get_cost(node1, node2, G)
+                scored[pair] = cost
+            candidates.append((cost, pair))
+    candidates.sort()
+    return candidates[:limit], invalid, scored
+
+
+def _init_worker(similarity_df, semantic_threshold):
+    global _worker_similarity, _worker_threshold
+    _worker_similarity = similarity_df
+    _worker_threshold = semantic_threshold
+
+
+def _worker_score(args):
+    # Beam graphs are shipped in the npz form of utils.graph_serialization
+    data, not_valid, cost_scores, limit = args
+    return score_merge_candidates(loads_graph(data), not_valid, cost_scores, _worker_similarity, _worker_threshold,
+                                  limit)
+
+
+def _partition(G):
+    """Clusters of a summary irrespective of merge order, to drop duplicate beams."""
+    return frozenset(frozenset(n.split('_')) for n in G.nodes)
+
+
+def beam_search_CaGreS(dag, k, similarity_df, semantic_threshold, beam_width=INTERACTIVE_BEAM_WIDTH,
+                       n_jobs=None, progress=None):
+    """
+    CaGreS with a beam: instead of committing to the single cheapest merge,
+    keep the 'beam_width' cheapest partial summaries after every step.
+    Inputs:
+      dag (nx.DiGraph) : The original causal DAG, in the CaGreS node form.
+      k (int)          : Target number of summary nodes.
+      similarity_df    : (Optional) A DataFrame with semantic similarities.
+      beam_width (int) : Partial summaries kept per step; 1 runs the greedy CaGreS itself.
+      n_jobs (int)     : Processes scoring the beams' candidates (default: all cores).
+      progress         : (Optional) progress(fraction, message), called after every step.
+    Returns:
+      The cheapest summary DAG found with k nodes, with its summary_cost in
+      G.graph['summary_cost'], or None if no beam could reach k nodes - the
+      same contract as CaGreS, which returns None when no valid merge is left.
+    """
+    if beam_width <= 1:
+        return CaGreS(dag, k, similarity_df, semantic_threshold, progress=progress)
+    if len(dag.nodes) <= k:
+        return dag
+
+    # 1) The zero-cost merges are taken up front, exactly as in the greedy search
+    G, not_valid = low_cost_merges(dag, similarity_df, set(), semantic_threshold)
+    beams = [_Beam(G, 0, not_valid, {})]
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    pool = None
+    n_start = len(G.nodes)
+    try:
+        while len(beams[0].G.nodes) > k:
+            # 2) Score every beam's candidate merges, one beam per task
+            if pool is None and n_jobs > 1 and len(beams) > 1 and len(beams[0].G) >= MIN_NODES_FOR_POOL:
+                pool = ProcessPoolExecutor(max_workers=min(n_jobs, beam_width), initializer=_init_worker,
+                                           initargs=(similarity_df, semantic_threshold))
+            if pool is not None:
+                tasks = [(dumps_graph(b.G), b.not_valid, b.cost_scores, beam_width) for b in beams]
+                results = list(pool.map(_worker_score, tasks))
+            else:
+                results = [score_merge_candidates(b.G, b.not_valid, b.cost_scores, similarity_df, semantic_threshold,
+                                                  beam_width) for b in beams]
+
+            # 3) Keep the cheapest distinct children across all beams
+            expansions = []
+            for i, (b, (candidates, invalid, scored)) in enumerate(zip(beams, results)):
+                b.not_valid |= invalid
+                b.cost_scores.update(scored)
+                expansions.extend((b.cost + cost, i, pair) for cost, pair in candidates)
+            expansions.sort()
+
+            children, seen = [], set()
+            for cost, i, (node1, node2) in expansions:
+                parent = beams[i]
+                H = merge_nodes(parent.G, node1, node2)
+                key = _partition(H)
+                if key in seen:
+                    continue
+                seen.add(key)
+                children.append(_Beam(H, cost, set(parent.not_valid),
+                                      update_cost_scores(parent.cost_scores, node1, node2, parent.G)))
+                if len(children) == beam_width:
+                    break
+
+            # Fallback, no beam can be summarized further with the given constraints
+            if not children:
+                logger.warning(f"Beam search stopped at {len(beams[0].G)} nodes: no valid merge left.")
+                return None
+            beams = children
+            if progress is not None:
+                progress((n_start - len(beams[0].G.nodes)) / max(n_start - k, 1),
+                         f"{len(beams[0].G.nodes)} nodes left, best cost {beams[0].cost}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # 4) Beams are ranked by the summed CaGreS merge costs; the survivor is picked by the exact cost
+    best = min(beams, key=lambda b: (summary_cost(dag, b.G), b.cost))
+    best.G.graph["summary_cost"] = summary_cost(dag, best.G)
+    logger.debug(f"Beam search (B={beam_width}) summary cost {best.G.graph['summary_cost']}.")
+    return best.G
@@ -0,0 +1,286 @@
+import re
+import logging
+import operator
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One alternation per token kind; anything else is an error.
+_TOKEN = re.compile(r"""
+      (?P<skip>\s+)
+    | (?P<lparen>\()
+    | (?P<rparen>\))
+    | (?P<op>==|!=|<=|>=|<|>)
+    | (?P<string>"[^"]*"|'[^']*')
+    | (?P<number>[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?(?![A-Za-z_]))
+    | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+    | (?P<error>.)
+""", re.VERBOSE)
+
+_KEYWORDS = {"and", "or", "not"}
+_BOOLEANS = {"true": True, "false": False}
+
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_MASK_CACHE_SIZE = 64
+_mask_cache = OrderedDict()
+_fingerprints = {}
+_cache_lock = threading.Lock()
+
+
+class ConditionError(ValueError):
+    """Raised for malformed conditions, unknown columns and literal/column type mismatches."""
+
+
+def tokenize(expr: str):
+    tokens = []
+    for match in _TOKEN.finditer(expr):
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "skip":
+            continue
+        if kind == "error":
+            raise ConditionError(f"Unrecognized portion in expression: {expr[match.start():].strip()}")
+        if kind == "name" and text.lower() in _KEYWORDS:
+            tokens.append((text.lower(), text))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+def _literal(kind, text):
+    if kind == "string":
+        return text[1:-1]
+    if kind == "number":
+        return float(text) if any(c in text for c in ".eE") else int(text)
+    if text.lower() in _BOOLEANS:
+        return _BOOLEANS[text.lower()]
+    # A bare word is another column if the frame has one by that name, else a category label
+    return ("ref", text)
+
+
+@lru_cache(maxsize=256)
+def parse(expr: str):
+    """
+    Parse a treatment condition into a small AST of tuples:
+      ("cmp", column, op, literal, text) | ("not", a) | ("and", a, b) | ("or", a, b)
+    where 'text' is the literal as written, used against text columns (e.g. '047').
+    Grammar (keywords case-insensitive, NOT binds tighter than AND, AND than OR):
+      expr := term (OR term)* ; term := factor (AND factor)*
+      factor := NOT factor | '(' expr ')' | Column op literal
+    Literals are typed: quoted strings, ints, floats, True/False; a bare word is
+    kept as ("ref", word) and resolved against the frame's columns when evaluated.
+    """
+    tokens = tokenize(expr)
+    if not tokens:
+        raise ConditionError("Empty expression.")
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take(kind):
+        nonlocal pos
+        if peek() != kind:
+            found = tokens[pos][1] if pos < len(tokens) else "end of expression"
+            raise ConditionError(f"Expected {kind}, found '{found}'.")
+        pos += 1
+        return tokens[pos - 1][1]
+
+    def expression():
+        node = term()
+        while peek() == "or":
+            take("or")
+            node = ("or", node, term())
+        return node
+
+    def term():
+        node = factor()
+        while peek() == "and":
+            take("and")
+            node = ("and", node, factor())
+        return node
+
+    def factor():
+        nonlocal pos
+        kind = peek()
+        if kind == "not":
+            take("not")
+            return ("not", factor())
+        if kind == "lparen":
+            take("lparen")
+            node = expression()
+            if peek() != "rparen":
+                raise ConditionError("Unmatched opening parenthesis.")
+            take("rparen")
+            return node
+        if kind == "rparen":
+            raise ConditionError("Unmatched closing parenthesis.")
+        column = take("name")
+        op = take("op")
+        if peek() not in ("string", "number", "name"):
+            raise ConditionError(f"Missing value after '{column} {op}'.")
+        lit_kind, text = tokens[pos]
+        pos += 1
+        raw = text[1:-1] if lit_kind == "string" else text
+        return ("cmp", column, op, _literal(lit_kind, text), raw)
+
+    tree = expression()
+    if pos != len(tokens):
+        if peek() == "rparen":
+            raise ConditionError("Unmatched closing parenthesis.")
+        raise ConditionError(f"Unexpected '{tokens[pos][1]}'.")
+    return tree
+
+
+def referenced_columns(tree) -> set:
+    if tree[0] == "cmp":
+        return {tree[1]}
+    return set().union(*(referenced_columns(child) for child in tree[1:]))
+
+
+def validate_condition(expr: str, valid_nodes):
+    """(True, "") if 'expr' parses and only names columns in 'valid_nodes', else (False, message)."""
+    try:
+        unknown = sorted(referenced_columns(parse(expr.strip())) - set(valid_nodes))
+    except ConditionError as e:
+        return False, str(e)
+    if unknown:
+        return False, f"Unknown node '{unknown[0]}' in condition."
+    return True, ""
+
+
+def _compare(series, op, literal, column, raw=None):
+    """Vectorized comparison of one column against a typed literal, NaN compares False."""
+    dtype = series.dtype
+
+    # 1) Categoricals compare on integer codes, ordering only if the categories are ordered
+    if dtype.name == "category":
+        categories = dtype.categories
+        codes = series.cat.codes.to_numpy()
+        if categories.dtype.kind in "OSU" and not isinstance(literal, str):
+            literal = raw if raw is not None else str(literal)
+        if op in ("==", "!="):
+            if literal not in categories:
+                return (codes >= 0) if op == "!=" else np.zeros(len(codes), dtype=bool)
+            return _COMPARE[op](codes, categories.get_loc(literal)) & (codes >= 0)
+        if not dtype.ordered:
+            raise ConditionError(f"'{column}' is an unordered category; only == and != apply.")
+        if literal not in categories:
+            raise ConditionError(f"'{literal}' is not a category of '{column}'.")
+        return _COMPARE[op](codes, categories.get_loc(literal)) & (codes >= 0)
+
+    values = series.to_numpy()
+    # 2) Numeric and boolean columns need numeric literals
+    if dtype.kind in "biuf":
+        if isinstance(literal, str):
+            raise ConditionError(f"'{column}' is numeric, cannot compare it with '{literal}'.")
+        with np.errstate(invalid="ignore"):
+            return _COMPARE[op](values, literal)
+
+    # 3) Text / object columns: compare as strings
+    if dtype.kind in "OSU":
+        if not isinstance(literal, str):
+            literal = raw if raw is not None else str(literal)
+        mask = series.notna().to_numpy()
+        result = np.zeros(len(values), dtype=bool)
+        result[mask] = _COMPARE[op](values[mask].astype(str), literal)
+        return result
+
+    raise ConditionError(f"Unsupported column type {dtype} for '{column}'.")
+
+
+def compile_condition(tree, resolve=None):
+    """
+    Turn a parsed condition into predicate(df) -> boolean NumPy mask.
+    'resolve' maps condition column names to frame columns (default: identity).
+    """
+    resolve = resolve or (lambda name: name)
+
+    if tree[0] == "cmp":
+        _, column, op, literal, raw = tree
+        source = resolve(column)
+
+        def predicate(df):
+            if source not in df.columns:
+                raise ConditionError(f"Unknown node '{column}' in condition.")
+            if isinstance(literal, tuple):
+                other = resolve(literal[1])
+                if other in df.columns:
+                    with np.errstate(invalid="ignore"):
+                        return np.asarray(_COMPARE[op](df[source].to_numpy(), df[other].to_numpy()), dtype=bool)
+                return _compare(df[source], op, literal[1], column)
+            return _compare(df[source], op, literal, column, raw)
+        return predicate
+
+    if tree[0] == "not":
+        inner = compile_condition(tree[1], resolve)
+        return lambda df: ~inner(df)
+
+    left = compile_condition(tree[1], resolve)
+    right = compile_condition(tree[2], resolve)
+    combine = np.logical_and if tree[0] == "and" else np.logical_or
+    return lambda df: combine(left(df), right(df))
+
+
+@lru_cache(maxsize=256)
+def compiled_condition(expr: str, column_map: tuple = ()):
+    """
+    predicate(df) of a condition, parsed and compiled once per (expression, column map).
+    'column_map' is a tuple of (condition name, frame column) pairs; other names are used as is.
+    """
+    mapping = dict(column_map)
+    return compile_condition(parse(expr.strip()), lambda name: mapping.get(name, name))
+
+
+def _dataset_key(df) -> str:
+    """
+    Content fingerprint of df, remembered per frame object: datasets are not
+    modified in place (shared frames are read-only), so it is hashed once.
+    """
+    from algorithms.discovery import dataset_fingerprint
+
+    entry = _fingerprints.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    fingerprint = dataset_fingerprint(df)
+    key = id(df)
+    _fingerprints[key] = (weakref.ref(df), fingerprint)
+    weakref.finalize(df, _fingerprints.pop, key, None)
+    return fingerprint
+
+
+def condition_mask(df, expr: str, column_map: tuple = ()) -> np.ndarray:
+    """
+    Boolean row mask of 'expr' over df (see compiled_condition), cached per
+    (dataset, expression, column map), so every estimate on the same dataset
+    and condition reuses the same treatment binarization. The returned array is read-only.
+    """
+    tree = parse(expr.strip())
+    key = (_dataset_key(df), tree, column_map)
+    with _cache_lock:
+        mask = _mask_cache.get(key)
+        if mask is not None:
+            _mask_cache.move_to_end(key)
+            return mask
+
+    mask = np.asarray(compiled_condition(expr, column_map)(df), dtype=bool)
+    mask.flags.writeable = False
+    logger.debug(f"Compiled condition {expr!r}: {int(mask.sum())} of {len(mask)} rows match.")
+    with _cache_lock:
+        _mask_cache[key] = mask
+        if len(_mask_cache) > _MASK_CACHE_SIZE:
+            _mask_cache.popitem(last=False)
+    return mask
@@ -0,0 +1,277 @@
+import hashlib
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import networkx as nx
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from causallearn.graph.GraphClass import CausalGraph
+
+logger = logging.getLogger(__name__)
+
+# Below this many CI tests in a depth level, a worker pool costs more than it saves.
+MIN_TESTS_FOR_POOL = 2048
+TESTS_PER_TASK = 512
+
+# Per-worker copy of the correlation matrix, shipped once by the pool initializer.
+_worker_corr = None
+_worker_n_samples = None
+
+
+def correlation_matrix(data) -> np.ndarray:
+    """
+    Pearson correlation matrix of the columns of 'data', computed once and
+    shared by every Fisher-z test of a discovery run.
+    """
+    return np.corrcoef(np.asarray(data, dtype=float).T)
+
+
+def dataset_fingerprint(df: "pd.DataFrame") -> str:
+    """Content hash of a DataFrame (values and column names), used to key per-dataset caches."""
+    import pandas as pd
+    h = hashlib.sha1()
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class StreamingCovariance:
+    """
+    Running count, mean and centered cross-product matrix of a stream of row
+    chunks, merged with Chan et al.'s pairwise update so no chunk has to be
+    kept around. Memory is O(columns^2) whatever the number of rows.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros((p, p))
+        self._hash = hashlib.sha1("\x1f".join(map(str, self.columns)).encode("utf-8"))
+
+    def update(self, chunk: "pd.DataFrame"):
+        """Fold one chunk (complete rows only, same columns) into the statistics."""
+        import pandas as pd
+
+        values = np.asarray(chunk[self.columns].values, dtype=float)
+        n_b = values.shape[0]
+        if n_b == 0:
+            return
+        self._hash.update(pd.util.hash_pandas_object(chunk[self.columns], index=False).values.tobytes())
+        mean_b = values.mean(axis=0)
+        centered = values - mean_b
+        m2_b = centered.T @ centered
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.n = n
+
+    def covariance(self) -> np.ndarray:
+        return self.m2 / (self.n - 1)
+
+    def correlation(self) -> np.ndarray:
+        d = np.sqrt(np.diag(self.m2))
+        corr = self.m2 / np.outer(d, d)
+        np.clip(corr, -1, 1, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def fingerprint(self) -> str:
+        return self._hash.hexdigest()
+
+
+class PValueStore:
+    """
+    Alpha-independent state of PC on one dataset: the correlation matrix and
+    every Fisher-z p-value computed so far, keyed by ci_key(x, y, S).
+
+    Only the decisions taken from the p-values depend on alpha, so a later run
+    at a different alpha re-thresholds the stored values and computes just the
+    tests it has not seen yet.
+    """
+
+    def __init__(self, corr: np.ndarray, n_samples: int, fingerprint: str = None):
+        self.corr = corr
+        self.n_samples = n_samples
+        self.fingerprint = fingerprint
+        self.pvalues = {}
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame"):
+        return cls(correlation_matrix(df.values), df.shape[0], dataset_fingerprint(df))
+
+    @classmethod
+    def from_streaming_covariance(cls, stats: StreamingCovariance):
+        """Gaussian CI tests only need the sufficient statistics, not the rows."""
+        return cls(stats.correlation(), stats.n, stats.fingerprint())
+
+    def __len__(self):
+        return len(self.pvalues)
+
+
+def ci_key(x, y, S):
+    """
+    Canonical key of the test x _||_ y | S (x < y, S sorted), matching the
+    ordering causallearn's FisherZ uses so p-values are bit-for-bit comparable.
+    """
+    x, y = (int(x), int(y)) if x < y else (int(y), int(x))
+    return x, y, tuple(sorted(int(s) for s in S))
+
+
+def fisher_z_pvalues(corr: np.ndarray, n_samples: int, keys) -> np.ndarray:
+    """
+    Vectorized Fisher-z test for a batch of CI keys that share the same
+    conditioning-set size. Partial correlations come from inverting the small
+    (|S|+2)x(|S|+2) sub-matrices of 'corr' in one stacked call.
+    """
+    if not keys:
+        return np.empty(0)
+    idx = np.array([(x, y) + S for x, y, S in keys], dtype=np.intp)
+    depth = idx.shape[1] - 2
+    sub = corr[idx[:, :, None], idx[:, None, :]]
+    try:
+        inv = np.linalg.inv(sub)
+    except np.linalg.LinAlgError:
+        raise ValueError("Data correlation matrix is singular. Cannot run fisherz test. Please check your data.")
+
+    r = -inv[:, 0, 1] / np.sqrt(np.abs(inv[:, 0, 0] * inv[:, 1, 1]))
+    saturated = np.abs(r) >= 1
+    r[saturated] = (1. - np.finfo(float).eps) * np.sign(r[saturated])
+    Z = 0.5 * np.log((1 + r) / (1 - r))
+    X = np.sqrt(n_samples - depth - 3) * np.abs(Z)
+    from scipy.stats import norm
+    return 2 * (1 - norm.cdf(np.abs(X)))
+
+
+def _init_worker(corr, n_samples):
+    global _worker_corr, _worker_n_samples
+    _worker_corr = corr
+    _worker_n_samples = n_samples
+
+
+def _worker_pvalues(keys):
+    return fisher_z_pvalues(_worker_corr, _worker_n_samples, keys)
+
+
+def _run_level_tests(corr, n_samples, keys, pool):
+    """
+    Run one depth level of CI tests, splitting them across the pool when
+    there are enough of them to pay for the inter-process traffic.
+    """
+    if pool is None or len(keys) < MIN_TESTS_FOR_POOL:
+        return fisher_z_pvalues(corr, n_samples, keys)
+    chunks = [keys[i:i + TESTS_PER_TASK] for i in range(0, len(keys), TESTS_PER_TASK)]
+    return np.concatenate(list(pool.map(_worker_pvalues, chunks)))
+
+
+def skeleton_discovery(store: PValueStore, alpha: float, node_names=None, n_jobs=None, progress=None):
+    """
+    Stable-PC skeleton search on a precomputed correlation matrix.
+
+    Stable PC only removes edges once a depth level is finished, so every test
+    of a level is known up front: we collect them, evaluate them in parallel,
+    and then replay causallearn's sequential bookkeeping on the p-values. Tests
+    already in 'store' (from a run at another alpha) are not recomputed. The
+    returned CausalGraph (edges and sepsets) is the one
+    causallearn.utils.PCUtils.SkeletonDiscovery would build with stable=True.
+    'progress(fraction, message)' is called after every depth level; raising
+    from it aborts the search (the worker pool is shut down on the way out).
+    """
+    corr, n_samples, pvalues = store.corr, store.n_samples, store.pvalues
+    no_of_var = corr.shape[0]
+    from causallearn.graph.GraphClass import CausalGraph
+    from causallearn.utils.PCUtils.Helper import append_value
+
+    cg = CausalGraph(no_of_var, node_names)
+    adj = np.ones((no_of_var, no_of_var), dtype=bool)
+    np.fill_diagonal(adj, False)
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    pool = None
+    depth = -1
+    try:
+        while adj.sum(axis=1).max() - 1 > depth:
+            depth += 1
+            neighbors = [np.flatnonzero(adj[x]) for x in range(no_of_var)]
+
+            # 1) Collect every test of this level from the level-start adjacencies
+            pending = {}
+            for x in range(no_of_var):
+                for y in neighbors[x]:
+                    rest = neighbors[x][neighbors[x] != y]
+                    for S in itertools.combinations(rest, depth):
+                        key = ci_key(x, y, S)
+                        if key not in pvalues:
+                            pending[key] = None
+            keys = list(pending)
+            if pool is None and n_jobs > 1 and len(keys) >= MIN_TESTS_FOR_POOL:
+                pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                           initargs=(corr, n_samples))
+            pvalues.update(zip(keys, _run_level_tests(corr, n_samples, keys, pool)))
+            logger.debug(f"PC depth {depth}: {len(keys)} new CI tests, {len(pvalues)} stored")
+
+            # 2) Replay the sequential decisions exactly as causallearn takes them
+            edge_removal = set()
+            for x in range(no_of_var):
+                for y in neighbors[x]:
+                    sepsets = set()
+                    rest = neighbors[x][neighbors[x] != y]
+                    for S in itertools.combinations(rest, depth):
+                        if pvalues[ci_key(x, y, S)] > alpha:
+                            edge_removal.add((x, y))
+                            edge_removal.add((y, x))
+                            sepsets.update(S)
+                    if (x, y) in edge_removal:
+                        append_value(cg.sepset, x, y, tuple(sepsets))
+                        append_value(cg.sepset, y, x, tuple(sepsets))
+
+            for (x, y) in edge_removal:
+                adj[x, y] = False
+            if progress is not None:
+                progress(None, f"PC depth {depth}: {len(pvalues)} CI tests, {int(adj.sum()) // 2} edges left")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for x, y in zip(*np.nonzero(np.triu(~adj, k=1))):
+        edge = cg.G.get_edge(cg.G.nodes[x], cg.G.nodes[y])
+        if edge is not None:
+            cg.G.remove_edge(edge)
+    return cg
+
+
+def pc_from_store(store: PValueStore, alpha: float = 0.05, node_names=None, n_jobs=None, progress=None):
+    """
+    Full PC run (stable skeleton, uc_sepset with priority 2, Meek rules) driven
+    by the p-value store instead of the raw data - the same configuration
+    causallearn's PC.pc uses by default.
+    """
+    assert 0 < alpha < 1
+    cg = skeleton_discovery(store, alpha, node_names=node_names, n_jobs=n_jobs, progress=progress)
+    from causallearn.utils.PCUtils import Meek, UCSepset
+
+    cg = UCSepset.uc_sepset(cg, 2)
+    return Meek.meek(cg)
+
+
+def directed_dag_from_causal_graph(cg: "CausalGraph", columns) -> nx.DiGraph:
+    """Keep only the fully-directed edges (color='black') of a PC result and relabel them by column."""
+    cg.to_nx_graph()
+    graph_int = cg.nx_graph
+    edges_to_remove = [(u, v) for u, v, d in graph_int.edges(data=True) if d.get('color') != 'b']
+    graph_int.remove_edges_from(edges_to_remove)
+
+    for _, _, data in graph_int.edges(data=True):
+        data['color'] = 'black'
+
+    mapping = {i: columns[i] for i in graph_int.nodes()}
+    return nx.relabel_nodes(graph_int, mapping)
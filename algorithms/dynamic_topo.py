@@ -0,0 +1,121 @@
+import logging
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+
+class DynamicTopologicalOrder:
+    """
+    A topological order of a DAG kept valid under edge edits (Pearce & Kelly, 2006).
+
+    Inserting u->v when u already precedes v costs O(1). Otherwise only the
+    'affected region' - nodes ranked between v and u that are reachable from v or
+    reach u - is searched and its ranks are permuted among themselves; a path
+    v ~> u found on the way means the edge would close a cycle. Removing an edge
+    never invalidates the order.
+
+    The order is keyed by node name and does not hold on to the graph, so it can
+    outlive the per-rerun copies of the original DAG. Instead it carries the 'key'
+    of the graph version it describes (e.g. the edit history's fingerprint, see
+    core.edit_history), which its owner moves along with the edits applied
+    through it; matches(G, key) tells whether it still describes G, and callers
+    rebuild when it does not. Edits made around the order must change the key.
+    """
+
+    def __init__(self, order, n_edges: int, key=None):
+        self._nodes = list(order)
+        self._ord = {n: i for i, n in enumerate(self._nodes)}
+        self._n_edges = n_edges
+        self.key = key
+
+    @classmethod
+    def from_graph(cls, G: nx.DiGraph, key=None):
+        """O(V + E). Raises networkx.NetworkXUnfeasible if G has a cycle."""
+        return cls(nx.topological_sort(G), G.number_of_edges(), key)
+
+    def __contains__(self, node):
+        return node in self._ord
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def matches(self, G: nx.DiGraph, key) -> bool:
+        """Whether the order describes G, the graph version 'key' (node set and edge count double-check it)."""
+        return key == self.key and G.number_of_edges() == self._n_edges and G.succ.keys() == self._ord.keys()
+
+    def order(self) -> list:
+        return list(self._nodes)
+
+    def ranks(self) -> dict:
+        """node -> position, the format algo.topological_ranks produces."""
+        return dict(self._ord)
+
+    def add_node(self, G: nx.DiGraph, node) -> None:
+        if node not in self._ord:
+            G.add_node(node)
+            self._ord[node] = len(self._nodes)
+            self._nodes.append(node)
+
+    def add_edge(self, G: nx.DiGraph, u, v) -> bool:
+        """
+        Add u->v to G unless it would create a cycle. Returns False (and leaves G
+        and the order untouched) for a cycle or a self-loop.
+        """
+        if u == v:
+            return False
+        if G.has_edge(u, v):
+            return True
+
+        lower, upper = self._ord[v], self._ord[u]
+        if lower < upper:
+            # 1) Forward search from v, bounded by u's rank
+            forward = self._forward(G, v, upper)
+            if forward is None:
+                return False
+            # 2) Backward search from u, bounded by v's rank
+            backward = self._backward(G, u, lower)
+            # 3) Reassign the region's ranks: everything reaching u before everything reached from v
+            self._reorder(backward, forward)
+
+        G.add_edge(u, v)
+        self._n_edges += 1
+        return True
+
+    def remove_edge(self, G: nx.DiGraph, u, v) -> None:
+        G.remove_edge(u, v)
+        self._n_edges -= 1
+
+    def _forward(self, G, start, upper):
+        ord_ = self._ord
+        seen = {start}
+        stack = [start]
+        while stack:
+            n = stack.pop()
+            for w in G.successors(n):
+                rank = ord_[w]
+                if rank == upper:
+                    return None
+                if rank < upper and w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        return seen
+
+    def _backward(self, G, start, lower):
+        ord_ = self._ord
+        seen = {start}
+        stack = [start]
+        while stack:
+            n = stack.pop()
+            for w in G.predecessors(n):
+                if ord_[w] > lower and w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        return seen
+
+    def _reorder(self, backward, forward):
+        ord_ = self._ord
+        region = sorted(backward, key=ord_.__getitem__) + sorted(forward, key=ord_.__getitem__)
+        slots = sorted(ord_[n] for n in region)
+        for n, slot in zip(region, slots):
+            ord_[n] = slot
+            self._nodes[slot] = n
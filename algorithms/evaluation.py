@@ -0,0 +1,227 @@
+import logging
+from collections import defaultdict
+
+import numpy as np
+import networkx as nx
+
+from utils.node_labels import relabel_graph, PASCAL
+
+logger = logging.getLogger(__name__)
+
+# Above these sizes the statistics are estimated on a random sample.
+MAX_PAIRS = 2_000_000
+MAX_MARKOV_NODES = 2_000
+# Bitset rows are combined this many at a time to bound temporary memory.
+PAIR_CHUNK = 65_536
+
+
+class DagIndex:
+    """
+    Reachability index of a DAG for batch structural queries. Every node's
+    ancestors (itself included) are one row of a uint64 bitset matrix, built
+    once in topological order; ancestor, common-ancestor and ancestral-set
+    queries are then word-wise AND/OR over rows. 'nodes' fixes the bit order,
+    so two graphs over the same variables can be compared bit for bit.
+    """
+
+    def __init__(self, G: nx.DiGraph, nodes=None):
+        self.nodes = list(nodes) if nodes is not None else list(G.nodes)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        n = len(self.nodes)
+        self.parents = [np.array([self.index[p] for p in G.predecessors(v)], dtype=np.int64) for v in self.nodes]
+        self.children = [np.array([self.index[c] for c in G.successors(v)], dtype=np.int64) for v in self.nodes]
+
+        # 1) Reflexive ancestor bitsets: a node's row is its own bit OR its parents' rows
+        self.words = (n + 63) // 64
+        self.closure = np.zeros((n, self.words), dtype=np.uint64)
+        for v in nx.topological_sort(G):
+            i = self.index[v]
+            if len(self.parents[i]):
+                self.closure[i] = np.bitwise_or.reduce(self.closure[self.parents[i]], axis=0)
+            self.closure[i, i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def ids(self, nodes) -> np.ndarray:
+        return np.fromiter((self.index[n] for n in nodes), dtype=np.int64)
+
+    def unpack(self, rows) -> np.ndarray:
+        """Bitset rows -> boolean matrix over the nodes."""
+        bits = np.unpackbits(np.ascontiguousarray(rows).view(np.uint8), axis=-1, bitorder="little")
+        return bits[..., :len(self.nodes)].astype(bool)
+
+    def _bit(self, rows, cols) -> np.ndarray:
+        words = self.closure[rows, cols >> 6]
+        return ((words >> (cols & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def is_ancestor(self, us, vs) -> np.ndarray:
+        """For every pair, is us[i] a proper ancestor of vs[i]?"""
+        u, v = np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)
+        return self._bit(v, u) & (u != v)
+
+    def ancestor_matrix(self) -> np.ndarray:
+        """A[u, v] is True when u is a proper ancestor of v."""
+        A = self.unpack(self.closure).T.copy()
+        np.fill_diagonal(A, False)
+        return A
+
+    def share_ancestor(self, xs, ys) -> np.ndarray:
+        """
+        For every pair, do xs[i] and ys[i] have a common (reflexive) ancestor?
+        Without conditioning this is exactly d-connection: x and y are
+        d-separated by the empty set iff they share no ancestor.
+        """
+        x, y = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        out = np.empty(len(x), dtype=bool)
+        for start in range(0, len(x), PAIR_CHUNK):
+            sl = slice(start, start + PAIR_CHUNK)
+            out[sl] = (self.closure[x[sl]] & self.closure[y[sl]]).any(axis=1)
+        return out
+
+    def ancestral_set(self, ids) -> np.ndarray:
+        """Boolean mask of the given nodes and all their ancestors."""
+        if len(ids) == 0:
+            return np.zeros(len(self.nodes), dtype=bool)
+        return self.unpack(np.bitwise_or.reduce(self.closure[np.asarray(ids)], axis=0))
+
+    def d_connected_from(self, x: int, Z) -> np.ndarray:
+        """
+        Boolean mask of the nodes d-connected to x given the set Z (Bayes ball,
+        Koller & Friedman Alg. 3.1): one linear pass answers every y for this (x, Z).
+        """
+        n = len(self.nodes)
+        in_z = np.zeros(n, dtype=bool)
+        in_z[list(Z)] = True
+        anc_z = self.ancestral_set(list(Z))
+        reached = np.zeros(n, dtype=bool)
+        seen_up = np.zeros(n, dtype=bool)      # arrived from a child
+        seen_down = np.zeros(n, dtype=bool)    # arrived from a parent
+
+        stack = [(x, True)]
+        while stack:
+            v, up = stack.pop()
+            seen = seen_up if up else seen_down
+            if seen[v]:
+                continue
+            seen[v] = True
+            if not in_z[v]:
+                reached[v] = True
+            if up and not in_z[v]:
+                stack.extend((p, True) for p in self.parents[v])
+                stack.extend((c, False) for c in self.children[v])
+            elif not up:
+                if not in_z[v]:
+                    stack.extend((c, False) for c in self.children[v])
+                if anc_z[v]:
+                    stack.extend((p, True) for p in self.parents[v])
+        return reached
+
+    def d_separated(self, queries) -> np.ndarray:
+        """
+        Batch of (x, y, Z) queries over node names -> boolean array, True when x
+        and y are d-separated by Z. Queries are grouped by (x, Z); the
+        unconditional ones are answered together from the ancestor bitsets.
+        """
+        queries = list(queries)
+        out = np.empty(len(queries), dtype=bool)
+        marginal, groups = [], defaultdict(list)
+        for q, (x, y, Z) in enumerate(queries):
+            if Z:
+                groups[(self.index[x], frozenset(self.index[z] for z in Z))].append((q, self.index[y]))
+            else:
+                marginal.append((q, self.index[x], self.index[y]))
+
+        if marginal:
+            q, x, y = map(np.array, zip(*marginal))
+            out[q] = ~self.share_ancestor(x, y)
+        for (x, Z), members in groups.items():
+            reached = self.d_connected_from(x, Z)
+            q, y = map(np.array, zip(*members))
+            out[q] = ~reached[y]
+        return out
+
+
+def _sample_pairs(n, max_pairs, rng):
+    """All unordered pairs of n nodes, or 'max_pairs' random ones."""
+    if n * (n - 1) // 2 <= max_pairs:
+        x, y = np.triu_indices(n, k=1)
+        return x, y
+    x = rng.integers(0, n, size=max_pairs)
+    y = rng.integers(0, n - 1, size=max_pairs)
+    y += y >= x
+    return x, y
+
+
+def _ratio(kept, total):
+    return float(kept) / total if total else 1.0
+
+
+def preservation_stats(original_dag, summary_dag, ranks=None, max_pairs=MAX_PAIRS,
+                       max_markov_nodes=MAX_MARKOV_NODES, seed=0) -> dict:
+    """
+    How much of the original DAG's causal structure the summary keeps, measured
+    on get_grounded_dag(summary) over the original variables.
+    Inputs:
+      original_dag, summary_dag : The two DAGs (any node label form, matched through PascalCase).
+      ranks                     : (Optional) topological ranks of the PascalCase original
+                                  nodes, computed from the original DAG if not given.
+      max_pairs / max_markov_nodes : Sample sizes above which the statistics are estimated.
+    Returns:
+      A dict with edge counts, ancestor relations (kept / spurious), marginal
+      independencies and local Markov statements of the original that still hold.
+    """
+    from algorithms.algo import get_grounded_dag, topological_ranks
+
+    rng = np.random.default_rng(seed)
+    G = relabel_graph(original_dag, PASCAL)
+    if ranks is None:
+        ranks = topological_ranks(nx.topological_sort(G))
+    H = relabel_graph(get_grounded_dag(relabel_graph(summary_dag, PASCAL), ranks=ranks), PASCAL)
+    if set(G.nodes) != set(H.nodes):
+        raise ValueError("The summary does not cover exactly the original variables.")
+
+    # 1) One index per graph, with the same bit order
+    g = DagIndex(G)
+    h = DagIndex(H, nodes=g.nodes)
+    n = len(g)
+    stats = {"nodes": n, "original_edges": G.number_of_edges(), "grounded_edges": H.number_of_edges()}
+
+    # 2) Ancestor relations and marginal independencies over (sampled) node pairs
+    x, y = _sample_pairs(n, max_pairs, rng)
+    stats["pairs_checked"] = len(x)
+    anc_g = g.is_ancestor(x, y) | g.is_ancestor(y, x)
+    anc_h = h.is_ancestor(x, y) | h.is_ancestor(y, x)
+    stats["ancestor_pairs"] = int(anc_g.sum())
+    stats["ancestor_pairs_kept"] = int((anc_g & anc_h).sum())
+    stats["ancestor_pairs_spurious"] = int((anc_h & ~anc_g).sum())
+    indep_g = ~g.share_ancestor(x, y)
+    indep_h = ~h.share_ancestor(x, y)
+    stats["marginal_independencies"] = int(indep_g.sum())
+    stats["marginal_independencies_kept"] = int((indep_g & indep_h).sum())
+
+    # 3) Local Markov statements of the original: x _||_ non-descendants | parents(x)
+    markov_nodes = np.arange(n)
+    if n > max_markov_nodes:
+        markov_nodes = rng.choice(n, size=max_markov_nodes, replace=False)
+    everyone = np.arange(n)
+    total = kept = 0
+    for i in markov_nodes:
+        others = ~g._bit(everyone, np.full(n, i))   # not a descendant of i (nor i itself)
+        others[g.parents[i]] = False
+        ys = np.flatnonzero(others)
+        if len(ys) == 0:
+            continue
+        reached = h.d_connected_from(i, g.parents[i].tolist())
+        total += len(ys)
+        kept += int((~reached[ys]).sum())
+    stats["markov_nodes_checked"] = len(markov_nodes)
+    stats["markov_statements"] = total
+    stats["markov_statements_kept"] = kept
+
+    stats["ancestor_recall"] = _ratio(stats["ancestor_pairs_kept"], stats["ancestor_pairs"])
+    stats["independence_recall"] = _ratio(stats["marginal_independencies_kept"], stats["marginal_independencies"])
+    stats["markov_recall"] = _ratio(kept, total)
+    logger.info(f"Summary preservation: ancestors {stats['ancestor_recall']:.3f}, "
+                f"independencies {stats['independence_recall']:.3f}, local Markov {stats['markov_recall']:.3f}.")
+    return stats
@@ -1,7 +1,21 @@
 import networkx as nx
 import streamlit as st
+from algorithms.dynamic_topo import DynamicTopologicalOrder
 
-def try_add_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
+def get_topological_order(G: nx.DiGraph, key) -> DynamicTopologicalOrder:
+    """
+    The session's maintained topological order of the original DAG, where 'key'
+    identifies G's version (core.edit_history.EditHistory.key). It is rebuilt
+    (O(V + E)) only when it describes another version, e.g. after an undo or
+    after a new DAG was loaded.
+    """
+    topo = st.session_state.get("topo_order")
+    if topo is None or not topo.matches(G, key):
+        topo = DynamicTopologicalOrder.from_graph(G, key)
+        st.session_state.topo_order = topo
+    return topo
+
+def try_add_edge(G: nx.DiGraph, n1: str, n2: str, topo: DynamicTopologicalOrder = None) -> bool:
     """
     Attempt to add an edge (n1->n2) to the DAG G.
     Returns True if the operation is successful, False if any error occurs.
@@ -10,6 +24,8 @@ def try_add_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
       - Self-loop (n1 == n2)
       - Whether the edge already exists
       - Whether adding this edge creates a cycle (thus invalid for a DAG)
+    With 'topo', the order get_topological_order returned for G, the cycle
+    check only searches the affected region instead of the whole graph.
     """
     # 1) Self-loop check
     if n1 == n2:
@@ -30,6 +46,13 @@ def try_add_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
         return False
 
     # 3) Attempt to add
+    if topo is not None:
+        if not topo.add_edge(G, n1, n2):
+            st.error(f"Adding edge ({n1}->{n2}) creates a cycle! Denied.")
+            return False
+        st.success(f"Edge ({n1}->{n2}) added.")
+        return True
+
     G.add_edge(n1, n2)
 
     # 4) Check if we’re still a DAG
@@ -43,7 +66,7 @@ def try_add_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
     st.success(f"Edge ({n1}->{n2}) added.")
     return True
 
-def try_remove_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
+def try_remove_edge(G: nx.DiGraph, n1: str, n2: str, topo: DynamicTopologicalOrder = None) -> bool:
     """
     Attempt to remove an edge (n1->n2) from the DAG G.
     Returns True if removal is successful, False otherwise.
@@ -51,9 +74,101 @@ def try_remove_edge(G: nx.DiGraph, n1: str, n2: str) -> bool:
     Checks whether the edge actually exists first.
     """
     if G.has_edge(n1, n2):
-        G.remove_edge(n1, n2)
+        if topo is not None:
+            topo.remove_edge(G, n1, n2)
+        else:
+            G.remove_edge(n1, n2)
         st.success(f"Edge ({n1}->{n2}) removed.")
         return True
     else:
         st.error(f"Edge ({n1}->{n2}) does not exist. Try again.")
         return False
+
+def parse_edge_batch(text: str):
+    """
+    Parse a pasted or uploaded edge list, one edge per line:
+        Source -> Target            add (also 'Source,Target')
+        -Source -> Target           remove (also 'remove,Source,Target')
+        action,source,target        CSV rows; action is 'add' or 'remove'
+    Blank lines, '#' comments and a 'source,target[,action]' header are skipped.
+    Returns (additions, removals, errors), each edge a (source, target) tuple.
+    """
+    additions, removals, errors = [], [], []
+    for line_no, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        remove = line.startswith("-") and not line.startswith("->")
+        if remove:
+            line = line[1:].strip()
+        if "->" in line:
+            parts = [p.strip() for p in line.split("->")]
+        else:
+            parts = [p.strip() for p in line.split(",")]
+
+        # CSV rows may carry the action in the first or last column
+        if len(parts) == 3 and parts[0].lower() in ("add", "remove"):
+            remove = remove or parts[0].lower() == "remove"
+            parts = parts[1:]
+        elif len(parts) == 3 and parts[2].lower() in ("add", "remove"):
+            remove = remove or parts[2].lower() == "remove"
+            parts = parts[:2]
+
+        if line_no == 1 and [p.lower() for p in parts] in (["source", "target"], ["action", "source", "target"],
+                                                           ["source", "target", "action"]):
+            continue
+        if len(parts) != 2 or not all(parts):
+            errors.append(f"Line {line_no}: cannot read an edge from '{raw.strip()}'.")
+            continue
+        (removals if remove else additions).append(tuple(parts))
+    return additions, removals, errors
+
+def apply_edge_batch(G: nx.DiGraph, additions, removals=()):
+    """
+    Apply many edge edits to the DAG G as one transaction.
+    All edits are checked first; G is modified only if every edit is valid and
+    the resulting graph is acyclic, which is decided by a single strongly
+    connected components pass over the edited graph.
+    Returns (applied, errors, cycle_edges):
+      applied     : True if G was modified
+      errors      : messages for unknown nodes, self-loops, missing or conflicting edges
+      cycle_edges : the added edges that would lie on a cycle
+    """
+    additions = list(dict.fromkeys(additions))
+    removals = list(dict.fromkeys(removals))
+    errors = []
+
+    # 1) Per-edge checks
+    for u, v in additions + removals:
+        for n in (u, v):
+            if not G.has_node(n):
+                errors.append(f"Node {n} does not exist.")
+    for u, v in additions:
+        if u == v:
+            errors.append(f"Cannot add a self-loop edge ({u}->{v}).")
+    for u, v in removals:
+        if G.has_node(u) and G.has_node(v) and not G.has_edge(u, v):
+            errors.append(f"Edge ({u}->{v}) does not exist.")
+    for edge in set(additions) & set(removals):
+        errors.append(f"Edge ({edge[0]}->{edge[1]}) is both added and removed.")
+    if errors:
+        return False, list(dict.fromkeys(errors)), []
+
+    # 2) One acyclicity pass over the edited graph
+    new_edges = [(u, v) for u, v in additions if not G.has_edge(u, v)]
+    H = G.copy()
+    H.remove_edges_from(removals)
+    H.add_edges_from(new_edges)
+    component = {}
+    for i, scc in enumerate(nx.strongly_connected_components(H)):
+        if len(scc) > 1:
+            component.update(dict.fromkeys(scc, i))
+    if component:
+        cycle_edges = [(u, v) for u, v in new_edges if u in component and component.get(v) == component[u]]
+        return False, [], cycle_edges
+
+    # 3) Commit
+    G.remove_edges_from(removals)
+    G.add_edges_from(new_edges)
+    return True, [], []
@@ -0,0 +1,159 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import networkx as nx
+
+from algorithms.algo import CaGreS
+from algorithms.beam_search import beam_search_CaGreS, INTERACTIVE_BEAM_WIDTH
+from utils.graph_serialization import dumps_graph, loads_graph
+
+logger = logging.getLogger(__name__)
+
+# Above this many nodes the UI offers partitioned summarization by default.
+PARTITION_MIN_NODES = 150
+# Largest partition handed to a single CaGreS run (its cost grows steeply with the node count).
+MAX_PARTITION_NODES = 50
+
+
+def partition_dag(dag, max_size=MAX_PARTITION_NODES):
+    """
+    Split a DAG into node sets of at most 'max_size' nodes:
+      - weakly connected components are kept whole when they fit, small ones
+        are packed together (merges across components stay possible),
+      - larger components are cut into consecutive chunks of a topological
+        order, so every edge between two chunks points forward.
+    Returns a list of node lists, in topological order of the chunks.
+    """
+    parts, packed = [], []
+    components = sorted(nx.weakly_connected_components(dag), key=len, reverse=True)
+    for component in components:
+        if len(component) > max_size:
+            order = list(nx.topological_sort(dag.subgraph(component)))
+            parts.extend(order[i:i + max_size] for i in range(0, len(order), max_size))
+        elif len(packed) + len(component) > max_size:
+            parts.append(packed)
+            packed = list(component)
+        else:
+            packed.extend(component)
+    if packed:
+        parts.append(packed)
+    return parts
+
+
+def allocate_budget(sizes, k):
+    """
+    Share the size budget k between partitions in proportion to their sizes
+    (largest remainder), at least one summary node each and never more than the partition's size.
+    """
+    total = sum(sizes)
+    shares = [max(1, min(size, k * size // total)) for size in sizes]
+    remainders = sorted(range(len(sizes)), key=lambda i: (k * sizes[i]) % total, reverse=True)
+    for i in remainders:
+        if sum(shares) >= k:
+            break
+        if shares[i] < sizes[i]:
+            shares[i] += 1
+    return shares
+
+
+def _similarity_subset(similarity_df, nodes):
+    if similarity_df is None:
+        return None
+    if hasattr(similarity_df, "subset"):
+        return similarity_df.subset(nodes)
+    return similarity_df.loc[nodes, nodes]
+
+
+def _summarize_part(data, k, similarity_df, semantic_threshold, beam_width):
+    # Partitions and their summaries travel in the npz form of utils.graph_serialization
+    sub = loads_graph(data)
+    summary = beam_search_CaGreS(sub, k, similarity_df, semantic_threshold, beam_width=beam_width, n_jobs=1)
+    # Fallback, the partition could not be summarized: the final pass gets it as is
+    return dumps_graph(summary if summary else sub)
+
+
+def stitch_summaries(dag, summaries):
+    """
+    Union of the partition summaries plus the edges crossing partitions,
+    mapped onto the clusters their endpoints ended up in. 'dag' may itself be
+    a stitched summary (nodes are then clusters). The merge logs are concatenated.
+    """
+    stitched = nx.DiGraph()
+    cluster_of, merge_log = {}, ()
+    for summary in summaries:
+        stitched.add_nodes_from(summary.nodes(data=True))
+        stitched.add_edges_from(summary.edges(data=True))
+        merge_log += summary.graph.get("merge_log", ())
+        for cluster in summary.nodes:
+            for member in cluster.split('_'):
+                cluster_of[member] = cluster
+
+    for u, v in dag.edges:
+        cu, cv = cluster_of[u.split('_')[0]], cluster_of[v.split('_')[0]]
+        if cu != cv and not stitched.has_edge(cu, cv):
+            stitched.add_edge(cu, cv)
+    stitched.graph["merge_log"] = merge_log
+    return stitched
+
+
+def partitioned_CaGreS(dag, k, similarity_df, semantic_threshold, beam_width=INTERACTIVE_BEAM_WIDTH,
+                       max_part_size=MAX_PARTITION_NODES, n_jobs=None, progress=None):
+    """
+    CaGreS for very large DAGs: summarize partitions independently, in parallel, then stitch.
+    Inputs:
+      dag (nx.DiGraph)    : The original causal DAG, in the CaGreS node form.
+      k (int)             : Target number of summary nodes.
+      similarity_df       : (Optional) A DataFrame with semantic similarities.
+      beam_width (int)    : Beam width of every partition run (1 is the greedy CaGreS).
+      max_part_size (int) : Largest partition (see partition_dag).
+      n_jobs (int)        : Worker processes (default: all cores).
+      progress            : (Optional) progress(fraction, message), called as partitions finish.
+    Returns:
+      A summary DAG with k (or fewer) nodes, marked with G.graph['partitioned'],
+      or None if the final pass across the partitions cannot reach k nodes.
+    """
+    if len(dag.nodes) <= k:
+        return dag
+
+    # 1) Partition and share the budget, every partition gets at least one summary node
+    parts = partition_dag(dag, max_part_size)
+    shares = allocate_budget([len(p) for p in parts], k)
+    logger.info(f"Summarizing {len(dag)} nodes as {len(parts)} partitions (k shares {min(shares)}-{max(shares)}).")
+
+    # 2) Summarize the partitions in worker processes, each gets its slice of the similarity matrix
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    summaries = [None] * len(parts)
+    pool = ProcessPoolExecutor(max_workers=max(1, min(n_jobs, len(parts))))
+    try:
+        futures = {}
+        for i, (nodes, share) in enumerate(zip(parts, shares)):
+            sub = nx.DiGraph()
+            sub.add_nodes_from(nodes)
+            sub.add_edges_from(dag.subgraph(nodes).edges)
+            sim = _similarity_subset(similarity_df, nodes)
+            futures[pool.submit(_summarize_part, dumps_graph(sub), share, sim, semantic_threshold, beam_width)] = i
+        for done, future in enumerate(as_completed(futures), start=1):
+            summaries[futures[future]] = loads_graph(future.result())
+            if progress is not None:
+                progress(0.9 * done / len(parts), f"{done}/{len(parts)} partitions summarized")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # 3) Stitch; with more partitions than k the stitched graph can still be large, summarize it again
+    stitched = stitch_summaries(dag, summaries)
+    if max_part_size < len(stitched) < len(dag) and len(stitched) > k:
+        return partitioned_CaGreS(stitched, k, similarity_df, semantic_threshold, beam_width=beam_width,
+                                  max_part_size=max_part_size, n_jobs=n_jobs, progress=progress)
+
+    # 4) A greedy pass across the partition boundaries brings the result down to k
+    if progress is not None:
+        progress(0.9, f"Stitched {len(stitched)} nodes, final pass to {k}")
+    summary = CaGreS(stitched, k, similarity_df, semantic_threshold)
+    if summary is None:
+        logger.warning(f"Partitioned summary stopped above k={k}: no valid merge left across the "
+                       f"{len(stitched)} stitched clusters.")
+        return None
+    summary.graph["partitioned"] = len(parts)
+    return summary
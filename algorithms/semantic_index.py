@@ -0,0 +1,156 @@
+import os
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-index bound on the memory of the remembered cluster-similarity, structural-validity and cost results.
+MAX_CACHE_BYTES = int(os.environ.get("DAG_SEMANTIC_CACHE_MB", "64")) * 1024 * 1024
+# Rough footprint of one remembered result (dict slot, key tuple, graph key and value).
+CACHE_ENTRY_BYTES = 200
+
+
+def graph_key(G) -> bytes:
+    """
+    Identity of a summary graph's structure, so per-pair results can be reused
+    across runs: a digest of its sorted nodes and edges, so two different
+    graphs cannot share cached validity or cost results by a hash collision.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for n in sorted(G.nodes):
+        h.update(str(n).encode("utf-8") + b"\0")
+    h.update(b"\1")
+    for u, v in sorted(G.edges):
+        h.update(f"{u}\0{v}\0".encode("utf-8"))
+    return h.digest()
+
+
+class SemanticIndex:
+    """
+    Threshold-independent semantic and structural state of CaGreS on one node set.
+
+    - Node pairs are sorted once by their (symmetric, max) similarity, so the
+      pairs that pass any threshold are a prefix found by binary search.
+    - The similarity of two clusters (the minimum over their members, as
+      Utils.check_semantic_for_cluster_nodes checks it) is cached per cluster pair.
+    - Structural validity and merge cost depend only on the graph, never on
+      the threshold: they are cached per (graph_key, pair) and reused by every
+      later run on the same node set, whatever its threshold.
+    The caches are shared by concurrent runs (a lock guards them) and hold at
+    most MAX_CACHE_BYTES together; past that they are cleared and refilled.
+    'nbytes' reports the current size, which the shared store re-reads as the caches grow.
+    Accepted wherever CaGreS takes its 'similarity_df'.
+    """
+
+    def __init__(self, nodes, similarity):
+        self.nodes = list(nodes)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        S = np.asarray(similarity, dtype=float)
+        self.matrix = np.maximum(S, S.T)
+
+        # 1) Unordered pairs sorted by similarity, ascending, for threshold lookups
+        i, j = np.triu_indices(len(self.nodes), k=1)
+        order = np.argsort(self.matrix[i, j], kind="stable")
+        self._pair_i, self._pair_j = i[order], j[order]
+        self._pair_sim = self.matrix[i, j][order]
+
+        self._cluster_sim = {}
+        self._structural = {}
+        self._costs = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_similarity(cls, similarity: dict):
+        """From the dict of dicts built by utils.semantic_coloring.build_semantic_matrix."""
+        nodes = list(similarity)
+        return cls(nodes, [[similarity[a][b] for b in nodes] for a in nodes])
+
+    def subset(self, nodes):
+        """Index over some of the nodes (e.g. one partition); its caches start empty."""
+        ids = [self.index[n] for n in nodes]
+        return SemanticIndex(nodes, self.matrix[np.ix_(ids, ids)])
+
+    def __getstate__(self):
+        # Worker processes get the similarity data, not the caches
+        state = self.__dict__.copy()
+        state.update(_cluster_sim={}, _structural={}, _costs={})
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the similarity arrays plus the results cached so far."""
+        arrays = (self.matrix, self._pair_i, self._pair_j, self._pair_sim)
+        with self._lock:
+            entries = len(self._cluster_sim) + len(self._structural) + len(self._costs)
+        return sum(a.nbytes for a in arrays) + entries * CACHE_ENTRY_BYTES
+
+    def pairs_above(self, threshold):
+        """All node pairs with similarity >= threshold, found by binary search."""
+        start = int(np.searchsorted(self._pair_sim, threshold, side="left"))
+        return [(self.nodes[a], self.nodes[b]) for a, b in zip(self._pair_i[start:], self._pair_j[start:])]
+
+    def count_above(self, threshold) -> int:
+        return len(self._pair_sim) - int(np.searchsorted(self._pair_sim, threshold, side="left"))
+
+    def min_similarity(self, node1: str, node2: str) -> float:
+        """Least similar member pair of two (cluster) nodes, members joined by '_'."""
+        key = (node1, node2) if node1 <= node2 else (node2, node1)
+
+        def compute():
+            ids1 = [self.index[m] for m in node1.split('_')]
+            ids2 = [self.index[m] for m in node2.split('_')]
+            return float(self.matrix[np.ix_(ids1, ids2)].min())
+        return self._remember(self._cluster_sim, key, compute)
+
+    def structurally_valid(self, G, key, node1, node2, check):
+        """check(G, node1, node2) for this graph state, computed once per (graph, pair)."""
+        return self._remember(self._structural, (key, node1, node2), lambda: check(G, node1, node2))
+
+    def cost(self, G, key, node1, node2, get_cost):
+        return self._remember(self._costs, (key, node1, node2), lambda: get_cost(node1, node2, G))
+
+    def _remember(self, cache, key, compute):
+        # The result is computed outside the lock, a racing duplicate computes the same value
+        with self._lock:
+            value = cache.get(key)
+        if value is None:
+            value = compute()
+            with self._lock:
+                caches = (self._cluster_sim, self._structural, self._costs)
+                if sum(len(c) for c in caches) * CACHE_ENTRY_BYTES >= MAX_CACHE_BYTES:
+                    for c in caches:
+                        c.clear()
+                cache[key] = value
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"nodes": len(self.nodes), "cluster_pairs": len(self._cluster_sim),
+                    "structural": len(self._structural), "costs": len(self._costs)}
+
+
+def get_semantic_index(nodes: tuple):
+    """
+    Handle (core.shared_store.StoreHandle) on the similarity index of a node
+    set, built once: every summary of these nodes, at any threshold and from
+    any session, sees the same similarities and shares the caches. The index
+    counts against the shared store's budget and stays pinned until the
+    handle is released; idle indexes are evicted like any other entry.
+    """
+    from core.shared_store import get_shared_store
+    from utils.semantic_coloring import build_semantic_matrix
+
+    def build():
+        logger.info(f"Building semantic index for {len(nodes)} nodes.")
+        return SemanticIndex.from_similarity(build_semantic_matrix(nodes))
+
+    key = "semantic:" + hashlib.sha1("\0".join(nodes).encode("utf-8")).hexdigest()
+    return get_shared_store().get_or_create(key, build)
@@ -0,0 +1,248 @@
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from algorithms import conditions
+from algorithms.discovery import StreamingCovariance
+from utils.chunked_io import iter_chunks, DEFAULT_CHUNKSIZE
+from utils.node_labels import labels, PASCAL
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class LinearEffect:
+    """Treatment coefficient of a backdoor linear regression, with its test statistics."""
+
+    def __init__(self, value, stderr, t_stat, p_value, n, dof):
+        self.value = value
+        self.stderr = stderr
+        self.t_stat = t_stat
+        self.p_value = p_value
+        self.n = n
+        self.dof = dof
+
+    def __repr__(self):
+        return f"LinearEffect(value={self.value!r}, stderr={self.stderr!r}, p_value={self.p_value!r}, n={self.n})"
+
+    def __str__(self):
+        return f"{self.value:.6g} (SE {self.stderr:.3g}, n={self.n})"
+
+
+class StreamingOLS:
+    """
+    Ordinary least squares with an intercept, fitted from a stream of row
+    chunks. Only the means and centered cross-products of [outcome, regressors]
+    are kept (see StreamingCovariance), which are the normal equations of the
+    centered problem: memory is O(regressors^2) whatever the number of rows.
+    """
+
+    def __init__(self, outcome, regressors):
+        self.outcome = outcome
+        self.regressors = list(regressors)
+        self.stats = StreamingCovariance([outcome] + self.regressors)
+
+    @property
+    def n(self) -> int:
+        return self.stats.n
+
+    def update(self, chunk: "pd.DataFrame"):
+        self.stats.update(chunk)
+
+    def _solve(self):
+        """
+        Slope coefficients, their covariance matrix and the residual degrees of
+        freedom. With collinear regressors these are statsmodels' pinv answers:
+        the minimum-norm solution over [intercept, regressors] and s^2 pinv(X'X).
+        """
+        m2, mean = self.stats.m2, self.stats.mean
+        sxx, sxy, syy, mx = m2[1:, 1:], m2[1:, 0], m2[0, 0], mean[1:]
+        p = len(mx)
+
+        # 1) Rank and inverse of the correlation-scaled matrix: raw cross-products of
+        #    e.g. byte counts (~1e18) next to 0/1 dummies would fall under pinv's relative cutoff
+        scale = np.sqrt(np.diag(sxx))
+        scale[scale == 0] = 1.0
+        lam, vec = np.linalg.eigh(sxx / np.outer(scale, scale))
+        keep = lam > max(lam.max(initial=0.0), 0.0) * max(p, 1) * np.finfo(float).eps
+        kept = vec[:, keep] / scale[:, None]
+        sxx_inv = (kept / lam[keep]) @ kept.T
+        beta = sxx_inv @ sxy
+        rss = max(syy - beta @ sxy, 0.0)
+        dof = self.n - (int(keep.sum()) + 1)
+        if dof <= 0:
+            raise ValueError(f"Not enough rows ({self.n}) for {len(self.regressors)} regressors.")
+        cov = sxx_inv * (rss / dof)
+        if keep.all():
+            return beta, cov, dof
+
+        # 2) Collinear: any solution plus the null space of X'X over [1, regressors] is a solution,
+        #    its minimum-norm one (and pinv(X'X)) is the projection off that null space
+        null = vec[:, ~keep] / scale[:, None]
+        null = np.vstack([-mx @ null, null])
+        proj = np.eye(p + 1) - null @ np.linalg.solve(null.T @ null, null.T)
+        full = np.empty((p + 1, p + 1))
+        full[0, 0] = 1.0 / self.n + mx @ sxx_inv @ mx
+        full[0, 1:] = full[1:, 0] = -sxx_inv @ mx
+        full[1:, 1:] = sxx_inv
+        beta = (proj @ np.concatenate([[mean[0] - mx @ beta], beta]))[1:]
+        cov = (proj @ full @ proj)[1:, 1:] * (rss / dof)
+        return beta, cov, dof
+
+    def fit(self):
+        """
+        Coefficients, standard errors, t statistics, two-sided p-values and
+        residual degrees of freedom, as statsmodels' OLS reports them (a
+        pseudo-inverse handles collinear regressors, e.g. redundant dummies).
+        """
+        from scipy import stats as sps
+
+        beta, cov, dof = self._solve()
+        stderr = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_stat = beta / stderr
+        p_value = 2 * sps.t.sf(np.abs(t_stat), dof)
+        return beta, stderr, t_stat, p_value, dof
+
+    def contrast(self, weights):
+        """Estimate, standard error, t statistic and two-sided p-value of weights @ coefficients."""
+        from scipy import stats as sps
+
+        beta, cov, dof = self._solve()
+        weights = np.asarray(weights, dtype=float)
+        value = float(weights @ beta)
+        stderr = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_stat = np.float64(value) / stderr
+        return value, stderr, float(t_stat), float(2 * sps.t.sf(abs(t_stat), dof)), dof
+
+
+def _encode(chunk, numeric, levels) -> dict:
+    """Numeric columns as floats, k-1 dummies per categorical column (first level dropped, as DoWhy does)."""
+    encoded = {col: chunk[col].to_numpy(dtype=float) for col in numeric}
+    for col, values in levels.items():
+        for level in values[1:]:
+            encoded[f"{col}[{level}]"] = (chunk[col] == level).to_numpy(dtype=float)
+    return encoded
+
+
+def _design_chunk(chunk, treatment, outcome, covariates, modifiers, treated):
+    """
+    [outcome, treatment 0/1, encoded covariates, treatment x encoded modifiers]
+    of one chunk's complete rows, and the encoded modifiers on those rows.
+    'covariates' and 'modifiers' are (numeric columns, {categorical column: levels});
+    'treated' is the chunk's boolean treatment mask.
+    """
+    import pandas as pd
+
+    treated = treated.astype(float)
+    design = {outcome: chunk[outcome].to_numpy(dtype=float), treatment: treated}
+    design.update(_encode(chunk, *covariates))
+    modifier_values = _encode(chunk, *modifiers)
+    design.update((f"{treatment}*{name}", treated * values) for name, values in modifier_values.items())
+    # Complete rows only, like the in-memory estimate on the same data
+    used = [outcome] + covariates[0] + list(covariates[1]) + modifiers[0] + list(modifiers[1])
+    complete = chunk[list(dict.fromkeys(used))].notna().all(axis=1).to_numpy()
+    return (pd.DataFrame(design, index=chunk.index)[complete],
+            pd.DataFrame(modifier_values, index=chunk.index)[complete])
+
+
+def streaming_backdoor_ate(source, treatment_column, logic_condition, outcome_column, adjustment,
+                           effect_modifiers=(), chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Backdoor linear-regression ATE of a binary treatment, computed out of core:
+    outcome ~ 1 + treatment + adjustment + treatment x effect_modifiers is fitted
+    from accumulated normal equations, so the dataset is never held in memory at once.
+    Inputs:
+      source             : A DataFrame, a .csv/.parquet path or a CSV buffer (see iter_chunks).
+      treatment_column   : Treatment node; the treatment is 1 where 'logic_condition' holds.
+      outcome_column     : Outcome node.
+      adjustment         : Adjustment set (node names), e.g. from algo.identify_backdoor.
+      effect_modifiers   : (Optional) Effect modifiers (node names), e.g. from algo.identify_backdoor.
+    Node names are the PascalCase form of the dataset's columns. Non-numeric
+    columns are one-hot encoded (first level dropped), which takes an extra
+    pass to collect their levels - so 'source' must be re-readable then.
+    The condition is compiled once per column map (conditions.compiled_condition);
+    on an in-memory frame its row mask is cached per dataset (conditions.condition_mask)
+    and sliced per chunk, so repeated estimates do not re-evaluate it.
+    With effect modifiers the ATE is the treatment coefficient plus each
+    interaction coefficient times its modifier's mean, as DoWhy averages it.
+    Returns:
+      (LinearEffect, p_value) - the same numbers as DoWhy's backdoor.linear_regression,
+      whose p-value is the treatment coefficient's (the ATE's own test is in the LinearEffect).
+    """
+    import pandas as pd
+
+    tree = conditions.parse(logic_condition.strip())
+    columns = None
+    resolve = None
+    covariates, modifiers = ([], {}), ([], {})
+
+    # 1) Map node names to source columns and split numeric from categorical covariates
+    for chunk in iter_chunks(source, chunksize):
+        column_map = {labels.label(c, PASCAL): c for c in chunk.columns}
+        resolve = lambda name: column_map.get(name, name)
+        missing = [n for n in [treatment_column, outcome_column] + list(adjustment) + list(effect_modifiers)
+                   if n not in column_map]
+        if missing:
+            raise ValueError(f"Columns not in the dataset: {', '.join(missing)}")
+        outcome = resolve(outcome_column)
+        for names, (numeric, categorical) in ((adjustment, covariates), (effect_modifiers, modifiers)):
+            for name in names:
+                col = resolve(name)
+                if chunk[col].dtype.kind in "biuf":
+                    numeric.append(col)
+                else:
+                    categorical[col] = None
+        referenced = {resolve(n) for n in conditions.referenced_columns(tree)}
+        columns = list(dict.fromkeys([outcome] + covariates[0] + list(covariates[1]) + modifiers[0]
+                                     + list(modifiers[1]) + sorted(referenced & set(chunk.columns))))
+        break
+    if columns is None:
+        raise ValueError("The dataset is empty.")
+
+    categorical = list(dict.fromkeys(list(covariates[1]) + list(modifiers[1])))
+    if categorical:
+        seen = {col: set() for col in categorical}
+        for chunk in iter_chunks(source, chunksize, columns=columns):
+            for col in categorical:
+                seen[col].update(chunk[col].dropna().unique().tolist())
+        for levels in (covariates[1], modifiers[1]):
+            levels.update((col, sorted(seen[col], key=str)) for col in levels)
+
+    # 2) Accumulate the normal equations chunk by chunk, and the modifiers' sums for their means;
+    #    the treatment mask of a frame is computed (or found cached) once and sliced like its chunks
+    condition_columns = tuple(sorted(column_map.items()))
+    mask = None
+    if isinstance(source, pd.DataFrame):
+        mask = conditions.condition_mask(source, logic_condition, condition_columns)
+    predicate = conditions.compiled_condition(logic_condition, condition_columns)
+    treatment = "__treatment__"
+    ols = None
+    modifier_sums = None
+    offset = 0
+    for chunk in iter_chunks(source, chunksize, columns=columns):
+        treated = mask[offset:offset + len(chunk)] if mask is not None else predicate(chunk)
+        offset += len(chunk)
+        design, modifier_values = _design_chunk(chunk, treatment, outcome, covariates, modifiers, treated)
+        if ols is None:
+            ols = StreamingOLS(outcome, [c for c in design.columns if c != outcome])
+            modifier_sums = np.zeros(modifier_values.shape[1])
+        ols.update(design)
+        modifier_sums += modifier_values.to_numpy().sum(axis=0)
+    if ols is None:
+        raise ValueError("The dataset is empty.")
+    logger.info(f"Streamed {ols.n} complete rows for the ATE of {treatment_column} on {outcome_column}.")
+
+    # 3) Solve; the treatment is the first regressor and the interactions are the last ones
+    _, _, _, p_value, _ = ols.fit()
+    weights = np.zeros(len(ols.regressors))
+    weights[0] = 1.0
+    if len(modifier_sums):
+        weights[-len(modifier_sums):] = modifier_sums / ols.n
+    value, stderr, t_stat, ate_p_value, dof = ols.contrast(weights)
+    effect = LinearEffect(value, stderr, t_stat, ate_p_value, ols.n, int(dof))
+    return effect, float(p_value[0])
@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import networkx as nx
+
+import Utils
+from utils import graph_utils
+from algorithms.beam_search import summary_cost, INTERACTIVE_BEAM_WIDTH
+from algorithms.semantic_index import get_semantic_index
+from utils.node_labels import relabel_graph, PASCAL
+from utils.graph_serialization import dumps_graph, loads_graph
+
+logger = logging.getLogger(__name__)
+
+# Per-worker prepared graph and similarity index, shipped once by the pool initializer.
+_worker_graph = None
+_worker_similarity = None
+
+SWEEP_COLUMNS = ["k", "threshold", "nodes", "edges", "cost", "runtime_s", "ate", "ate_drift"]
+
+
+def parameter_range(low, high, step, digits=4) -> list:
+    """low, low + step, ... up to high (inclusive), rounded so the values match the UI's."""
+    if step <= 0 or high < low:
+        return [low]
+    count = int(np.floor((high - low) / step + 1e-9)) + 1
+    return [round(low + i * step, digits) for i in range(count)]
+
+
+def _init_worker(data, similarity):
+    # The graph is shipped in the npz form of utils.graph_serialization
+    global _worker_graph, _worker_similarity
+    _worker_graph = loads_graph(data)
+    _worker_similarity = similarity
+
+
+def _sweep_point(G, similarity, k, threshold, beam_width, partitioned):
+    """One grid point: the CaGreS-form summary (or None), its cost and runtime."""
+    start = time.perf_counter()
+    summary = graph_utils.summarize_prepared_dag(G, k, similarity if threshold != 0.0 else None, threshold,
+                                                 beam_width=beam_width, n_jobs=1, partitioned=partitioned)
+    runtime = time.perf_counter() - start
+    return k, threshold, summary or None, summary_cost(G, summary) if summary else None, runtime
+
+
+def _worker_point(args):
+    return _sweep_point(_worker_graph, _worker_similarity, *args)
+
+
+def _effect_value(estimate) -> float:
+    if estimate == (-1, -1):
+        return np.nan
+    return float(estimate[0].value)
+
+
+def parameter_sweep(original_dag, ks, thresholds, beam_width=INTERACTIVE_BEAM_WIDTH, n_jobs=None,
+                    df=None, ate_query=None, progress=None, partitioned=False):
+    """
+    Summarize the DAG for every (k, threshold) combination, concurrently.
+    Inputs:
+      original_dag (nx.DiGraph) : The original causal DAG (not modified).
+      ks, thresholds            : The size constraints and semantic thresholds to combine.
+      beam_width (int)          : Beam width of every run (1 is the greedy CaGreS).
+      n_jobs (int)              : Worker processes (default: all cores, 1 runs in-process).
+      df, ate_query             : (Optional) The dataset and a (treatment, condition, outcome)
+                                  query of PascalCase node names: each summary's ATE and its
+                                  drift from the original DAG's ATE are added to the table.
+      progress                  : (Optional) progress(fraction, message), called as points finish.
+      partitioned (bool)        : Summarize partition by partition, as graph_utils.summarize_dag.
+    The graph is prepared and the similarity index built once, then shipped to
+    each worker once; a worker's index caches carry over between its runs.
+    Returns:
+      (table, summaries): a DataFrame with one row per combination (SWEEP_COLUMNS,
+      'nodes' is NaN where no summary was found) and {(k, threshold): summary DAG}
+      with display labels, as graph_utils.summarize_dag returns them.
+    """
+    import pandas as pd
+
+    # 1) One prepared graph and similarity index for the whole grid
+    G = Utils.prepare_graph_format(original_dag)
+    index = None
+    if any(thr != 0.0 for thr in thresholds):
+        index = get_semantic_index(tuple(sorted(G.nodes)))
+    similarity = index.value if index is not None else None
+    points = [(k, thr, beam_width, partitioned) for k in ks for thr in thresholds]
+    logger.info(f"Sweeping {len(ks)} sizes x {len(thresholds)} thresholds on {len(G)} nodes.")
+
+    # 2) Run the points in worker processes, in-process for a single worker
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(points)))
+    results = []
+    if n_jobs == 1:
+        for done, point in enumerate(points, start=1):
+            results.append(_sweep_point(G, similarity, *point))
+            if progress is not None:
+                progress(done / len(points), f"{done}/{len(points)} summaries")
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                   initargs=(dumps_graph(G), similarity))
+        try:
+            futures = [pool.submit(_worker_point, point) for point in points]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if progress is not None:
+                    progress(done / len(points), f"{done}/{len(points)} summaries")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    if index is not None:
+        index.release()
+
+    # 3) Tabulate, with the ATE drift of every summary against the original DAG
+    base_effect = None
+    if df is not None and ate_query is not None:
+        from algorithms.algo import estimate_binary_treatment_effect_on_summary, topological_ranks
+
+        # The original DAG is estimated as its identity summary, so both sides of the drift
+        # go through the same cluster-level identification and model specification
+        treatment, condition, outcome = ate_query
+        original = relabel_graph(original_dag, PASCAL)
+        ranks = topological_ranks(nx.topological_sort(original))
+        base_effect = _effect_value(estimate_binary_treatment_effect_on_summary(
+            df, treatment, condition, outcome, original, ranks=ranks))
+
+    rows, summaries = [], {}
+    for k, thr, summary, cost, runtime in results:
+        row = {"k": k, "threshold": thr, "nodes": np.nan, "edges": np.nan, "cost": cost,
+               "runtime_s": runtime, "ate": np.nan, "ate_drift": np.nan}
+        if summary is not None:
+            summary = summaries[(k, thr)] = graph_utils.to_display_summary(summary)
+            row.update(nodes=summary.number_of_nodes(), edges=summary.number_of_edges())
+            if base_effect is not None:
+                effect = _effect_value(estimate_binary_treatment_effect_on_summary(
+                    df, treatment, condition, outcome, Utils.convert_nodes_snake_to_pascal_case(summary), ranks=ranks))
+                row.update(ate=effect, ate_drift=effect - base_effect)
+        rows.append(row)
+
+    table = pd.DataFrame(rows, columns=SWEEP_COLUMNS).sort_values(["k", "threshold"], ignore_index=True)
+    if base_effect is None:
+        table = table.drop(columns=["ate", "ate_drift"])
+    return table, summaries
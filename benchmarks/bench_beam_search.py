@@ -0,0 +1,60 @@
+"""
+Summary cost vs. running time of beam-search CaGreS for several beam widths
+(B=1 is the greedy CaGreS used on interactive paths). The cost is the number
+of edges the grounded summary adds over the original DAG (lower is better).
+
+Run from the repository root:
+    python -m benchmarks.bench_beam_search --nodes 60 --k 10 --widths 1 2 4 8
+    python -m benchmarks.bench_beam_search --dot data/so.dot --k 8
+"""
+import argparse
+import random
+import time
+
+import networkx as nx
+
+import Utils
+from algorithms.beam_search import beam_search_CaGreS, summary_cost
+from utils.dot_parser import read_dot_graph
+
+
+def make_dag(n_nodes: int, density: float, seed: int = 0) -> nx.DiGraph:
+    """A random DAG in the CaGreS node form (no '_' in names)."""
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(f"v{i}" for i in range(n_nodes))
+    G.add_edges_from((f"v{u}", f"v{v}") for u in range(n_nodes) for v in range(u + 1, n_nodes)
+                     if rng.random() < density)
+    return G
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=60)
+    parser.add_argument("--density", type=float, default=0.08)
+    parser.add_argument("--dot", help="Summarize this DOT file instead of a random DAG")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.dot:
+        with open(args.dot, "rb") as f:
+            dag = Utils.prepare_graph_format(read_dot_graph(f.read()))
+    else:
+        dag = make_dag(args.nodes, args.density)
+    print(f"DAG: {dag.number_of_nodes()} nodes, {dag.number_of_edges()} edges, k={args.k}")
+
+    for width in args.widths:
+        random.seed(0)  # greedy CaGreS breaks ties at random
+        start = time.perf_counter()
+        summary = beam_search_CaGreS(dag, args.k, None, 0.0, beam_width=width, n_jobs=args.jobs)
+        seconds = time.perf_counter() - start
+        if summary is None:
+            print(f"B={width:<3d} no summary with k={args.k}  {seconds:8.3f} s")
+            continue
+        print(f"B={width:<3d} cost {summary_cost(dag, summary):6d}  {seconds:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+DOT loading throughput: in-memory parser vs. the pygraphviz temp-file path.
+
+Run from the repository root:
+    python -m benchmarks.bench_dot_parser --edges 100000
+"""
+import argparse
+import importlib.util
+import io
+import random
+import time
+
+import networkx as nx
+
+from utils.dot_parser import read_dot_graph, read_dot_edge_array, write_dot
+
+
+def make_dot(n_edges: int, seed: int = 0) -> bytes:
+    """A random DAG export in the style of data/*.dot, with ~n_edges edges."""
+    rng = random.Random(seed)
+    n_nodes = max(2, n_edges // 4)
+    edges = set()
+    while len(edges) < n_edges:
+        edges.add(tuple(sorted(rng.sample(range(n_nodes), 2))))
+    G = nx.DiGraph()
+    G.add_nodes_from(f"variable_{i}" for i in range(n_nodes))
+    G.add_edges_from((f"variable_{u}", f"variable_{v}") for u, v in edges)
+    return write_dot(G, name="benchmark").encode("utf-8")
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _graphviz_loader():
+    if importlib.util.find_spec("pygraphviz") is None:
+        return None
+    from utils.graph_utils import _load_dag_with_graphviz
+    return lambda data: _load_dag_with_graphviz(io.BytesIO(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_dot(args.edges)
+    mb = len(data) / 1e6
+    print(f"DOT input: {args.edges} edges, {mb:.1f} MB")
+
+    runs = [
+        ("read_dot_graph (networkx DiGraph)", lambda: read_dot_graph(data)),
+        ("read_dot_edge_array (int32 edges)", lambda: read_dot_edge_array(data)),
+    ]
+    graphviz = _graphviz_loader()
+    if graphviz is not None:
+        runs.append(("pygraphviz read_dot (temp file)", lambda: graphviz(data)))
+    else:
+        print("pygraphviz not installed, skipping the graphviz baseline")
+
+    for name, fn in runs:
+        seconds, _ = _time(fn, args.repeat)
+        print(f"{name:38s} {seconds:8.3f} s  {args.edges / seconds:12,.0f} edges/s  {mb / seconds:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Cold-start cost of the app: importing the entry point's modules, and the first
+full script run (first render) through streamlit's AppTest. Every sample runs
+in a fresh interpreter so nothing is cached between them.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Libraries that should only load once their feature is used.
+HEAVY_MODULES = ("dowhy", "causallearn", "scipy", "pyvis", "pandas", "streamlit_lottie")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import core.session_state, core.layout, core.sidebar
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+RENDER_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+elapsed = time.perf_counter() - start
+assert not at.exception, at.exception
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _sample(probe: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _report(name: str, probe: str, repeat: int) -> None:
+    samples = [_sample(probe) for _ in range(repeat)]
+    seconds = sorted(s["seconds"] for s in samples)
+    heavy = sorted(set().union(*(s["heavy"] for s in samples)))
+    print(f"{name:28s} median {statistics.median(seconds):6.3f} s  "
+          f"min {seconds[0]:6.3f} s  max {seconds[-1]:6.3f} s")
+    print(f"{'':28s} heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _report("import app modules", IMPORT_PROBE, args.repeat)
+    _report("first render (AppTest)", RENDER_PROBE, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Concurrent-session load test of the whole app, headless, through streamlit's
+AppTest. Every virtual analyst runs the full script for each interaction:
+
+    open -> choose the bundled dataset + DOT -> generate DAG -> summarize -> compute ATE
+
+with the data/ examples, all sessions at once. Inputs go in through the
+widgets' keys (the sidebar menu's "main_menu", the "example_dag" and
+"example_dataset" selectboxes, ...), only the public AppTest API is used.
+Background jobs (discovery, summarization) count until their result is shown.
+
+AppTest swaps streamlit's Runtime singleton on every run, so concurrent
+AppTests cannot share a process: each virtual analyst gets its own worker
+process, and they start together once all of them have warmed up. Process-wide
+caches (the shared store, st.cache_resource) are therefore per session here,
+not shared as between the sessions of one server. Reports per-interaction
+latency percentiles, throughput and memory per session.
+
+Run from the repository root:
+    python -m benchmarks.load_test --sessions 8
+    python -m benchmarks.load_test --sessions 16 --source dot --rounds 2
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+DATASET = "redshift_dataset.pkl"
+DOT_FILE = "amazon_redshift.dot"
+
+UPLOAD_MENU = "1. Upload/Generate DAG"
+ATE_MENU = "3. Compute Causal Effect"
+# Treatment / outcome of the ATE interaction: an edge of both the example DOT and the DAG discovered from the dataset
+TREATMENT, OUTCOME, CONDITION = "NumTables", "PlanningTime", "NumTables >= 5"
+
+# Set in every worker process by _init_worker: all sessions start together after warming up.
+_start_barrier = None
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Session:
+    """One virtual analyst: an AppTest plus the latency of every interaction it made."""
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file("app.py", default_timeout=timeout)
+        self.timings = defaultdict(list)
+        self.timeout = timeout
+        self.page = UPLOAD_MENU
+
+    def _timed(self, name, fn):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+        self.timings[name].append(elapsed)
+
+    def _run(self):
+        # The sidebar menu is a custom component AppTest cannot click: its value is
+        # injected through its widget key, which only holds for the next run
+        self.at.session_state["main_menu"] = self.page
+        self.at.run()
+
+    def _wait_for_job(self, slot):
+        # The page polls its job; here we wait on it, then rerun once to show the result
+        job = self.at.session_state["_jobs"].get(slot) if "_jobs" in self.at.session_state else None
+        if job is not None:
+            job.future.exception(timeout=self.timeout)
+        self._run()
+
+    def open(self):
+        self.page = UPLOAD_MENU
+        self._timed("open", self._run)
+
+    def upload(self):
+        def run():
+            self.at.selectbox(key="example_dataset").set_value(DATASET)
+            self.at.selectbox(key="example_dag").set_value(DOT_FILE)
+            self._run()
+        self._timed("upload", run)
+
+    def generate(self, source):
+        def run():
+            self.at.radio(key="generate_from").set_value("dataset" if source == "dataset" else ".dot file")
+            self.at.button(key="generate_dag").click()
+            self._run()
+            self._wait_for_job("discovery")
+        self._timed("generate", run)
+
+    def summarize(self):
+        def run():
+            self.at.button(key="summarize_button_left_col").click()
+            self._run()
+            self._wait_for_job("summary")
+        self._timed("summarize", run)
+
+    def compute_ate(self):
+        self.page = ATE_MENU
+        self._timed("open ATE page", self._run)
+
+        def run():
+            self.at.selectbox(key="ate_treatment").set_value(TREATMENT)
+            self.at.text_input(key="ate_condition").set_value(CONDITION)
+            self.at.selectbox(key="ate_outcome").set_value(OUTCOME)
+            self.at.button(key="compute_ate").click()
+            self._run()
+            if not self.at.success:
+                raise RuntimeError(f"compute ATE: no estimate shown ({[e.value for e in self.at.error]})")
+        self._timed("compute ATE", run)
+
+
+def run_session(source, rounds, timeout):
+    session = Session(timeout)
+    session.open()
+    session.upload()
+    for _ in range(rounds):
+        session.generate(source)
+        session.summarize()
+        session.compute_ate()
+        session.page = UPLOAD_MENU
+    return session
+
+
+def _init_worker(barrier):
+    global _start_barrier
+    _start_barrier = barrier
+
+
+def _worker_session(source, rounds, timeout):
+    """
+    One virtual analyst in its own process: warm up (imports, cached resources)
+    so the first session is not an outlier, wait for the others, then run.
+    Returns (timings, start, end, rss after warm-up, rss after the session).
+    """
+    run_session(source, 1, timeout)
+    _start_barrier.wait()
+    rss_before = rss_bytes()
+    start = time.time()
+    session = run_session(source, rounds, timeout)
+    end = time.time()
+    return dict(session.timings), start, end, rss_before, rss_bytes()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent virtual analysts")
+    parser.add_argument("--rounds", type=int, default=1, help="generate/summarize/ATE rounds per session")
+    parser.add_argument("--source", choices=["dataset", "dot"], default="dataset",
+                        help="Generate the DAG by discovery on the dataset or from the DOT file")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    # Fresh interpreters: forking would copy a parent's streamlit threads
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.sessions)
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=context, initializer=_init_worker,
+                             initargs=(barrier,)) as pool:
+        futures = [pool.submit(_worker_session, args.source, args.rounds, args.timeout)
+                   for _ in range(args.sessions)]
+        results = [f.result() for f in futures]
+
+    timings = defaultdict(list)
+    for session_timings, *_ in results:
+        for name, values in session_timings.items():
+            timings[name].extend(values)
+    wall = max(r[2] for r in results) - min(r[1] for r in results)
+    growth = [after - before for *_, before, after in results]
+
+    interactions = sum(len(v) for v in timings.values())
+    print(f"{args.sessions} concurrent sessions, {args.rounds} round(s), DAG from {args.source}")
+    print(f"{'interaction':16s} {'n':>5s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s} {'mean':>8s}  (seconds)")
+    for name, values in timings.items():
+        print(f"{name:16s} {len(values):5d} {percentile(values, 50):8.3f} {percentile(values, 90):8.3f} "
+              f"{percentile(values, 99):8.3f} {max(values):8.3f} {statistics.mean(values):8.3f}")
+    print(f"throughput: {interactions / wall:.2f} interactions/s, {args.sessions / wall * 60:.1f} sessions/min "
+          f"({interactions} interactions in {wall:.1f} s)")
+    print(f"memory: {statistics.mean(r[4] for r in results) / 2**20:.0f} MB per session process, "
+          f"{statistics.mean(growth) / 2**20:.1f} MB grown per measured session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import logging
+import itertools
+from collections import OrderedDict
+
+import networkx as nx
+import streamlit as st
+
+from core.shared_store import share_in_session, release_in_session
+from utils.node_labels import labels, PASCAL
+
+logger = logging.getLogger(__name__)
+
+# A full copy of the DAG is pinned every this many edits along a branch.
+SNAPSHOT_EVERY = 16
+# Recently visited versions kept built, so undo/redo over them is a lookup.
+MAX_MATERIALIZED = 16
+# Cached results (summaries, preservation stats, ATEs) over all versions of a history.
+MAX_RESULTS = 256
+
+ADD, REMOVE = "add", "remove"
+
+_history_ids = itertools.count()
+
+
+def _edge_hash(u, v) -> int:
+    return hash((u, v))
+
+
+class _Version:
+    __slots__ = ("parent", "ops", "depth", "delta", "child")
+
+    def __init__(self, parent, ops, depth, delta):
+        self.parent = parent
+        self.ops = ops
+        self.depth = depth
+        self.delta = delta
+        self.child = None   # most recent child, the redo target
+
+
+class EditHistory:
+    """
+    Append-only edit log of the original DAG. Version 0 is the loaded DAG and
+    every edit (one edge, or a whole batch) appends a version holding only its
+    edge operations; undo and redo move between a version and its parent or
+    latest child, and an edit after an undo starts a new branch instead of
+    discarding the old one.
+
+    - Version graphs are immutable (frozen). The recently visited ones are
+      kept built and every SNAPSHOT_EVERY-th version is pinned, so any other
+      version is rebuilt by replaying at most SNAPSHOT_EVERY edits.
+    - Each version has a content fingerprint: the XOR of the hashes of the
+      edges it added or removed since version 0, updated in O(1) per edit.
+      Results are cached per (fingerprint, kind, params), so a version whose
+      edges equal an earlier one's (e.g. after re-adding a removed edge)
+      serves that version's summaries and estimates too.
+    Edit operations are (action, source, target). Every version keeps the node
+    labels of the loaded DAG: edits named in another label form (e.g. the
+    PascalCase display) are mapped back to them when committed.
+    """
+
+    def __init__(self, dag: nx.DiGraph):
+        # Edits already work on copies of the (shared, frozen) session DAG
+        nx.freeze(dag)
+        self._versions = [_Version(None, (), 0, 0)]
+        self._snapshots = {0: dag}
+        self._materialized = OrderedDict({0: dag})
+        self._names = {labels.label(n, PASCAL): n for n in dag}
+        self._results = OrderedDict()
+        self._id = next(_history_ids)
+        self.version = 0
+
+    def __len__(self):
+        return len(self._versions)
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        return self.materialize(self.version)
+
+    @property
+    def key(self):
+        """Identity of the current version's edges: equal for versions with equal edges."""
+        return self._id, self._versions[self.version].delta
+
+    @property
+    def can_undo(self) -> bool:
+        return self._versions[self.version].parent is not None
+
+    @property
+    def can_redo(self) -> bool:
+        return self._versions[self.version].child is not None
+
+    def commit(self, dag: nx.DiGraph, ops) -> nx.DiGraph:
+        """
+        Record 'ops', already applied to 'dag' (a private copy of the current
+        graph), as a new version and make it current. 'dag' is frozen and
+        returned, relabeled to the loaded DAG's labels if it used another form.
+        """
+        ops = tuple((action, self.label(u), self.label(v)) for action, u, v in ops)
+        mapping = {n: self.label(n) for n in dag if self.label(n) != n}
+        if mapping:
+            dag = nx.relabel_nodes(dag, mapping)
+        parent = self._versions[self.version]
+        delta = parent.delta
+        for _, u, v in ops:
+            delta ^= _edge_hash(u, v)
+
+        version = len(self._versions)
+        self._versions.append(_Version(self.version, ops, parent.depth + 1, delta))
+        parent.child = version
+        dag = nx.freeze(dag)
+        if (parent.depth + 1) % SNAPSHOT_EVERY == 0:
+            self._snapshots[version] = dag
+        self._remember(version, dag)
+        self.version = version
+        logger.info(f"Edit history: version {version} ({self.describe(version)}).")
+        return dag
+
+    def undo(self) -> nx.DiGraph:
+        if self.can_undo:
+            self.version = self._versions[self.version].parent
+        return self.graph
+
+    def redo(self) -> nx.DiGraph:
+        if self.can_redo:
+            self.version = self._versions[self.version].child
+        return self.graph
+
+    def checkout(self, version: int) -> nx.DiGraph:
+        if not 0 <= version < len(self._versions):
+            raise IndexError(f"No version {version} in the edit history.")
+        self.version = version
+        return self.graph
+
+    def materialize(self, version: int) -> nx.DiGraph:
+        """The graph of 'version', replayed from its closest built ancestor if needed."""
+        graph = self._materialized.get(version)
+        if graph is not None:
+            self._materialized.move_to_end(version)
+            return graph
+
+        # 1) Walk up to a built version (a snapshot at worst), collecting the edits
+        path, v = [], version
+        while v not in self._materialized and v not in self._snapshots:
+            path.append(self._versions[v].ops)
+            v = self._versions[v].parent
+        start = self._materialized.get(v, self._snapshots.get(v))
+
+        # 2) Replay them on a copy, every version has the loaded DAG's labels
+        graph = start.copy()
+        for ops in reversed(path):
+            for action, u, w in ops:
+                if action == ADD:
+                    graph.add_edge(u, w)
+                else:
+                    graph.remove_edge(u, w)
+        graph = nx.freeze(graph)
+        self._remember(version, graph)
+        return graph
+
+    def label(self, name):
+        """'name' (in any label form) as the loaded DAG spells it."""
+        return self._names.get(labels.label(name, PASCAL), name)
+
+    def _remember(self, version, graph):
+        self._materialized[version] = graph
+        self._materialized.move_to_end(version)
+        while len(self._materialized) > MAX_MATERIALIZED:
+            self._materialized.popitem(last=False)
+
+    def describe(self, version: int = None) -> str:
+        ops = self._versions[self.version if version is None else version].ops
+        if not ops:
+            return "loaded DAG"
+        if len(ops) == 1:
+            action, u, v = ops[0]
+            return f"{'+' if action == ADD else '-'} {u} -> {v}"
+        added = sum(1 for op in ops if op[0] == ADD)
+        return f"batch: +{added} / -{len(ops) - added} edges"
+
+    def get_result(self, kind: str, params, version: int = None):
+        """Cached result of 'kind' (e.g. "summary") for 'params' on the version's DAG, or None."""
+        key = (self._versions[self.version if version is None else version].delta, kind, params)
+        value = self._results.get(key)
+        if value is not None:
+            self._results.move_to_end(key)
+        return value
+
+    def put_result(self, kind: str, params, value, version: int = None):
+        key = (self._versions[self.version if version is None else version].delta, kind, params)
+        self._results[key] = value
+        self._results.move_to_end(key)
+        while len(self._results) > MAX_RESULTS:
+            self._results.popitem(last=False)
+        return value
+
+
+def get_edit_history():
+    """
+    The session's edit history of its original DAG, started on first use and
+    restarted whenever a different DAG was loaded. None without an original DAG.
+    """
+    dag = st.session_state.get("original_dag")
+    if dag is None:
+        return None
+    history = st.session_state.get("edit_history")
+    if history is None or history.graph is not dag:
+        history = st.session_state.edit_history = EditHistory(dag)
+    return history
+
+
+def summary_params() -> tuple:
+    """The parameters a summary of the original DAG is cached under."""
+    return st.session_state.size_constraint, st.session_state.semantic_threshold, st.session_state.partitioned
+
+
+def show_version(history: EditHistory):
+    """
+    Make the history's current version the session's original DAG, with the
+    summary cached for it (under the current parameters), if any. A maintained
+    topological order of another version (e.g. before an undo) is dropped.
+    """
+    st.session_state.original_dag = history.graph
+    topo = st.session_state.get("topo_order")
+    if topo is not None and topo.key != history.key:
+        st.session_state.topo_order = None
+    release_in_session("original_dag")
+    summary = history.get_result("summary", summary_params())
+    st.session_state.summarized_dag = share_in_session("summarized_dag", summary)
@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Concurrent heavy jobs across all sessions; PC spreads large levels over processes itself.
+JOB_WORKERS = int(os.environ.get("DAG_JOB_WORKERS", "4"))
+# How often a session polls its running jobs.
+POLL_SECONDS = 1.0
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by its progress callback once cancellation was requested."""
+
+
+class Job:
+    """
+    A background computation owned by one session. The function runs on the
+    shared executor and receives 'progress=job.report'; it must not touch
+    st.session_state - its result is picked up by the session's next poll.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.fraction = None
+        self.message = "Queued"
+        self.started = time.monotonic()
+        self.future = None
+        self._cancel = threading.Event()
+
+    def report(self, fraction=None, message: str = ""):
+        """Progress callback handed to the job; also where cancellation takes effect."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+        self.fraction = fraction
+        self.message = message
+
+    def cancel(self):
+        self._cancel.set()
+        self.future.cancel()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "cancelling" if self._cancel.is_set() else "running"
+        if self.future.cancelled():
+            return "cancelled"
+        error = self.future.exception()
+        if isinstance(error, JobCancelled):
+            return "cancelled"
+        return "failed" if error is not None else "done"
+
+    def result(self):
+        return self.future.result()
+
+    def error(self):
+        return self.future.exception()
+
+
+@st.cache_resource
+def get_job_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="dag-job")
+
+
+def _session_jobs() -> dict:
+    return st.session_state.setdefault("_jobs", {})
+
+
+def submit_job(slot: str, fn, *args, **kwargs) -> Job:
+    """
+    Run fn(*args, progress=..., **kwargs) in the background as the session's
+    job for 'slot' (e.g. "discovery", "summary"). A job already running in
+    that slot is cancelled first.
+    """
+    jobs = _session_jobs()
+    previous = jobs.get(slot)
+    if previous is not None and previous.status in ("running", "cancelling"):
+        previous.cancel()
+
+    job = Job(slot)
+    job.future = get_job_executor().submit(fn, *args, progress=job.report, **kwargs)
+    jobs[slot] = job
+    logger.info(f"Submitted background job '{slot}'.")
+    return job
+
+
+def get_job(slot: str):
+    return _session_jobs().get(slot)
+
+
+def pop_job(slot: str):
+    return _session_jobs().pop(slot, None)
+
+
+def job_progress_panel(slot: str, title: str, on_finish):
+    """
+    Poll the session's job for 'slot' without blocking the page: a fragment
+    re-runs every POLL_SECONDS to refresh the progress bar and cancel button.
+    Once the job has finished, on_finish(job) is called and the whole app reruns.
+    """
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def _panel():
+        job = get_job(slot)
+        if job is None:
+            return
+        if job.status in ("running", "cancelling"):
+            label = f"{title}: {job.message} ({job.elapsed:.0f}s)"
+            st.progress(job.fraction if job.fraction is not None else 0.0, text=label)
+            if st.button("Cancel", key=f"cancel_job_{slot}", disabled=job.cancel_requested):
+                job.cancel()
+            return
+
+        pop_job(slot)
+        on_finish(job)
+        st.rerun()
+
+    _panel()
@@ -1,10 +1,12 @@
 import streamlit as st
-import time
-from streamlit_lottie import st_lottie_spinner
 from dag_display.display_dag import display_dag_column
 from utils.graph_utils import (load_dag_from_file,
                                generate_dag_from_dataset,
+                               generate_dag_from_stream,
                                summarize_dag)
+from core.shared_store import share_in_session
+from core.jobs import submit_job, get_job, job_progress_panel
+from core.edit_history import get_edit_history, summary_params
 
 def render_main_header(logo_path: str, title_text: str):
     col1, col2 = st.columns([1, 7])  # Adjust ratio as desired
@@ -37,31 +39,85 @@ def render_main_header(logo_path: str, title_text: str):
     * **Summarize** with CaGreS, then compute causal effect.
     """)
 
+def _loading_spinner():
+    # streamlit_lottie pulls in requests; only load it once a spinner is shown
+    from streamlit_lottie import st_lottie_spinner
+    return st_lottie_spinner(st.session_state.loading_animation, height=500, quality='high')
+
+def _set_original_dag(dag):
+    # Identical DAGs (same dataset and alpha, same file) are shared between sessions
+    st.session_state.original_dag = share_in_session("original_dag", dag)
+    st.session_state.topo_order = None
+
+def _finish_discovery(job):
+    if job.status == "done":
+        dag, st.session_state.pvalue_store = job.result()
+        _set_original_dag(dag)
+        st.toast("Generated Causal DAG successfully!")
+    elif job.status == "failed":
+        st.session_state.discovery_error = f"Causal discovery failed: {job.error()}"
+
+def _finish_summary(job):
+    history, version, params = st.session_state.pop("summary_request", (None, None, None))
+    if job.status == "done" and history is not None and job.result():
+        history.put_result("summary", params, job.result(), version=version)
+        if history is not get_edit_history() or history.version != version:
+            # The DAG was edited meanwhile: keep the summary for when its version comes back
+            st.toast(f"Summary of DAG version {version} cached.")
+            return
+    if job.status == "done":
+        st.session_state.summarized_dag = share_in_session("summarized_dag", job.result())
+        if st.session_state.summarized_dag:
+            st.toast("Summarized DAG successfully!")
+        elif params and params[2]:
+            st.session_state.summary_error = ("Could not summarize DAG with given constraints! In partitioned mode "
+                                              "no merge across the partitions could reach the size constraint, "
+                                              "try without it.")
+        else:
+            st.session_state.summary_error = "Could not summarize DAG with given constraints!"
+    elif job.status == "failed":
+        st.session_state.summary_error = f"Summarization failed: {job.error()}"
+
 def layout_main_columns():
     c1, c2 = st.columns([1, 1])
     with c1:
         if st.session_state.generate_button:
-            with st_lottie_spinner(st.session_state.loading_animation, height=500, quality='high'):
-                if st.session_state.generation_type == "dataset":
-                    st.session_state.original_dag = generate_dag_from_dataset(st.session_state.df, alpha=st.session_state.alpha)
-                else:
-                    time.sleep(4)
-                    st.session_state.original_dag = load_dag_from_file(st.session_state.dag_file)
+            st.session_state.generate_button = False
+            if st.session_state.generation_type == "dataset":
+                # PC can take minutes: run it in the background, the page stays interactive;
+                # a spooled .csv/.parquet upload (a path) is read chunk by chunk
+                discover = generate_dag_from_stream if isinstance(st.session_state.df, str) else generate_dag_from_dataset
+                submit_job("discovery", discover, st.session_state.df,
+                           alpha=st.session_state.alpha, store=st.session_state.pvalue_store)
+            else:
+                with _loading_spinner():
+                    _set_original_dag(load_dag_from_file(st.session_state.dag_file))
                 st.toast("Generated Causal DAG successfully!")
-                st.session_state.generate_button = False
                 st.rerun()
-        else:
-            display_dag_column("Original Causal DAG", st.session_state.original_dag, is_original=True)
+
+        if get_job("discovery") is not None:
+            job_progress_panel("discovery", "Discovering causal DAG", _finish_discovery)
+        if st.session_state.get("discovery_error"):
+            st.error(st.session_state.pop("discovery_error"))
+        display_dag_column("Original Causal DAG", st.session_state.original_dag, is_original=True)
 
     with c2:
         if st.session_state.summarize_button:
-            with st_lottie_spinner(st.session_state.loading_animation, height=500, quality='high'):
-                st.session_state.summarized_dag = summarize_dag()
-                if st.session_state.summarized_dag:
-                    st.toast("Summarized DAG successfully!")
-                    st.session_state.summarize_button = False
-                    time.sleep(2)
-                    st.rerun()
-            st.warning("Could not summarize DAG with given constraints!")
-        else:
-            display_dag_column("Summarized Causal DAG", st.session_state.summarized_dag, is_original=False)
+            st.session_state.summarize_button = False
+            # A version summarized before with these parameters is served from its cache
+            history, params = get_edit_history(), summary_params()
+            cached = history.get_result("summary", params)
+            if cached is not None:
+                st.session_state.summarized_dag = share_in_session("summarized_dag", cached)
+                st.toast("Summarized DAG served from this version's cache.")
+            else:
+                st.session_state.summary_request = (history, history.version, params)
+                submit_job("summary", summarize_dag, st.session_state.original_dag,
+                           st.session_state.size_constraint, st.session_state.semantic_threshold,
+                           partitioned=st.session_state.partitioned)
+
+        if get_job("summary") is not None:
+            job_progress_panel("summary", "Summarizing", _finish_summary)
+        if st.session_state.get("summary_error"):
+            st.warning(st.session_state.pop("summary_error"))
+        display_dag_column("Summarized Causal DAG", st.session_state.summarized_dag, is_original=False)
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 from utils.lottie_loader import get_animation_data
+from core.shared_store import share_in_session
 
 def initialize_session_state():
     if "original_dag" not in st.session_state:
@@ -13,6 +14,8 @@ def initialize_session_state():
         st.session_state.size_constraint = 5
     if "semantic_threshold" not in st.session_state:
         st.session_state.semantic_threshold = 0.5
+    if "partitioned" not in st.session_state:
+        st.session_state.partitioned = False
     if "df" not in st.session_state:
         st.session_state.df = None
     if "generate_button" not in st.session_state:
@@ -25,6 +28,13 @@ def initialize_session_state():
         st.session_state.generation_type = None
     if "loading_animation" not in st.session_state:
         animation_path = os.path.abspath("loading_animation.json")
-        st.session_state.loading_animation = get_animation_data(animation_path)
+        st.session_state.loading_animation = share_in_session(
+            "loading_animation", key=f"lottie:{animation_path}", factory=lambda: get_animation_data(animation_path))
     if "summarize_button" not in st.session_state:
         st.session_state.summarize_button = False
+    if "pvalue_store" not in st.session_state:
+        st.session_state.pvalue_store = None
+    if "original_positions" not in st.session_state:
+        st.session_state.original_positions = None
+    if "topo_order" not in st.session_state:
+        st.session_state.topo_order = None
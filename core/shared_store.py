@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import networkx as nx
+import streamlit as st
+
+from algorithms.discovery import dataset_fingerprint
+from utils.graph_serialization import dumps_graph
+
+logger = logging.getLogger(__name__)
+
+# Idle entries (no live handle) are evicted oldest-first above this budget.
+DEFAULT_BUDGET_MB = int(os.environ.get("DAG_SHARED_STORE_MB", "1024"))
+# Rough per node/edge footprint of a networkx DiGraph (dicts of dicts).
+GRAPH_BYTES_PER_ELEMENT = 400
+
+
+def _is_frame(value) -> bool:
+    # pandas is only imported once a dataset is loaded; before that nothing can be a DataFrame
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, pd.DataFrame)
+
+
+def content_key(value) -> str:
+    """Content hash of a dataset, graph, array, JSON document or raw bytes."""
+    if _is_frame(value):
+        return "frame:" + dataset_fingerprint(value)
+    if isinstance(value, nx.Graph):
+        return "graph:" + hashlib.sha1(dumps_graph(value)).hexdigest()
+    if isinstance(value, np.ndarray):
+        h = hashlib.sha1(f"{value.dtype}{value.shape}".encode("utf-8"))
+        h.update(np.ascontiguousarray(value).tobytes())
+        return "array:" + h.hexdigest()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes:" + hashlib.sha1(value).hexdigest()
+    return "json:" + hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estimate_nbytes(value) -> int:
+    if _is_frame(value):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, nx.Graph):
+        return GRAPH_BYTES_PER_ELEMENT * (value.number_of_nodes() + value.number_of_edges())
+    if isinstance(value, np.ndarray) or hasattr(value, "nbytes"):
+        # Arrays, and objects that size themselves (e.g. algorithms.semantic_index.SemanticIndex)
+        return int(value.nbytes)
+    return len(json.dumps(value))
+
+
+def _resizes(value) -> bool:
+    # Objects that size themselves may grow after insertion (e.g. a SemanticIndex filling its caches)
+    return hasattr(value, "nbytes") and not isinstance(value, np.ndarray)
+
+
+def make_read_only(value):
+    """
+    Guard a shared value against in-place writes: graphs are frozen (any edit
+    raises) and the NumPy arrays behind frames are marked non-writeable.
+    Consumers that need to modify a shared value work on a copy.
+    """
+    if isinstance(value, nx.Graph):
+        nx.freeze(value)
+    elif _is_frame(value):
+        for block in value._mgr.blocks:
+            if isinstance(block.values, np.ndarray):
+                block.values.flags.writeable = False
+    elif isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    return value
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "refs")
+
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+        self.refs = 0
+
+
+class StoreHandle:
+    """
+    A session's reference to a shared entry. The entry stays pinned while the
+    handle is alive; release() - or garbage collection of the handle, e.g. when
+    the session's state is dropped - unpins it.
+    """
+    __slots__ = ("key", "value", "_finalizer", "__weakref__")
+
+    def __init__(self, store, key, value):
+        self.key = key
+        self.value = value
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    def release(self):
+        self.value = None
+        self._finalizer()
+
+
+class SharedStore:
+    """
+    Process-wide, reference-counted store of immutable datasets and graphs,
+    keyed by content hash, so sessions working on the same data share one copy.
+    Derived objects keyed by their inputs (get_or_create) share its budget.
+    """
+
+    def __init__(self, budget_mb: int = DEFAULT_BUDGET_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_or_create(self, key: str, factory) -> StoreHandle:
+        """
+        Handle on the entry under 'key', building it with factory() only if it is
+        not stored yet (the factory runs outside the lock; a racing duplicate is dropped).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._acquire(key, entry)
+        value = factory()
+        return self._insert(key, value)
+
+    def put(self, value, key: str = None) -> StoreHandle:
+        """Store 'value' under its content hash; an equal stored value is reused instead."""
+        if key is None:
+            key = content_key(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._acquire(key, entry)
+        return self._insert(key, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "pinned": sum(1 for e in self._entries.values() if e.refs > 0),
+                "nbytes": self._nbytes,
+                "budget": self.budget,
+            }
+
+    def _insert(self, key, value):
+        # Measured before freezing: pandas cannot size read-only object columns
+        nbytes = estimate_nbytes(value)
+        make_read_only(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(value, nbytes)
+                self._entries[key] = entry
+                self._nbytes += entry.nbytes
+                logger.debug(f"Shared store: added {key} ({entry.nbytes} bytes).")
+            handle = self._acquire(key, entry)
+            self._evict()
+            return handle
+
+    def _acquire(self, key, entry):
+        entry.refs += 1
+        self._entries.move_to_end(key)
+        return StoreHandle(self, key, entry.value)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+                self._evict()
+
+    def _remeasure(self, entry):
+        # Charge a self-sizing entry what it holds now, e.g. once a run has filled its caches
+        if _resizes(entry.value):
+            nbytes = estimate_nbytes(entry.value)
+            self._nbytes += nbytes - entry.nbytes
+            entry.nbytes = nbytes
+
+    def _evict(self):
+        # 1) Charge self-sizing entries what they hold now; only entries nobody
+        #    holds are candidates, least recently used first
+        for entry in self._entries.values():
+            self._remeasure(entry)
+        if self._nbytes <= self.budget:
+            return
+        for key in [k for k, e in self._entries.items() if e.refs == 0]:
+            entry = self._entries.pop(key)
+            self._nbytes -= entry.nbytes
+            logger.debug(f"Shared store: evicted {key} ({entry.nbytes} bytes).")
+            if self._nbytes <= self.budget:
+                return
+
+
+@st.cache_resource
+def get_shared_store() -> SharedStore:
+    return SharedStore()
+
+
+def share_in_session(slot: str, value=None, key: str = None, factory=None):
+    """
+    Keep the session's value for 'slot' in the shared store and return the
+    shared (read-only) copy to assign into session_state. Pass either a value
+    (keyed by its content hash) or a key plus a factory that builds it on a miss.
+    The session's previous handle for the slot is released.
+    """
+    handles = st.session_state.setdefault("_shared_handles", {})
+    previous = handles.pop(slot, None)
+
+    if value is None and factory is None:
+        handle = None
+    elif factory is not None:
+        handle = get_shared_store().get_or_create(key, factory)
+    else:
+        handle = get_shared_store().put(value, key)
+
+    if handle is not None:
+        handles[slot] = handle
+    if previous is not None:
+        previous.release()
+    return handle.value if handle is not None else None
+
+
+def release_in_session(slot: str) -> None:
+    """Drop the session's handle for 'slot', e.g. once it holds a private edited copy."""
+    handle = st.session_state.get("_shared_handles", {}).pop(slot, None)
+    if handle is not None:
+        handle.release()
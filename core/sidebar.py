@@ -1,27 +1,33 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 from annotated_text import annotated_text
-import pandas as pd
-import time
+import io
+import os
 import logging
 import Utils
 from algorithms import algo
+from algorithms.conditions import ConditionError
+from algorithms.graph_ops import get_topological_order
+from utils.node_labels import labels, PASCAL
+from core.shared_store import share_in_session, release_in_session, content_key
+from utils.chunked_io import spool_upload
+from core.edit_history import get_edit_history
+from core.jobs import submit_job, get_job, job_progress_panel
+from algorithms.sweep import parameter_sweep, parameter_range
+from algorithms.partition import PARTITION_MIN_NODES
 
 logger = logging.getLogger(__name__)
 
-TOKEN_PATTERN = r"""
-        (?P<LPAREN>\() |
-        (?P<RPAREN>\)) |
-        (?P<NOT>NOT\b) |
-        (?P<AND>AND\b) |
-        (?P<OR>OR\b) |
-        (?P<COND>(?P<NODE>[A-Za-z0-9_]+)\s*(?P<OP>==|!=|<=|>=|<|>)\s*(?P<VAL>("[^"]*"|'[^']*'|[A-Za-z0-9_.]+)))
-    """
-
 ALPHA_USAGE = "Significance level for PC discovery algorithm $s.t\ \\boldsymbol{\\alpha} \\propto \\textbf{|E|}$"
 SIZE_USAGE  = "Set a size constarint $S\ s.t\quad |V_s| \leq S$ where $G_s \equiv (V_s,E_s)$"
 SIMILARITY_USAGE = "Set a threshold $s.t\quad  \\forall u,v \\in G\quad u,v \\in G_s \\iff sim(u,v) \geq threshold$ "
 GEN_USAGE = "Generates the DAG represented by the uploaded dataset"
+SWEEP_USAGE = "Summarize every combination of the size and threshold ranges in parallel and compare the results"
+DRIFT_USAGE = "Also estimate the ATE on every summary and its difference from the ATE on the original DAG"
+DATASET_USAGE = ("A pickled DataFrame is loaded in memory; .csv and .parquet files are streamed in chunks, "
+                 "for datasets larger than memory")
+PARTITION_USAGE = ("Summarize the DAG partition by partition in parallel, then merge across the partitions. "
+                   "Much faster on very large DAGs, but the summary can differ from the full CaGreS one")
 
 async def display_sidebar():
     with st.sidebar:
@@ -31,7 +37,8 @@ async def display_sidebar():
             ["1. Upload/Generate DAG", "2. Configuration", "3. Compute Causal Effect"],
             icons=["cloud-upload", "gear", "calculator"],
             menu_icon="cast",
-            default_index=0
+            default_index=0,
+            key="main_menu"
         )
 
         # Conditionally show expanders below the menu
@@ -46,21 +53,66 @@ async def display_sidebar():
             with st.expander("Compute Causal Effect", expanded=True):
                 await sidebar_compute_causal_effects()
 
+# Example inputs shipped with the app, offered next to the uploaders.
+EXAMPLES_DIR = os.path.abspath("data")
+
+
+class BundledFile:
+    """A file from EXAMPLES_DIR, with the parts of streamlit's UploadedFile the app uses."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.file_id = f"example:{name}"
+
+    def getvalue(self) -> bytes:
+        with open(os.path.join(EXAMPLES_DIR, self.name), "rb") as f:
+            return f.read()
+
+
+def _bundled_example(label: str, suffixes: tuple, key: str):
+    """Selectbox of the bundled files with these suffixes; the chosen one as a BundledFile, or None."""
+    names = sorted(n for n in os.listdir(EXAMPLES_DIR) if n.endswith(suffixes)) if os.path.isdir(EXAMPLES_DIR) else []
+    name = st.selectbox(label, ["None"] + names, key=key)
+    return BundledFile(name) if name != "None" else None
+
+
 def reset_summary_dag():
         st.session_state.summarized_dag = None
+        release_in_session("summarized_dag")
 
 def sidebar_upload_or_generate_dag():
     # 1) Handling DAG input
-    st.session_state.dag_file = st.file_uploader("Upload Causal DAG:", type=["dot"])
+    # An upload takes precedence over the chosen example; Refresh clears the choices
+    if st.session_state.pop("reset_examples", False):
+        st.session_state.example_dag = st.session_state.example_dataset = "None"
+    dag_upload = st.file_uploader("Upload Causal DAG:", type=["dot"])
+    dag_example = _bundled_example("Or Use an Example DAG:", (".dot",), key="example_dag")
+    st.session_state.dag_file = dag_upload or dag_example
     
     # 2) Handling dataset input
-    dataset_pkl_file  = st.file_uploader("Upload Dataset:", type=["pkl"])
-    if dataset_pkl_file:
+    dataset_upload = st.file_uploader("Upload Dataset:", type=["pkl", "csv", "parquet"], help=DATASET_USAGE)
+    dataset_example = _bundled_example("Or Use an Example Dataset:", (".pkl", ".csv", ".parquet"),
+                                       key="example_dataset")
+    dataset_pkl_file = dataset_upload or dataset_example
+    if dataset_pkl_file and dataset_pkl_file.file_id != st.session_state.get("df_upload_id"):
         try:
-            st.session_state.df = pd.read_pickle(dataset_pkl_file)
+            import pandas as pd
+
+            data = dataset_pkl_file.getvalue()
+            suffix = os.path.splitext(dataset_pkl_file.name)[1].lower()
+            if suffix in (".csv", ".parquet"):
+                # Never loaded whole: discovery and estimates stream it from disk (utils.chunked_io)
+                release_in_session("df")
+                st.session_state.df = spool_upload(data, suffix)
+            else:
+                # Sessions uploading the same file share one read-only frame
+                st.session_state.df = share_in_session("df", key=content_key(data),
+                                                       factory=lambda: pd.read_pickle(io.BytesIO(data)))
+            st.session_state.df_upload_id = dataset_pkl_file.file_id
             st.toast("Dataset uploaded successfully!", icon='😍')
         except Exception as e:
             st.session_state.df = None
+            st.session_state.df_upload_id = None
             st.error(f"Please upload a valid .pkl file for dataset!: {e}")
             logger.exception("Exception occurred while loading DOT file: %s", e)
             return
@@ -72,26 +124,32 @@ def sidebar_upload_or_generate_dag():
             "Genrate DAG From:",
             ["dataset", ".dot file"],
             horizontal=True,
+            key="generate_from",
             help="Choose which input should be used for DAG generation"
         )
 
         if st.button("Refresh"):
             st.session_state.original_dag = None
             st.session_state.summarized_dag = None
+            st.session_state.topo_order = None
             st.session_state.df = None
+            st.session_state.df_upload_id = None
+            for slot in ("original_dag", "summarized_dag", "df"):
+                release_in_session(slot)
             st.session_state.dag_file = None
+            st.session_state.reset_examples = True
+            st.session_state.edit_history = None
             st.toast("DAG has been reset.")
-            time.sleep(0.7)
             st.rerun()
         
 
     with c2:
-        gen_btn = st.button("Generate DAG", help=GEN_USAGE)
+        gen_btn = st.button("Generate DAG", help=GEN_USAGE, key="generate_dag")
         st.session_state.alpha = st.slider("$\\alpha$:", min_value=0.01, value=0.5, max_value=0.99, step=0.01,
                                             on_change=reset_summary_dag, help=ALPHA_USAGE) 
         if gen_btn:
             if st.session_state.generation_type == "dataset" and st.session_state.df is None:
-                st.toast("Please upload a .PKL dataset before choosing this option.")
+                st.toast("Please upload a dataset (.pkl, .csv or .parquet) before choosing this option.")
                 return
             elif st.session_state.generation_type == ".dot file" and st.session_state.dag_file is None:
                 st.toast("Please upload a .DOT file before choosing this option.")
@@ -109,16 +167,91 @@ def sidebar_configuration():
         st.session_state.semantic_threshold = st.slider(
             "Semantic Similarity Threshold:", 0.0, 1.0, 0.5, 0.05, on_change=reset_summary_dag, help=SIMILARITY_USAGE
         )
+        # Offered by default only for DAGs too large for the full search to stay interactive
+        st.session_state.partitioned = st.checkbox(
+            "Partitioned Summary", value=len(st.session_state.original_dag) > PARTITION_MIN_NODES,
+            on_change=reset_summary_dag, help=PARTITION_USAGE
+        )
+        st.divider()
+        sidebar_parameter_sweep()
     else:
         st.info("Please upload/generate a DAG to configure summarization.")
 
 
+def _finish_sweep(job):
+    history, version, partitioned = st.session_state.pop("sweep_request", (None, None, None))
+    if job.status == "done" and history is not None:
+        table, summaries = job.result()
+        history.put_result("sweep", None, table, version=version)
+        # Every swept summary is also the cached summary of its parameters for that DAG version
+        for (k, thr), summary in summaries.items():
+            history.put_result("summary", (k, thr, partitioned), summary, version=version)
+    elif job.status == "failed":
+        st.session_state.sweep_error = f"Parameter sweep failed: {job.error()}"
+
+
+def sidebar_parameter_sweep():
+    st.markdown("**Parameter Sweep**")
+    k_max = max(2, min(50, st.session_state.original_dag.number_of_nodes()))
+    k_range = st.slider("Size Constraints:", 1, k_max, (min(2, k_max), min(10, k_max)), key="sweep_k",
+                        help=SWEEP_USAGE)
+    k_step = st.number_input("Size Step:", min_value=1, value=1, key="sweep_k_step")
+    thr_range = st.slider("Similarity Thresholds:", 0.0, 1.0, (0.3, 0.7), 0.05, key="sweep_thr")
+    thr_step = st.number_input("Threshold Step:", min_value=0.05, max_value=1.0, value=0.1, step=0.05,
+                               key="sweep_thr_step")
+    ks = parameter_range(k_range[0], k_range[1], k_step)
+    thresholds = parameter_range(thr_range[0], thr_range[1], thr_step)
+
+    ate_query = None
+    if st.session_state.df is not None and st.checkbox("ATE drift", key="sweep_ate", help=DRIFT_USAGE):
+        nodes_list = list(Utils.convert_nodes_snake_to_pascal_case(st.session_state.original_dag).nodes)
+        treatment_node = st.selectbox("Treatment:", nodes_list, key="sweep_treatment")
+        condition_input = st.text_input("Treatment Condition:", key="sweep_condition",
+                                        placeholder="e.g. NumColumns == 4 or NumColumns <= 5")
+        outcome_node = st.selectbox("Outcome:", nodes_list, key="sweep_outcome")
+        ate_query = (treatment_node, condition_input, outcome_node)
+
+    if st.button(f"Run Sweep ({len(ks) * len(thresholds)} summaries)", key="sweep_button"):
+        condition_res, condition_error = (True, None)
+        if ate_query is not None:
+            condition_res, condition_error = Utils.is_valid_condition(ate_query[1], nodes_list)
+        if not condition_res:
+            st.error("Invalid logic condition. " + condition_error)
+        else:
+            history = get_edit_history()
+            st.session_state.sweep_request = (history, history.version, st.session_state.partitioned)
+            submit_job("sweep", parameter_sweep, st.session_state.original_dag, ks, thresholds,
+                       df=st.session_state.df if ate_query else None, ate_query=ate_query,
+                       partitioned=st.session_state.partitioned)
+
+    if get_job("sweep") is not None:
+        job_progress_panel("sweep", "Sweeping", _finish_sweep)
+    if st.session_state.get("sweep_error"):
+        st.error(st.session_state.pop("sweep_error"))
+
+    # The last sweep of the displayed DAG version
+    table = get_edit_history().get_result("sweep", None)
+    if table is not None:
+        st.dataframe(table, hide_index=True)
+        st.caption("Cost (edges added once grounded) per size and threshold:")
+        st.dataframe(table.pivot(index="k", columns="threshold", values="cost"))
+
+
 async def sidebar_compute_causal_effects():
-    def compute(graph):
+    def compute(graph, estimator=algo.estimate_binary_treatment_effect, graph_key="original", **kwargs):
         df = st.session_state.df
-        estimate_res = algo.estimate_binary_treatment_effect(df, treatment_node, condition_input, outcome_node, graph)
+        # Estimates are cached with the DAG version, per dataset and query
+        history = get_edit_history()
+        params = (graph_key, st.session_state.get("df_upload_id"), treatment_node, condition_input.strip(), outcome_node)
+        estimate_res = history.get_result("ate", params)
+        if estimate_res is None:
+            try:
+                estimate_res = estimator(df, treatment_node, condition_input, outcome_node, graph, **kwargs)
+            except ConditionError as e:
+                st.error(f"Invalid logic condition. {e}")
+                return None, None
+            history.put_result("ate", params, estimate_res)
                 
-        time.sleep(1)
         if estimate_res == (-1, -1):
             st.error(f"There is no direct path between {treatment_node} to {outcome_node}")
             return None, None
@@ -142,32 +275,35 @@ async def sidebar_compute_causal_effects():
     G = Utils.convert_nodes_snake_to_pascal_case(G)
     graphs = [G]
     if st.session_state.summarized_dag is not None:
-        summary_dag = st.session_state.summarized_dag
-        H = algo.get_grounded_dag(summary_dag)
-        H = Utils.convert_nodes_snake_to_pascal_case(H)
-        graphs.append(H)
+        # The summary is identified at the cluster level, without grounding it
+        summary_dag = Utils.convert_nodes_snake_to_pascal_case(st.session_state.summarized_dag)
+        # The maintained order is the session DAG's (in its own labels), the summary path uses PascalCase
+        topo = get_topological_order(st.session_state.original_dag, get_edit_history().key)
+        ranks = {labels.label(n, PASCAL): rank for n, rank in topo.ranks().items()}
+        graphs.append(summary_dag)
         
 
     # 3) Treatment
     nodes_list = list(G.nodes)
-    treatment_node = st.selectbox("Select Treatment (Binary):", nodes_list)
+    treatment_node = st.selectbox("Select Treatment (Binary):", nodes_list, key="ate_treatment")
 
     condition_input = st.text_input(
         "Enter logic condition for the Treatment Node:",
         value="",
-        placeholder="e.g. NumColumns == 4 or NumColumns <= 5"
+        placeholder="e.g. NumColumns == 4 or NumColumns <= 5",
+        key="ate_condition"
     )
 
     # 4) Outcome Selection
-    outcome_node = st.selectbox("Select Outcome:", nodes_list)
+    outcome_node = st.selectbox("Select Outcome:", nodes_list, key="ate_outcome")
 
 
     # 5) Compute Button
-    if st.button("Compute ATE", type='primary'):
-        condition_res = Utils.is_valid_condition(condition_input, treatment_node)[0]
+    if st.button("Compute ATE", type='primary', key="compute_ate"):
+        condition_res, condition_error = Utils.is_valid_condition(condition_input, nodes_list)
         if not condition_res:
             st.error(
-                "Invalid logic condition. " + str(condition_res)
+                "Invalid logic condition. " + condition_error
             )
         else:
             progress_text = "Calculating ATE. Please wait..."
@@ -185,7 +321,8 @@ async def sidebar_compute_causal_effects():
                 # summary graph
                 if len(graphs) > 1:
                     annotated_text(("Results:", "Summarized DAG"))
-                    mean_val, stat_significance = compute(graph=graphs[1])
+                    mean_val, stat_significance = compute(graphs[1], algo.estimate_binary_treatment_effect_on_summary,
+                                                          graph_key=content_key(summary_dag), ranks=ranks)
                     if mean_val:
                         st.success(f"Mean Value: {mean_val}")
                         if stat_significance:
@@ -0,0 +1,105 @@
+import os
+import logging
+import streamlit as st
+import networkx as nx
+import streamlit.components.v1 as components
+from utils.visualization import node_style, network_options, bundled_edges
+from utils.graph_layout import HIDE_LABELS_NODES, BUNDLE_EDGES_EDGES
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+EDGE_ID_SEPARATOR = "→"
+
+# Served once per browser session; every rerun afterwards only ships a small message.
+_dag_view = components.declare_component("dag_view", path=FRONTEND_DIR)
+
+
+def graph_snapshot(G: nx.DiGraph, original_dag: bool, color_map=None, positions=None) -> dict:
+    """
+    Everything the dag_view frontend draws, keyed by stable ids so two snapshots can be diffed:
+      nodes   : node id -> vis.js node attributes (bundle junctions included)
+      edges   : edge id -> vis.js edge attributes (bundle segments instead of the bundled edges)
+      options : vis.js network options (default edge styling included)
+    """
+    fixed = positions is not None
+    hide_labels = fixed and G.number_of_nodes() > HIDE_LABELS_NODES
+    bundle_edges = fixed and G.number_of_edges() > BUNDLE_EDGES_EDGES
+    nodes = {n: {"id": n, **node_style(n, original_dag, color_map, positions, hide_labels)} for n in G.nodes}
+    if bundle_edges:
+        junctions, segments = bundled_edges(G, positions)
+        nodes.update((j, {"id": j, **style}) for j, style in junctions.items())
+    else:
+        segments = {(u, v): {} for u, v in G.edges}
+    edges = {f"{u}{EDGE_ID_SEPARATOR}{v}": {"id": f"{u}{EDGE_ID_SEPARATOR}{v}", "from": u, "to": v, **style}
+             for (u, v), style in segments.items()}
+    return {"nodes": nodes, "edges": edges, "options": network_options(fixed, bundle_edges)}
+
+
+def graph_delta(old: dict, new: dict):
+    """
+    The changes turning snapshot 'old' into 'new', or None when the options differ
+    (a layout mode switch touches every node, so a full snapshot is cheaper to apply).
+    """
+    if old["options"] != new["options"]:
+        return None
+    old_nodes, new_nodes = old["nodes"], new["nodes"]
+    old_edges, new_edges = old["edges"], new["edges"]
+    # A restyled edge (e.g. a bundle trunk carrying one more edge) is removed and added again
+    return {
+        "remove_edges": [e for e, spec in old_edges.items() if new_edges.get(e) != spec],
+        "remove_nodes": [n for n in old_nodes if n not in new_nodes],
+        "update_nodes": [spec for n, spec in new_nodes.items() if old_nodes.get(n) != spec],
+        "add_edges": [spec for e, spec in new_edges.items() if old_edges.get(e) != spec],
+    }
+
+
+def _full_message(snapshot: dict, version: int) -> dict:
+    return {
+        "kind": "full",
+        "version": version,
+        "options": snapshot["options"],
+        "nodes": list(snapshot["nodes"].values()),
+        "edges": list(snapshot["edges"].values()),
+    }
+
+
+def dag_view(G: nx.DiGraph, key: str, original_dag: bool, color_map=None, positions=None, height: int = 620):
+    """
+    Draw G in a persistent vis-network component.
+
+    The first render (and any resync) ships the whole graph; later reruns only
+    ship the delta against the previous snapshot, tagged with base_version/version.
+    If the browser is not at base_version (new iframe, missed rerun) it replies
+    with {"need_full": request_id} and the next rerun sends a full snapshot.
+    """
+    state_key = f"_dag_view_{key}"
+    state = st.session_state.get(state_key)
+    snapshot = graph_snapshot(G, original_dag, color_map, positions)
+
+    # 1) Did the frontend ask for a resync since the last one we answered?
+    reply = st.session_state.get(key) or {}
+    resync = state is not None and reply.get("need_full", 0) > state["answered"]
+
+    # 2) Full snapshot or delta
+    delta = None
+    if state is not None and not resync:
+        delta = graph_delta(state["snapshot"], snapshot)
+
+    if delta is None:
+        version = 1 if state is None else state["version"] + 1
+        message = _full_message(snapshot, version)
+        logger.debug(f"dag_view '{key}': full snapshot v{version} ({len(snapshot['nodes'])} nodes).")
+    else:
+        changed = any(delta.values())
+        version = state["version"] + 1 if changed else state["version"]
+        message = {"kind": "delta", "base_version": state["version"], "version": version, **delta}
+
+    st.session_state[state_key] = {
+        "version": version,
+        "snapshot": snapshot,
+        "answered": reply.get("need_full", 0) if resync or state is None else state["answered"],
+    }
+
+    # 3) Render; the return value is the frontend's last reply, also kept in session_state[key]
+    return _dag_view(message=message, height=height, key=key, default=None)
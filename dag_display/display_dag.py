@@ -1,12 +1,17 @@
 import streamlit as st
 import networkx as nx
-import streamlit.components.v1 as components
 from utils.graph_utils import to_pyvis_compatible
-from utils.visualization import visualize_dag_with_pyvis
+from dag_display.dag_component import dag_view
+from utils.graph_layout import is_large_graph, cached_layered_layout, centroid_positions
 from utils.semantic_coloring import colorize_nodes_by_similarity, colorize_cluster_nodes
-from dag_display.edge_edit import edit_edges_expander
+from dag_display.edge_edit import edit_edges_expander, batch_edit_expander, edit_history_controls
+from dag_display.focus_view import focus_controls
+from utils.graph_index import get_graph_index
 from utils.graph_utils import is_valid_dag
+from algorithms.evaluation import preservation_stats
 from Utils import convert_nodes_snake_to_pascal_case
+from core.edit_history import get_edit_history
+from core.shared_store import content_key
 
 def display_dag_column(title: str, dag: nx.DiGraph, is_original: bool = True):
     st.subheader(title)
@@ -19,16 +24,37 @@ def display_dag_column(title: str, dag: nx.DiGraph, is_original: bool = True):
 
     if is_original:
         st.session_state.original_color_map = color_map
-        html_str = visualize_dag_with_pyvis(pyvis_dag, color_map=color_map, original_dag=is_original)
+        # Large graphs get a cached server-side layout instead of in-browser physics
+        positions = cached_layered_layout(pyvis_dag) if is_large_graph(pyvis_dag) else None
+        st.session_state.original_positions = positions
+
+        # Focused, only the node's neighbourhood goes to the browser, laid out on its own
+        index = get_graph_index(pyvis_dag)
+        focus = focus_controls(index, default=is_large_graph(pyvis_dag))
+        if focus is not None:
+            pyvis_dag, truncated = index.ego_graph(pyvis_dag, *focus)
+            positions = cached_layered_layout(pyvis_dag) if is_large_graph(pyvis_dag) else None
+            st.caption(f"Showing {pyvis_dag.number_of_nodes()} of {dag.number_of_nodes()} nodes"
+                       + (" (cut off, reduce the hops to see the whole region)." if truncated else "."))
+        dag_view(pyvis_dag, key="original_dag_view", original_dag=is_original, color_map=color_map,
+                 positions=positions)
 
     else:
         cluster_nodes_color_map = colorize_cluster_nodes(list(dag.nodes), st.session_state.original_color_map)
-        html_str = visualize_dag_with_pyvis(pyvis_dag, color_map=cluster_nodes_color_map, original_dag=is_original)
-
-    components.html(html_str, height=620, scrolling=False)
+        # Summary nodes sit at the centroid of their members in the original layout
+        positions = centroid_positions(pyvis_dag, st.session_state.original_positions)
+        dag_view(pyvis_dag, key="summary_dag_view", original_dag=is_original, color_map=cluster_nodes_color_map,
+                 positions=positions)
+        parts = dag.graph.get("partitioned")
+        if parts:
+            st.caption(f"Summarized in partitioned mode ({parts} partition{'s' if parts != 1 else ''}, "
+                       "then merged across them).")
+        preservation_expander(st.session_state.original_dag, dag)
 
     if is_original:
+        edit_history_controls()
         edit_edges_expander(dag)
+        batch_edit_expander(dag)
 
         if st.button("Summarize Causal DAG", key="summarize_button_left_col"):
             st.session_state.summarize_button = True
@@ -47,3 +73,28 @@ def _colorize_nodes(dag: nx.DiGraph):
     nodes = list(dag.nodes())
     _, _, c_map = colorize_nodes_by_similarity(nodes)
     return c_map
+
+def preservation_expander(original_dag, summary_dag):
+    """How much of the original structure the summary keeps, computed on demand and cached with the DAG version."""
+    if original_dag is None:
+        return
+    with st.expander("Structure preservation"):
+        history = get_edit_history()
+        summary_key = content_key(st.session_state.summarized_dag)
+        stats = history.get_result("preservation", summary_key)
+        if stats is None:
+            if not st.button("Check preservation", key="preservation_button"):
+                return
+            try:
+                stats = history.put_result("preservation", summary_key, preservation_stats(original_dag, summary_dag))
+            except ValueError as e:
+                st.warning(str(e))
+                return
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Ancestor relations kept", f"{stats['ancestor_recall']:.1%}",
+                  help=f"{stats['ancestor_pairs_spurious']} spurious ancestor pairs added")
+        c2.metric("Independencies kept", f"{stats['independence_recall']:.1%}")
+        c3.metric("Local Markov kept", f"{stats['markov_recall']:.1%}")
+        st.caption(f"Grounded summary: {stats['grounded_edges']} edges vs {stats['original_edges']} original, "
+                   f"{stats['pairs_checked']} node pairs checked.")
@@ -1,13 +1,54 @@
 import streamlit as st
-from algorithms.graph_ops import try_add_edge, try_remove_edge
+from core.edit_history import get_edit_history, show_version, ADD, REMOVE
+from dag_display.focus_view import node_picker
+from utils.graph_index import get_graph_index
+from algorithms.graph_ops import try_add_edge, try_remove_edge, get_topological_order, parse_edge_batch, apply_edge_batch
+
+def _editable(dag):
+    """
+    Edits always go to a private copy: 'dag' is the session's DAG or a relabeled
+    view that may be the very same object (Utils.convert_nodes_snake_to_pascal_case).
+    """
+    return dag.copy()
+
+def _commit_edit(dag, ops):
+    """Record the applied edit as a new version of the original DAG and show it."""
+    history = get_edit_history()
+    # An order maintained through the edit now describes the new version
+    topo = st.session_state.get("topo_order")
+    follows = topo is not None and topo.matches(dag, history.key)
+    history.commit(dag, ops)
+    if follows:
+        topo.key = history.key
+    show_version(history)
+
+def edit_history_controls():
+    """Undo / redo over the original DAG's versions; cached summaries come back with them."""
+    history = get_edit_history()
+    if history is None:
+        return
+
+    c1, c2, c3 = st.columns([1, 1, 3])
+    with c1:
+        if st.button("↶ Undo", key="undo_edit", disabled=not history.can_undo):
+            history.undo()
+            show_version(history)
+            st.rerun()
+    with c2:
+        if st.button("↷ Redo", key="redo_edit", disabled=not history.can_redo):
+            history.redo()
+            show_version(history)
+            st.rerun()
+    with c3:
+        st.caption(f"Version {history.version} of {len(history)}: {history.describe()}")
 
 def edit_edges_expander(dag):
     """
     An expander that lets the user pick a source and destination node
     from dropdowns, and choose to Add or Remove an edge.
     """
-    all_nodes = sorted(list(dag.nodes()))
-    if not all_nodes:
+    index = get_graph_index(dag)
+    if not len(index):
         return
 
     with st.expander("✏️ Edit Edges in Original DAG", expanded=False):
@@ -16,16 +57,8 @@ def edit_edges_expander(dag):
             "Then choose whether to **Add** or **Remove** the edge."
         )
 
-        source_node = st.selectbox(
-            "Source Node:",
-            options=all_nodes,
-            help="Pick the source node of the edge."
-        )
-        dest_node = st.selectbox(
-            "Destination Node:",
-            options=all_nodes,
-            help="Pick the destination node of the edge."
-        )
+        source_node = node_picker("Source Node:", index, key="edit_source", help="Pick the source node of the edge.")
+        dest_node = node_picker("Destination Node:", index, key="edit_dest", help="Pick the destination node of the edge.")
 
         edge_action = st.radio(
             "Action:",
@@ -34,15 +67,21 @@ def edit_edges_expander(dag):
             help="Choose whether to add or remove the edge."
         )
 
-        if st.button("Apply Changes to Original DAG"):
+        if st.button("Apply Changes to Original DAG", disabled=source_node is None or dest_node is None):
             err = False
+            # The pickers show display labels; the session's DAG and its maintained order keep their own
+            history = get_edit_history()
+            source_node, dest_node = history.label(source_node), history.label(dest_node)
+            original = st.session_state.original_dag
+            dag = _editable(original)
             try:
+                topo = get_topological_order(original, history.key)
                 if edge_action == "Add Edge":
-                    if not try_add_edge(dag, source_node, dest_node):
+                    if not try_add_edge(dag, source_node, dest_node, topo):
                         err = True
                 
                 elif edge_action == "Remove Edge":
-                    if not try_remove_edge(dag, source_node, dest_node):
+                    if not try_remove_edge(dag, source_node, dest_node, topo):
                         err = True
             
             except Exception as e:
@@ -54,6 +93,61 @@ def edit_edges_expander(dag):
                     st.success("Added edge successfully!")
                 if edge_action == "Remove Edge":
                     st.success("Removed edge successfully!")
-                st.session_state.original_dag = dag
-                st.session_state.summarized_dag = None
+                _commit_edit(dag, [(ADD if edge_action == "Add Edge" else REMOVE, source_node, dest_node)])
+                st.rerun()
+
+
+def batch_edit_expander(dag):
+    """
+    An expander for editing many edges at once: the edge list is pasted or
+    uploaded as a CSV, validated as a whole and applied in a single rerun.
+    """
+    if dag is None or dag.number_of_nodes() == 0:
+        return
+
+    with st.expander("📋 Batch Edit Edges in Original DAG", expanded=False):
+        st.write(
+            "One edge per line as `Source -> Target` (or `Source,Target`). "
+            "Prefix a line with `-` to remove the edge. CSV files may have "
+            "`source,target[,action]` columns with action `add` or `remove`."
+        )
+
+        pasted = st.text_area("Edge list:", placeholder="NumJoins -> ExecTime\n-NumTables -> PlanTime")
+        uploaded = st.file_uploader("Or upload a CSV edge list:", type=["csv", "txt"])
+
+        if st.button("Apply Batch to Original DAG"):
+            text = pasted
+            if uploaded is not None:
+                text = uploaded.getvalue().decode("utf-8") + "\n" + pasted
+            additions, removals, parse_errors = parse_edge_batch(text)
+
+            if parse_errors:
+                st.error("\n\n".join(parse_errors))
+                return
+            if not additions and not removals:
+                st.info("No edges to apply.")
+                return
+
+            history = get_edit_history()
+            additions = [(history.label(u), history.label(v)) for u, v in additions]
+            removals = [(history.label(u), history.label(v)) for u, v in removals]
+            dag = _editable(st.session_state.original_dag)
+            # Only the edits that change the graph are recorded
+            ops = ([(ADD, u, v) for u, v in dict.fromkeys(additions) if not dag.has_edge(u, v)]
+                   + [(REMOVE, u, v) for u, v in dict.fromkeys(removals)])
+            applied, errors, cycle_edges = apply_edge_batch(dag, additions, removals)
+            if errors:
+                st.error("No changes applied:\n\n" + "\n\n".join(errors))
+                return
+            if cycle_edges:
+                st.error(
+                    "No changes applied. These edges would create cycles:\n\n"
+                    + "\n\n".join(f"{u} -> {v}" for u, v in cycle_edges)
+                )
+                return
+
+            if applied:
+                st.session_state.topo_order = None
+                _commit_edit(dag, ops)
+                st.toast(f"Applied {len(additions)} additions and {len(removals)} removals.")
                 st.rerun()
@@ -0,0 +1,49 @@
+import streamlit as st
+from utils.graph_index import ANCESTORS, DESCENDANTS, BOTH, MAX_FOCUS_NODES
+
+# Node pickers list at most this many nodes at once; longer lists get a search box and pages.
+PAGE_SIZE = 100
+MAX_HOPS = 6
+
+def node_picker(label: str, index, key: str, help: str = None):
+    """
+    A selectbox over the nodes of a GraphIndex. Small graphs list every node;
+    larger ones are searched through the index and shown PAGE_SIZE at a time.
+    Returns the selected node, or None when the search matches nothing.
+    """
+    if len(index) <= PAGE_SIZE:
+        return st.selectbox(label, index.nodes, key=key, help=help)
+
+    query = st.text_input(f"Search {label.rstrip(':')}:", key=f"{key}_query",
+                          placeholder="Part of a node name, e.g. time")
+    matches = index.search(query)
+    if not matches:
+        st.caption(f"No node matches '{query}'.")
+        return None
+
+    pages = range(0, len(matches), PAGE_SIZE)
+    start = 0
+    if len(pages) > 1:
+        start = st.selectbox(f"{label.rstrip(':')} Page:", pages, key=f"{key}_page",
+                             format_func=lambda s: f"{s + 1}-{min(s + PAGE_SIZE, len(matches))} of {len(matches)}")
+    return st.selectbox(label, matches[start:start + PAGE_SIZE], key=key, help=help)
+
+def focus_controls(index, default: bool):
+    """
+    Controls of the ego-network focus view: a center node, a number of hops
+    and a direction. Returns (center, hops, direction), or None when the whole
+    graph is to be shown.
+    """
+    if not st.toggle("Focus on a node's neighbourhood", value=default, key="focus_enabled",
+                     help=f"Only draw a node's ancestors and/or descendants (at most {MAX_FOCUS_NODES} nodes)"):
+        return None
+
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        center = node_picker("Focus Node:", index, key="focus_node")
+    with c2:
+        hops = st.slider("Hops:", 1, MAX_HOPS, 2, key="focus_hops")
+    direction = st.radio("Direction:", [BOTH, ANCESTORS, DESCENDANTS], horizontal=True, key="focus_direction")
+    if center is None:
+        return None
+    return center, hops, direction
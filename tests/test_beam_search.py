@@ -0,0 +1,54 @@
+import random
+
+import networkx as nx
+import pytest
+
+from algorithms.algo import CaGreS
+from algorithms.beam_search import beam_search_CaGreS, score_merge_candidates, _partition
+from algorithms.semantic_index import SemanticIndex
+
+
+def _random_dag(n, p, seed):
+    rng = random.Random(seed)
+    nodes = [f"n{i}" for i in range(n)]
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((u, v) for i, u in enumerate(nodes) for v in nodes[i + 1:] if rng.random() < p)
+    return G
+
+
+def _similarity(nodes, seed):
+    rng = random.Random(seed)
+    sim = {a: {a: 1.0} for a in nodes}
+    for i, a in enumerate(nodes):
+        for b in nodes[i + 1:]:
+            sim[a][b] = sim[b][a] = rng.random()
+    return sim
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scoring_with_index_matches_plain_similarity(seed):
+    dag = _random_dag(14, 0.25, seed)
+    sim = _similarity(list(dag), seed)
+    plain = score_merge_candidates(dag, set(), {}, sim, 0.3, 1000)
+    indexed = score_merge_candidates(dag, set(), {}, SemanticIndex.from_similarity(sim), 0.3, 1000)
+    assert plain == indexed
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_beam_with_index_matches_plain_similarity(seed):
+    dag = _random_dag(16, 0.2, seed)
+    sim = _similarity(list(dag), seed)
+    plain = beam_search_CaGreS(dag, 8, sim, 0.05, beam_width=3, n_jobs=1)
+    indexed = beam_search_CaGreS(dag, 8, SemanticIndex.from_similarity(sim), 0.05, beam_width=3, n_jobs=1)
+    assert plain is not None and len(plain) <= 8
+    assert _partition(plain) == _partition(indexed)
+    assert plain.graph["summary_cost"] == indexed.graph["summary_cost"]
+
+
+def test_beam_and_greedy_return_none_when_stuck():
+    # No pair passes a threshold above every similarity, so no merge is valid
+    dag = _random_dag(10, 0.3, 0)
+    sim = _similarity(list(dag), 0)
+    assert CaGreS(dag, 4, sim, 1.5) is None
+    assert beam_search_CaGreS(dag, 4, sim, 1.5, beam_width=3, n_jobs=1) is None
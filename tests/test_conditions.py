@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms import conditions
+from algorithms.conditions import ConditionError, condition_mask, compiled_condition, validate_condition
+from algorithms.streaming_estimators import streaming_backdoor_ate
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "num_columns": rng.integers(1, 10, n),
+        "num_joins": rng.integers(0, 4, n),
+        "query_template": rng.choice(["q1", "q2", "q3"], n),
+    })
+    df["returned_bytes"] = 3.0 * (df["num_columns"] <= 5) + df["num_joins"] + rng.normal(size=n)
+    return df
+
+
+COLUMNS = (("NumColumns", "num_columns"), ("NumJoins", "num_joins"), ("QueryTemplate", "query_template"))
+
+
+def test_precedence_and_typed_literals(frame):
+    mask = compiled_condition("NumColumns <= 5 and not NumJoins == 0 or QueryTemplate == 'q3'", COLUMNS)(frame)
+    expected = (((frame.num_columns <= 5) & ~(frame.num_joins == 0)) | (frame.query_template == "q3")).to_numpy()
+    assert np.array_equal(mask, expected)
+
+
+@pytest.mark.parametrize("expr, message", [
+    ("NumColumns <=", "Missing value"),
+    ("(NumColumns == 1", "Unmatched opening"),
+    ("NumColumns == 1)", "Unmatched closing"),
+    ("Foo == 1", "Unknown node 'Foo'"),
+])
+def test_invalid_conditions(expr, message):
+    ok, error = validate_condition(expr, [name for name, _ in COLUMNS])
+    assert not ok and message in error
+
+
+def test_numeric_column_against_text_is_an_error(frame):
+    with pytest.raises(ConditionError):
+        compiled_condition("NumColumns == 'a'", COLUMNS)(frame)
+
+
+def test_masks_are_compiled_and_evaluated_once_per_dataset(frame, monkeypatch):
+    first = condition_mask(frame, "NumColumns <= 5", COLUMNS)
+    calls = []
+    monkeypatch.setattr(conditions, "compile_condition", lambda *args: calls.append(args))
+    assert condition_mask(frame, " NumColumns <= 5 ", COLUMNS) is first
+    assert condition_mask(frame.copy(), "NumColumns <= 5", COLUMNS) is first
+    assert not calls and not first.flags.writeable
+
+
+def test_cached_mask_and_streamed_predicate_give_the_same_estimate(frame):
+    args = ("NumColumns", "NumColumns <= 5", "ReturnedBytes", ["NumJoins", "QueryTemplate"])
+    in_memory, p_value = streaming_backdoor_ate(frame, *args, chunksize=64)
+    streamed, streamed_p = streaming_backdoor_ate([frame.iloc[:200], frame.iloc[200:]], *args[:3], ["NumJoins"])
+    assert in_memory.n == streamed.n == len(frame)
+    assert in_memory.value == pytest.approx(3.0, abs=0.3)
+    reference, _ = streaming_backdoor_ate(frame, *args[:3], ["NumJoins"], chunksize=64)
+    assert streamed.value == pytest.approx(reference.value, rel=1e-9)
+    assert streamed_p == pytest.approx(streaming_backdoor_ate(frame, *args[:3], ["NumJoins"])[1], rel=1e-6)
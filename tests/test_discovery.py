@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms.discovery import PValueStore, ci_key, fisher_z_pvalues, pc_from_store
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+
+@pytest.fixture(scope="module")
+def redshift():
+    return pd.read_pickle(os.path.join(DATA, "redshift_dataset.pkl")).select_dtypes("number")
+
+
+def _causallearn_pc(data, alpha):
+    from causallearn.search.ConstraintBased.PC import pc
+    return pc(data, alpha, "fisherz", stable=True, show_progress=False)
+
+
+def test_fisher_z_matches_causallearn(redshift):
+    from causallearn.utils.cit import CIT
+
+    data = redshift.to_numpy(dtype=float)
+    store = PValueStore.from_dataframe(redshift)
+    test = CIT(data, "fisherz")
+    keys = [ci_key(0, 3, ()), ci_key(1, 4, (2,)), ci_key(5, 2, (0, 7)), ci_key(6, 8, (1, 3, 9))]
+    for key in keys:
+        ours = fisher_z_pvalues(store.corr, store.n_samples, [key])[0]
+        assert ours == pytest.approx(test(key[0], key[1], key[2]), rel=1e-9, abs=1e-15)
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05, 0.5])
+def test_pc_matches_causallearn(redshift, alpha):
+    data = redshift.to_numpy(dtype=float)
+    ours = pc_from_store(PValueStore.from_dataframe(redshift), alpha=alpha, n_jobs=1)
+    theirs = _causallearn_pc(data, alpha)
+    assert np.array_equal(ours.G.graph, theirs.G.graph)
+
+
+def test_stored_pvalues_are_reused_across_alphas(redshift):
+    store = PValueStore.from_dataframe(redshift)
+    pc_from_store(store, alpha=0.5, n_jobs=1)
+    reused = pc_from_store(store, alpha=0.05, n_jobs=1)
+    fresh = pc_from_store(PValueStore.from_dataframe(redshift), alpha=0.05, n_jobs=1)
+    assert np.array_equal(reused.G.graph, fresh.G.graph)
+
+
+def test_pooled_levels_match_causallearn(redshift, monkeypatch):
+    from algorithms import discovery
+
+    monkeypatch.setattr(discovery, "MIN_TESTS_FOR_POOL", 1)
+    monkeypatch.setattr(discovery, "TESTS_PER_TASK", 7)
+    ours = pc_from_store(PValueStore.from_dataframe(redshift), alpha=0.05, n_jobs=2)
+    theirs = _causallearn_pc(redshift.to_numpy(dtype=float), 0.05)
+    assert np.array_equal(ours.G.graph, theirs.G.graph)
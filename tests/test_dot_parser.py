@@ -0,0 +1,62 @@
+import os
+
+import networkx as nx
+import pytest
+
+from utils.dot_parser import DotParseError, read_dot_edge_array, read_dot_graph, write_dot
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+GENERAL = b'''
+// exported by hand
+strict digraph "Query Plan" {
+    rankdir=LR;
+    node [shape=box];
+    "num joins" [color=red];
+    a -> b -> c [weight=2];
+    /* isolated nodes and a second chain */
+    d; e -> a
+    c -> "num joins";
+}
+'''
+
+
+def _pydot_graph(data):
+    import pydot
+    return nx.DiGraph(nx.nx_pydot.from_pydot(pydot.graph_from_dot_data(data.decode())[0]))
+
+
+def test_example_matches_pydot():
+    with open(os.path.join(DATA, "amazon_redshift.dot"), "rb") as f:
+        data = f.read()
+    G, expected = read_dot_graph(data), _pydot_graph(data)
+    assert set(G.nodes) == set(expected.nodes)
+    assert set(G.edges) == set(expected.edges)
+
+
+def test_general_syntax_matches_pydot():
+    G, expected = read_dot_graph(GENERAL), _pydot_graph(GENERAL)
+    assert set(G.nodes) == {n.strip('"') for n in expected.nodes}
+    assert set(G.edges) == {(u.strip('"'), v.strip('"')) for u, v in expected.edges}
+    assert G.graph["name"] == "Query Plan"
+    assert G.edges["a", "b"]["weight"] == "2"
+    assert G.nodes["num joins"]["color"] == "red"
+
+
+def test_edge_array_matches_graph():
+    labels, edges = read_dot_edge_array(GENERAL)
+    assert {(labels[u], labels[v]) for u, v in edges} == set(read_dot_graph(GENERAL).edges)
+
+
+def test_write_dot_round_trip():
+    G = nx.DiGraph([("a", "b"), ("b", "node"), ("x y", "a")])
+    G.add_node("lonely")
+    H = read_dot_graph(write_dot(G))
+    assert set(H.nodes) == set(G.nodes) and set(H.edges) == set(G.edges)
+
+
+@pytest.mark.parametrize("data", ["digraph { a -> }", "graph { a -- b }", "digraph { a -> b } extra",
+                                  "digraph { a @ b }", "digraph { subgraph s { a -> b } }"])
+def test_unsupported_input_raises(data):
+    with pytest.raises(DotParseError):
+        read_dot_graph(data)
@@ -0,0 +1,45 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.dynamic_topo import DynamicTopologicalOrder
+
+
+def _is_topological(order, G):
+    rank = {n: i for i, n in enumerate(order)}
+    return sorted(rank) == sorted(G.nodes) and all(rank[u] < rank[v] for u, v in G.edges)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_edits_keep_a_valid_order(seed):
+    rng = np.random.default_rng(seed)
+    G = nx.gn_graph(60, seed=seed).reverse()
+    topo = DynamicTopologicalOrder.from_graph(G)
+    for _ in range(500):
+        u, v = (int(n) for n in rng.choice(60, size=2, replace=False))
+        if G.has_edge(u, v) and rng.random() < 0.3:
+            topo.remove_edge(G, u, v)
+            continue
+        would_cycle = not G.has_edge(u, v) and nx.has_path(G, v, u)
+        assert topo.add_edge(G, u, v) is not would_cycle
+        assert G.has_edge(u, v) is not would_cycle
+        assert _is_topological(topo.order(), G)
+    assert nx.is_directed_acyclic_graph(G)
+
+
+def test_self_loops_and_new_nodes():
+    G = nx.DiGraph([("a", "b")])
+    topo = DynamicTopologicalOrder.from_graph(G, key=1)
+    assert not topo.add_edge(G, "a", "a")
+    topo.add_node(G, "c")
+    assert topo.add_edge(G, "c", "a")
+    assert topo.order() == ["c", "a", "b"] and topo.ranks() == {"c": 0, "a": 1, "b": 2}
+
+
+def test_matches_tracks_key_and_graph():
+    G = nx.DiGraph([("a", "b")])
+    topo = DynamicTopologicalOrder.from_graph(G, key="v1")
+    assert topo.matches(G, "v1")
+    assert not topo.matches(G, "v2")
+    G.add_edge("b", "c")
+    assert not topo.matches(G, "v1")
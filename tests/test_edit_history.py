@@ -0,0 +1,62 @@
+import networkx as nx
+import numpy as np
+
+from core import edit_history
+from core.edit_history import ADD, REMOVE, EditHistory
+
+
+def _edit(history, ops):
+    dag = nx.DiGraph(history.graph)
+    for action, u, v in ops:
+        dag.add_edge(u, v) if action == ADD else dag.remove_edge(u, v)
+    return history.commit(dag, ops)
+
+
+def test_every_version_replays_to_its_graph(monkeypatch):
+    monkeypatch.setattr(edit_history, "SNAPSHOT_EVERY", 4)
+    monkeypatch.setattr(edit_history, "MAX_MATERIALIZED", 2)
+    rng = np.random.default_rng(0)
+    history = EditHistory(nx.DiGraph([(0, 1), (1, 2)]))
+    expected = [set(history.graph.edges)]
+    for _ in range(40):
+        # An undo now and then, so later edits start new branches
+        if history.can_undo and rng.random() < 0.2:
+            history.undo()
+        edges = set(history.graph.edges)
+        u, v = sorted(int(n) for n in rng.choice(8, size=2, replace=False))
+        _edit(history, [(REMOVE if (u, v) in edges else ADD, u, v)])
+        expected.append(set(history.graph.edges))
+    for version, edges in enumerate(expected):
+        assert set(history.materialize(version).edges) == edges
+
+
+def test_undo_redo_and_branches():
+    history = EditHistory(nx.DiGraph([("a", "b")]))
+    _edit(history, [(ADD, "b", "c")])
+    _edit(history, [(ADD, "a", "c")])
+    assert history.undo().has_edge("b", "c") and not history.graph.has_edge("a", "c")
+    assert history.redo().has_edge("a", "c")
+    history.undo()
+    _edit(history, [(REMOVE, "a", "b")])
+    assert len(history) == 4 and not history.can_redo
+    assert history.checkout(2).has_edge("a", "c")
+    assert nx.is_frozen(history.graph)
+
+
+def test_results_are_shared_by_versions_with_equal_edges():
+    history = EditHistory(nx.DiGraph([("a", "b")]))
+    history.put_result("summary", (5, 0.5, False), "loaded")
+    _edit(history, [(ADD, "b", "c")])
+    assert history.get_result("summary", (5, 0.5, False)) is None
+    _edit(history, [(REMOVE, "b", "c")])
+    assert history.get_result("summary", (5, 0.5, False)) == "loaded"
+    assert history.key == (history.key[0], 0)
+
+
+def test_edits_keep_the_loaded_labels():
+    history = EditHistory(nx.DiGraph([("num_joins", "execution_time")]))
+    dag = nx.DiGraph(history.graph)
+    dag.add_edge("ExecutionTime", "ElapsedTime")
+    graph = history.commit(dag, [(ADD, "ExecutionTime", "ElapsedTime")])
+    assert set(graph.edges) == {("num_joins", "execution_time"), ("execution_time", "ElapsedTime")}
+    assert history.label("NumJoins") == "num_joins"
@@ -0,0 +1,45 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.evaluation import DagIndex, preservation_stats
+
+
+def _random_dag(n, p, seed):
+    rng = np.random.default_rng(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(f"V{i}" for i in range(n))
+    G.add_edges_from((f"V{i}", f"V{j}") for i in range(n) for j in range(i + 1, n) if rng.random() < p)
+    return G
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_d_separation_matches_networkx(seed):
+    G = _random_dag(70, 0.06, seed)
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes)
+    queries = []
+    for _ in range(400):
+        x, y, *Z = rng.choice(nodes, size=2 + int(rng.integers(0, 4)), replace=False)
+        queries.append((x, y, set(Z)))
+    expected = [nx.is_d_separator(G, {x}, {y}, Z) for x, y, Z in queries]
+    assert DagIndex(G).d_separated(queries).tolist() == expected
+
+
+def test_ancestors_match_networkx():
+    G = _random_dag(130, 0.03, 7)
+    index = DagIndex(G)
+    ancestors = {v: nx.ancestors(G, v) for v in G}
+    A = index.ancestor_matrix()
+    for u, v in itertools.product(range(len(index)), repeat=2):
+        assert A[u, v] == (index.nodes[u] in ancestors[index.nodes[v]])
+
+
+def test_identity_summary_preserves_everything():
+    G = _random_dag(30, 0.1, 1)
+    stats = preservation_stats(G, G)
+    assert stats["grounded_edges"] == stats["original_edges"]
+    assert stats["ancestor_recall"] == stats["independence_recall"] == stats["markov_recall"] == 1.0
+    assert stats["ancestor_pairs_spurious"] == 0
@@ -0,0 +1,43 @@
+import networkx as nx
+
+from algorithms.beam_search import beam_search_CaGreS, MIN_NODES_FOR_POOL, _partition
+from algorithms.sweep import parameter_sweep
+from utils.graph_serialization import dumps_graph, loads_graph, save_graph, load_graph
+
+
+def _summary():
+    G = nx.DiGraph([("a*b", "c"), ("c", "d_e"), ("a*b", "d_e")])
+    G.add_node("fé")
+    G.graph["merge_log"] = (("d", "e"),)
+    return G
+
+
+def test_round_trip_keeps_nodes_edges_order_and_merge_log(tmp_path):
+    G = _summary()
+    for H in (loads_graph(dumps_graph(G)), loads_graph(dumps_graph(G, compressed=True))):
+        assert list(H.nodes) == list(G.nodes)
+        assert list(H.edges) == list(G.edges)
+        assert H.graph["merge_log"] == G.graph["merge_log"]
+    save_graph(tmp_path / "g.npz", G)
+    assert list(load_graph(tmp_path / "g.npz").edges) == list(G.edges)
+
+
+def test_dumps_is_deterministic():
+    assert dumps_graph(_summary()) == dumps_graph(_summary())
+
+
+def _chain_dag(n):
+    G = nx.DiGraph()
+    G.add_edges_from((f"v{i}", f"v{j}") for i in range(n) for j in (i + 1, i + 3) if j < n)
+    return G
+
+
+def test_worker_pools_get_graphs_in_npz_form():
+    dag = _chain_dag(MIN_NODES_FOR_POOL + 3)
+    pooled = beam_search_CaGreS(dag, MIN_NODES_FOR_POOL, None, 0.0, beam_width=2, n_jobs=2)
+    local = beam_search_CaGreS(dag, MIN_NODES_FOR_POOL, None, 0.0, beam_width=2, n_jobs=1)
+    assert _partition(pooled) == _partition(local)
+
+    table, summaries = parameter_sweep(_chain_dag(12), [4, 6], [0.0], n_jobs=2)
+    assert table["nodes"].tolist() == [4, 6]
+    assert set(summaries) == {(4, 0.0), (6, 0.0)}
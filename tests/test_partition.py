@@ -0,0 +1,49 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms.partition import partition_dag, allocate_budget, partitioned_CaGreS
+from algorithms.semantic_index import SemanticIndex
+
+
+def _random_dag(n, p, seed):
+    rng = random.Random(seed)
+    nodes = [f"n{i}" for i in range(n)]
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((u, v) for i, u in enumerate(nodes) for v in nodes[i + 1:] if rng.random() < p)
+    return G
+
+
+def test_partitions_cover_the_dag_and_edges_point_forward():
+    dag = _random_dag(120, 0.05, 0)
+    parts = partition_dag(dag, max_size=25)
+    assert sorted(n for part in parts for n in part) == sorted(dag)
+    assert all(len(part) <= 25 for part in parts)
+    position = {n: i for i, part in enumerate(parts) for n in part}
+    assert all(position[u] <= position[v] for u, v in dag.edges)
+
+
+@pytest.mark.parametrize("sizes, k", [([50, 30, 20], 10), ([3, 3, 3, 3], 2), ([7, 1], 8)])
+def test_budget_shares(sizes, k):
+    shares = allocate_budget(sizes, k)
+    assert all(1 <= s <= size for s, size in zip(shares, sizes))
+    assert sum(shares) >= min(k, sum(sizes))
+
+
+def test_partitioned_summary_reaches_k_and_is_marked():
+    dag = _random_dag(80, 0.05, 1)
+    summary = partitioned_CaGreS(dag, 6, None, 0.0, max_part_size=20, n_jobs=2)
+    assert summary is not None and len(summary) <= 6
+    assert summary.graph["partitioned"] >= 4
+    members = sorted(m for cluster in summary for m in cluster.split('_'))
+    assert members == sorted(dag)
+
+
+def test_partitioned_summary_reports_an_unreachable_k(caplog):
+    dag = _random_dag(40, 0.1, 2)
+    similarity = SemanticIndex(list(dag), np.eye(len(dag)))
+    assert partitioned_CaGreS(dag, 3, similarity, 0.5, max_part_size=10, n_jobs=1) is None
+    assert "stopped above k=3" in caplog.text
@@ -0,0 +1,50 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms.discovery import StreamingCovariance
+from utils.chunked_io import iter_chunks, spool_upload
+from utils.graph_utils import generate_dag_from_dataset, generate_dag_from_stream
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+
+@pytest.fixture(scope="module")
+def redshift():
+    return pd.read_pickle(os.path.join(DATA, "redshift_dataset.pkl"))
+
+
+def test_streaming_covariance_matches_numpy():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(1000, 4)) * [1, 10, 1e6, 1e-3], columns=list("abcd"))
+    stats = StreamingCovariance(frame.columns)
+    for chunk in iter_chunks(frame, 137):
+        stats.update(chunk)
+    assert stats.n == len(frame)
+    assert np.allclose(stats.covariance(), np.cov(frame.to_numpy(), rowvar=False), rtol=1e-10)
+    assert np.allclose(stats.correlation(), np.corrcoef(frame.to_numpy(), rowvar=False), rtol=1e-10)
+
+
+def test_spooled_uploads_are_shared_by_content():
+    data = b"a,b\n1,2\n3,4\n"
+    path = spool_upload(data, ".csv")
+    assert spool_upload(data, ".csv") == path
+    assert path.endswith(".csv") and open(path, "rb").read() == data
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_streamed_upload_discovers_the_in_memory_dag(redshift, suffix, tmp_path):
+    numeric = redshift.select_dtypes("number")
+    file = tmp_path / f"upload{suffix}"
+    numeric.to_csv(file, index=False) if suffix == ".csv" else numeric.to_parquet(file, index=False)
+    path = spool_upload(file.read_bytes(), suffix)
+
+    streamed, _ = generate_dag_from_stream(path, alpha=0.05, chunksize=1000)
+    in_memory, _ = generate_dag_from_dataset(pd.read_csv(path) if suffix == ".csv" else pd.read_parquet(path),
+                                             alpha=0.05)
+    assert set(streamed.nodes) == set(in_memory.nodes)
+    assert set(streamed.edges) == set(in_memory.edges)
+    assert nx.is_directed_acyclic_graph(streamed)
@@ -0,0 +1,73 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms.conditions import compiled_condition
+from algorithms.streaming_estimators import StreamingOLS, streaming_backdoor_ate
+from algorithms.algo import estimate_binary_treatment_effect
+from utils.chunked_io import iter_chunks
+from utils.graph_utils import load_dag_from_file, to_digraph_string
+from utils.node_labels import relabel_graph, labels, PASCAL
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+QUERIES = [
+    ("ResultCacheHit", "ResultCacheHit == 1", "CompileTime"),
+    ("NumTables", "NumTables >= 5", "PlanningTime"),
+    ("NumJoins", "NumJoins > 1", "ElapsedTime"),
+]
+
+
+@pytest.fixture(scope="module")
+def redshift():
+    df = pd.read_pickle(os.path.join(DATA, "redshift_dataset.pkl"))
+    with open(os.path.join(DATA, "amazon_redshift.dot"), "rb") as f:
+        dag = relabel_graph(load_dag_from_file(io.BytesIO(f.read())), PASCAL)
+    return df, dag
+
+
+def test_streaming_ols_matches_least_squares():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 3)) * [1, 100, 1e-3]
+    y = 2 + X @ [1.5, -0.02, 300] + rng.normal(size=500)
+    frame = pd.DataFrame(np.column_stack([y, X]), columns=["y", "a", "b", "c"])
+    ols = StreamingOLS("y", ["a", "b", "c"])
+    for chunk in iter_chunks(frame, 77):
+        ols.update(chunk)
+    coef = ols.fit()[0]
+    expected = np.linalg.lstsq(np.column_stack([np.ones(len(X)), X]), y, rcond=None)[0]
+    assert np.allclose(coef, expected[1:], rtol=1e-8)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_streamed_estimate_matches_dowhy(redshift, query):
+    from dowhy import CausalModel
+
+    df, dag = redshift
+    treatment, condition, outcome = query
+    effect, p_value = estimate_binary_treatment_effect(df, treatment, condition, outcome, dag)
+
+    # DoWhy's own backdoor.linear_regression on the binarized, in-memory frame
+    frame = df.rename(columns=lambda c: labels.label(c, PASCAL))
+    frame[treatment] = compiled_condition(condition)(frame)
+    model = CausalModel(data=frame, treatment=treatment, outcome=outcome, graph=to_digraph_string(dag))
+    estimate = model.estimate_effect(model.identify_effect(proceed_when_unidentifiable=True),
+                                     method_name="backdoor.linear_regression", test_significance=True)
+    assert effect.value == pytest.approx(estimate.value, rel=1e-6)
+    assert p_value == pytest.approx(float(np.ravel(estimate.test_stat_significance()["p_value"])[0]),
+                                    rel=1e-6, abs=1e-12)
+
+
+def test_streamed_sources_agree(redshift, tmp_path):
+    df, _ = redshift
+    numeric = df.select_dtypes("number")
+    path = tmp_path / "redshift.csv"
+    numeric.to_csv(path, index=False)
+    query = ("NumTables", "NumTables >= 5", "PlanningTime", ["NumJoins", "ResultCacheHit"])
+    in_memory, _ = streaming_backdoor_ate(numeric, *query, chunksize=1000)
+    streamed, _ = streaming_backdoor_ate(str(path), *query, chunksize=777)
+    assert streamed.value == pytest.approx(in_memory.value, rel=1e-9)
+    assert streamed.stderr == pytest.approx(in_memory.stderr, rel=1e-9)
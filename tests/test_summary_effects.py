@@ -0,0 +1,56 @@
+import io
+import os
+
+import networkx as nx
+import pandas as pd
+import pytest
+
+import Utils
+from algorithms.algo import (estimate_binary_treatment_effect, estimate_binary_treatment_effect_on_summary,
+                             get_grounded_dag, topological_ranks, cluster_identification_graph)
+from utils.graph_utils import load_dag_from_file, summarize_dag
+from utils.node_labels import relabel_graph, PASCAL
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+QUERIES = [
+    ("ResultCacheHit", "ResultCacheHit == 1", "CompileTime"),
+    ("NumColumns", "NumColumns <= 5", "ReturnedBytes"),
+    ("NumJoins", "NumJoins > 1", "ElapsedTime"),
+]
+
+
+@pytest.fixture(scope="module")
+def redshift():
+    df = pd.read_pickle(os.path.join(DATA, "redshift_dataset.pkl"))
+    with open(os.path.join(DATA, "amazon_redshift.dot"), "rb") as f:
+        dag = relabel_graph(load_dag_from_file(io.BytesIO(f.read())), PASCAL)
+    return df, dag, topological_ranks(nx.topological_sort(dag))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_identity_summary_reproduces_the_original_estimate(redshift, query):
+    df, dag, ranks = redshift
+    original, p_value = estimate_binary_treatment_effect(df, *query, dag)
+    on_summary, summary_p = estimate_binary_treatment_effect_on_summary(df, *query, dag, ranks=ranks)
+    assert on_summary.value == original.value
+    assert on_summary.stderr == original.stderr
+    assert summary_p == p_value
+
+
+@pytest.mark.parametrize("query", QUERIES[:2])
+def test_summary_estimate_matches_its_grounded_dag(redshift, query):
+    df, dag, ranks = redshift
+    summary = Utils.convert_nodes_snake_to_pascal_case(summarize_dag(dag, 5, 0.0))
+    grounded, _ = estimate_binary_treatment_effect(df, *query, get_grounded_dag(summary, ranks))
+    on_summary, _ = estimate_binary_treatment_effect_on_summary(df, *query, summary, ranks=ranks)
+    assert on_summary.value == pytest.approx(grounded.value, rel=1e-9)
+
+
+def test_identification_graph_expands_only_the_queried_clusters():
+    summary = nx.DiGraph([("A,\nB", "C"), ("C", "D,\nE"), ("F,\nG", "C")])
+    graph, members = cluster_identification_graph(summary, "B", "D", ranks={"A": 0, "B": 1, "D": 3, "E": 4})
+    assert {"A", "B", "D", "E", "C"} <= set(graph)
+    assert graph.has_edge("A", "B") and graph.has_edge("D", "E")
+    alias = next(n for n, m in members.items() if m == ("F", "G"))
+    assert set(graph.successors(alias)) == {"C"}
@@ -0,0 +1,33 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from algorithms.algo import estimate_binary_treatment_effect
+from algorithms.sweep import parameter_sweep, parameter_range
+from utils.graph_utils import load_dag_from_file
+from utils.node_labels import relabel_graph, PASCAL
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+
+
+def test_parameter_range_matches_the_ui_values():
+    assert parameter_range(0.3, 0.7, 0.1) == [0.3, 0.4, 0.5, 0.6, 0.7]
+    assert parameter_range(2, 10, 4) == [2, 6, 10]
+    assert parameter_range(5, 4, 1) == [5]
+
+
+def test_drift_is_zero_where_the_summary_is_the_original_dag():
+    df = pd.read_pickle(os.path.join(DATA, "redshift_dataset.pkl"))
+    with open(os.path.join(DATA, "amazon_redshift.dot"), "rb") as f:
+        dag = load_dag_from_file(io.BytesIO(f.read()))
+    query = ("NumColumns", "NumColumns <= 5", "ReturnedBytes")
+    table, summaries = parameter_sweep(dag, [len(dag), 5], [0.0], n_jobs=1, df=df, ate_query=query)
+
+    full = table[table["k"] == len(dag)].iloc[0]
+    assert full["nodes"] == len(dag)
+    assert full["ate_drift"] == 0.0
+    base, _ = estimate_binary_treatment_effect(df, *query, relabel_graph(dag, PASCAL))
+    assert full["ate"] == base.value
+    assert np.isfinite(table[table["k"] == 5].iloc[0]["ate_drift"])
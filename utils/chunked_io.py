@@ -0,0 +1,71 @@
+import os
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def iter_chunks(source, chunksize: int = DEFAULT_CHUNKSIZE, columns=None):
+    """
+    Yield a dataset as a sequence of DataFrame chunks, without materializing it.
+
+    'source' may be:
+      - a path to a .csv / .csv.gz or .parquet file (read incrementally),
+      - a readable CSV buffer (e.g. a Streamlit UploadedFile),
+      - a DataFrame (sliced into views),
+      - any iterable of DataFrames (passed through).
+    Pickles cannot be streamed; a .pkl path is loaded once and then sliced.
+    """
+    import pandas as pd
+
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            chunk = source.iloc[start:start + chunksize]
+            yield chunk if columns is None else chunk[columns]
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+            return
+        if path.endswith(".pkl"):
+            logger.warning(f"{path} is a pickle and cannot be streamed, loading it whole.")
+            yield from iter_chunks(pd.read_pickle(path), chunksize, columns)
+            return
+
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        with pd.read_csv(source, chunksize=chunksize, usecols=columns) as reader:
+            for chunk in reader:
+                yield chunk
+        return
+
+    for chunk in source:
+        yield chunk if columns is None else chunk[columns]
+
+
+def spool_upload(data, suffix: str) -> str:
+    """
+    Path of an on-disk copy of an uploaded .csv/.parquet file, named by its
+    content hash so identical uploads (from any session) share one file.
+    The dataset is then streamed from it with iter_chunks instead of being loaded whole.
+    """
+    directory = os.path.join(tempfile.gettempdir(), "dag-datasets")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, hashlib.sha1(data).hexdigest() + suffix)
+    if not os.path.exists(path):
+        # Written aside and renamed, so a concurrent reader never sees a partial file
+        fd, partial = tempfile.mkstemp(dir=directory, suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+        logger.info(f"Spooled a {len(data)} byte upload to {path}.")
+    return path
@@ -0,0 +1,266 @@
+import re
+import io
+import logging
+import numpy as np
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+# One alternation per token kind; 'error' catches anything outside the subset.
+_TOKEN = re.compile(r"""
+      (?P<skip>\s+|//[^\n]*|/\*.*?\*/|^[ \t]*\#[^\n]*)
+    | (?P<arrow>->)
+    | (?P<undirected>--)
+    | (?P<punct>[{}\[\];,=])
+    | (?P<quoted>"(?:[^"\\]|\\.)*")
+    | (?P<id>[A-Za-z_\x80-\U0010ffff][\w\x80-\U0010ffff]*|-?(?:\.\d+|\d+(?:\.\d*)?))
+    | (?P<error>.)
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+_KEYWORDS = {"strict", "graph", "digraph", "node", "edge", "subgraph"}
+
+# Fast path for plain exports (bare IDs, 'a;' and 'a -> b;' statements only):
+# findall runs the whole body in C, any other character lands in group 3.
+_HEADER = re.compile(r'\s*digraph\s*([A-Za-z_]\w*|"[^"\\]*")?\s*\{')
+_SIMPLE_STATEMENT = re.compile(r'\s*([A-Za-z_]\w*)(?:\s*->\s*([A-Za-z_]\w*))?\s*;|\s*(\S)')
+
+
+class DotParseError(ValueError):
+    """Raised when the input uses DOT syntax outside the supported digraph subset."""
+
+
+def _tokens(text):
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind == "skip":
+            continue
+        value = match.group(kind)
+        if kind == "error":
+            raise DotParseError(f"Unsupported character {value!r} at offset {match.start()}.")
+        if kind == "quoted":
+            yield "id", value[1:-1].replace('\\"', '"').replace("\\\n", "")
+        elif kind == "id" and value.lower() in _KEYWORDS:
+            yield "keyword", value.lower()
+        else:
+            yield kind, value
+
+
+def _decode(source) -> str:
+    if hasattr(source, "getvalue"):
+        source = source.getvalue()
+    elif hasattr(source, "read"):
+        source = source.read()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = bytes(source).decode("utf-8")
+    return source
+
+
+def _simple_statements(text):
+    """
+    Statements of a plain digraph export as (node, target) pairs - target is ''
+    for node statements - or None when the input needs the general tokenizer.
+    """
+    header = _HEADER.match(text)
+    if header is None:
+        return None
+    body = text[header.end():].rstrip()
+    if not body.endswith("}"):
+        return None
+    statements = _SIMPLE_STATEMENT.findall(body, 0, len(body) - 1)
+    if any(s[2] for s in statements):
+        return None
+    ids = {s[0].lower() for s in statements} | {s[1].lower() for s in statements}
+    if ids & _KEYWORDS:
+        return None
+    name = header.group(1)
+    return (name.strip('"') if name else None), [(u, v) for u, v, _ in statements]
+
+
+def iter_dot_statements(source):
+    """
+    Stream the statements of a DOT digraph as events, without building an AST:
+      ("graph", name, None)        once, from the header
+      ("graph_attr", key, value)   from 'key = value' or 'graph [...]'
+      ("node", node_id, attrs)      a node statement
+      ("node_ref", node_id, attrs)  a node named in an edge (attrs apply only if it is new)
+      ("edge", (u, v), attrs)      one event per hop of an 'a -> b -> c' chain
+    Supported: strict/digraph headers, node/edge/graph default attributes,
+    attribute lists, quoted IDs and comments. Subgraphs, ports, HTML labels and
+    undirected graphs raise DotParseError so callers can fall back to graphviz.
+    'source' is a str, bytes or a (uploaded) binary/text buffer.
+    """
+    tokens = _tokens(_decode(source))
+    lookahead = []
+
+    def next_token():
+        if lookahead:
+            return lookahead.pop()
+        return next(tokens, (None, None))
+
+    def expect(kind, value=None):
+        tok_kind, tok_value = next_token()
+        if tok_kind != kind or (value is not None and tok_value != value):
+            raise DotParseError(f"Expected {value or kind}, found {tok_value!r}.")
+        return tok_value
+
+    def attr_list():
+        attrs = {}
+        while True:
+            kind, value = next_token()
+            if kind == "punct" and value == "[":
+                while True:
+                    kind, value = next_token()
+                    if kind == "punct" and value == "]":
+                        break
+                    if kind == "punct" and value in ",;":
+                        continue
+                    if kind not in ("id", "keyword"):
+                        raise DotParseError(f"Unexpected {value!r} in attribute list.")
+                    expect("punct", "=")
+                    attrs[value] = expect("id")
+            else:
+                lookahead.append((kind, value))
+                return attrs
+
+    # 1) Header
+    kind, value = next_token()
+    if kind == "keyword" and value == "strict":
+        kind, value = next_token()
+    if kind != "keyword" or value != "digraph":
+        raise DotParseError("Only 'digraph' inputs are supported.")
+    kind, value = next_token()
+    name = None
+    if kind == "id":
+        name = value
+        kind, value = next_token()
+    if (kind, value) != ("punct", "{"):
+        raise DotParseError("Expected '{' after the digraph header.")
+    yield "graph", name, None
+
+    # 2) Statements
+    node_defaults, edge_defaults = {}, {}
+    while True:
+        kind, value = next_token()
+        if kind is None:
+            raise DotParseError("Unexpected end of input, missing '}'.")
+        if kind == "punct" and value == "}":
+            break
+        if kind == "punct" and value == ";":
+            continue
+        if kind == "keyword":
+            if value in ("node", "edge", "graph"):
+                attrs = attr_list()
+                if value == "node":
+                    node_defaults.update(attrs)
+                elif value == "edge":
+                    edge_defaults.update(attrs)
+                else:
+                    for k, v in attrs.items():
+                        yield "graph_attr", k, v
+                continue
+            raise DotParseError(f"'{value}' statements are not supported.")
+        if kind != "id":
+            raise DotParseError(f"Unexpected {value!r}.")
+
+        chain = [value]
+        kind, value = next_token()
+        if kind == "punct" and value == "=":
+            yield "graph_attr", chain[0], expect("id")
+            continue
+        while kind == "arrow":
+            chain.append(expect("id"))
+            kind, value = next_token()
+        if kind == "undirected":
+            raise DotParseError("Undirected '--' edges are not supported in a digraph.")
+        lookahead.append((kind, value))
+        attrs = attr_list()
+
+        if len(chain) == 1:
+            yield "node", chain[0], {**node_defaults, **attrs}
+        else:
+            for n in chain:
+                yield "node_ref", n, dict(node_defaults)
+            edge_attrs = {**edge_defaults, **attrs}
+            for u, v in zip(chain, chain[1:]):
+                yield "edge", (u, v), dict(edge_attrs)
+
+    kind, value = next_token()
+    if kind is not None:
+        raise DotParseError(f"Unexpected {value!r} after the closing '}}'.")
+
+
+def read_dot_graph(source) -> nx.DiGraph:
+    """Parse a DOT digraph straight from a string/bytes/buffer into a networkx DiGraph."""
+    text = _decode(source)
+    G = nx.DiGraph()
+    simple = _simple_statements(text)
+    if simple is not None:
+        name, statements = simple
+        if name is not None:
+            G.graph["name"] = name
+        for u, v in statements:
+            if v:
+                G.add_edge(u, v)
+            elif u not in G:
+                G.add_node(u)
+        return G
+
+    for event, key, value in iter_dot_statements(text):
+        if event == "edge":
+            G.add_edge(*key, **value)
+        elif event == "node":
+            if key in G:
+                G.nodes[key].update(value)
+            else:
+                G.add_node(key, **value)
+        elif event == "node_ref":
+            if key not in G:
+                G.add_node(key, **value)
+        elif event == "graph_attr":
+            G.graph[key] = value
+        elif key is not None:
+            G.graph["name"] = key
+    return G
+
+
+def read_dot_edge_array(source):
+    """
+    Parse a DOT digraph into a compact form: (labels, edges) where 'labels'
+    lists node names in first-seen order and 'edges' is an (E, 2) int32 array
+    of indices into it. Attributes are skipped.
+    """
+    text = _decode(source)
+    index = {}
+    edges = []
+    simple = _simple_statements(text)
+    if simple is not None:
+        for u, v in simple[1]:
+            i = index.setdefault(u, len(index))
+            if v:
+                edges.append((i, index.setdefault(v, len(index))))
+        return list(index), np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+    for event, key, _ in iter_dot_statements(text):
+        if event in ("node", "node_ref"):
+            index.setdefault(key, len(index))
+        elif event == "edge":
+            u, v = key
+            edges.append((index.setdefault(u, len(index)), index.setdefault(v, len(index))))
+    return list(index), np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+
+def write_dot(G: nx.DiGraph, name: str = "G") -> str:
+    """Serialize a DiGraph in the same digraph subset read_dot_graph accepts (used by benchmarks)."""
+    def quote(n):
+        n = str(n)
+        return n if re.fullmatch(r"[A-Za-z_][\w]*", n) and n.lower() not in _KEYWORDS else '"' + n.replace('"', '\\"') + '"'
+
+    out = io.StringIO()
+    out.write(f"digraph {quote(name)} {{\n")
+    for n in G.nodes:
+        out.write(f"    {quote(n)};\n")
+    out.write("\n")
+    for u, v in G.edges:
+        out.write(f"    {quote(u)} -> {quote(v)};\n")
+    out.write("}\n")
+    return out.getvalue()
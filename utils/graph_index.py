@@ -0,0 +1,151 @@
+import re
+import logging
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+import networkx as nx
+
+from utils.graph_layout import graph_signature
+
+logger = logging.getLogger(__name__)
+
+ANCESTORS, DESCENDANTS, BOTH = "Ancestors", "Descendants", "Both"
+# Focus regions are cut off at this many nodes, whatever the number of hops.
+MAX_FOCUS_NODES = 2000
+
+_INDEX_CACHE_SIZE = 8
+_index_cache = OrderedDict()
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_SEPARATORS = re.compile(r"[\s_\-,]+")
+
+
+def _squash(text: str) -> str:
+    """Lowercase without separators, so 'num_joins' and 'NumJoins' match each other."""
+    return _SEPARATORS.sub("", text.lower())
+
+
+def _words(name: str):
+    """The lowercase words of a node name (PascalCase, snake_case or free text), and the name itself."""
+    lowered = name.lower()
+    return {lowered, *(w.lower() for w in _WORD.findall(name))}
+
+
+def _csr(src, dst, n):
+    """Compressed adjacency: the neighbours of node i are indices[indptr[i]:indptr[i + 1]]."""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order]
+
+
+def _expand(csr, frontier):
+    """All neighbours of the frontier nodes (with repeats), without a Python loop over them."""
+    indptr, indices = csr
+    starts, lengths = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+    total = int(lengths.sum())
+    if total == 0:
+        return indices[:0]
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets]
+
+
+class GraphIndex:
+    """
+    Search and neighbourhood index of a DAG, built once per graph structure.
+
+    - Node names are sorted once; the words of every name (its PascalCase or
+      snake_case parts, and the whole name) sit in one sorted table, so a search
+      is a binary search for the query's prefix, followed by a substring scan
+      only when the prefix hits are too few.
+    - Successors and predecessors are kept as CSR arrays, so a k-hop ancestor /
+      descendant region is k vectorised frontier expansions.
+    """
+
+    def __init__(self, G: nx.DiGraph):
+        self.nodes = sorted(G.nodes, key=str)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        self._names = [_squash(str(n)) for n in self.nodes]
+
+        # 1) Sorted (word, node) table for prefix search
+        table = sorted((w, i) for i, n in enumerate(self.nodes) for w in _words(str(n)))
+        self._words = [w for w, _ in table]
+        self._word_nodes = np.fromiter((i for _, i in table), dtype=np.int64, count=len(table))
+
+        # 2) CSR adjacency in both directions
+        n, m = len(self.nodes), G.number_of_edges()
+        src = np.fromiter((self.index[u] for u, _ in G.edges), dtype=np.int64, count=m)
+        dst = np.fromiter((self.index[v] for _, v in G.edges), dtype=np.int64, count=m)
+        self._succ = _csr(src, dst, n)
+        self._pred = _csr(dst, src, n)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def search(self, query: str, limit: int = None) -> list:
+        """
+        Nodes matching 'query' (case- and separator-insensitive): nodes with a
+        word starting with it first, then nodes containing it anywhere; within
+        each group the shortest (closest) names come first. An empty query
+        matches every node, in name order.
+        """
+        q = query.strip().lower()
+        if not q:
+            return self.nodes[:limit]
+        closest = lambda ids: sorted(ids, key=lambda i: (len(self._names[i]), i))
+        lo = bisect_left(self._words, q)
+        hi = bisect_left(self._words, q + "\uffff")
+        hits = dict.fromkeys(closest(np.unique(self._word_nodes[lo:hi]).tolist()))
+        if limit is None or len(hits) < limit:
+            q = _squash(q)
+            hits.update(dict.fromkeys(closest(i for i, name in enumerate(self._names) if q in name and i not in hits)))
+        return [self.nodes[i] for i in list(hits)[:limit]]
+
+    def khop(self, center, hops: int, direction: str = BOTH, max_nodes: int = MAX_FOCUS_NODES):
+        """
+        The center plus its ancestors and/or descendants within 'hops' edges.
+        Returns (nodes, truncated): expansion stops once 'max_nodes' are
+        reached, the last frontier cut to fit, and 'truncated' tells so.
+        """
+        c = self.index[center]
+        reached = np.zeros(len(self.nodes), dtype=bool)
+        reached[c] = True
+        count, truncated = 1, False
+        sides = [self._pred] if direction == ANCESTORS else [self._succ] if direction == DESCENDANTS \
+            else [self._pred, self._succ]
+        for csr in sides:
+            frontier = np.array([c], dtype=np.int64)
+            for _ in range(hops):
+                nbrs = np.unique(_expand(csr, frontier))
+                nbrs = nbrs[~reached[nbrs]]
+                if len(nbrs) == 0:
+                    break
+                if count + len(nbrs) > max_nodes:
+                    nbrs, truncated = nbrs[:max_nodes - count], True
+                reached[nbrs] = True
+                count += len(nbrs)
+                frontier = nbrs
+                if truncated:
+                    break
+        return [self.nodes[i] for i in np.flatnonzero(reached)], truncated
+
+    def ego_graph(self, G: nx.DiGraph, center, hops: int, direction: str = BOTH, max_nodes: int = MAX_FOCUS_NODES):
+        """The subgraph of G induced by khop(...); returns (subgraph view, truncated)."""
+        nodes, truncated = self.khop(center, hops, direction, max_nodes)
+        return G.subgraph(nodes), truncated
+
+
+def get_graph_index(G: nx.DiGraph) -> GraphIndex:
+    """GraphIndex of G, built once per graph structure and kept in a small LRU cache."""
+    key = graph_signature(G)
+    if key in _index_cache:
+        _index_cache.move_to_end(key)
+        return _index_cache[key]
+
+    index = GraphIndex(G)
+    logger.debug(f"Built graph index for {len(index)} nodes.")
+    _index_cache[key] = index
+    if len(_index_cache) > _INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
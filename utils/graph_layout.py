@@ -0,0 +1,149 @@
+import logging
+from collections import OrderedDict
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+# Above this many nodes the browser no longer runs the physics layout itself.
+LARGE_GRAPH_NODES = 300
+# Level-of-detail thresholds for the fixed-position renderer.
+HIDE_LABELS_NODES = 1000
+BUNDLE_EDGES_EDGES = 2000
+# Edges are bundled per pair of cells of this many layers by this many node slots.
+BUNDLE_CELL_LAYERS = 4
+BUNDLE_CELL_NODES = 8
+# Smaller groups of edges between two cells are drawn as they are.
+BUNDLE_MIN_EDGES = 3
+
+LAYER_GAP = 180
+NODE_GAP = 140
+CLUSTER_SEPARATOR = ",\n"
+JUNCTION_PREFIX = "__bundle__"
+
+_LAYOUT_CACHE_SIZE = 8
+_layout_cache = OrderedDict()
+
+
+def is_large_graph(G: nx.DiGraph) -> bool:
+    return G is not None and G.number_of_nodes() > LARGE_GRAPH_NODES
+
+
+def graph_signature(G: nx.DiGraph):
+    """Cheap identity of a graph's structure, used as the layout cache key."""
+    return (G.number_of_nodes(), G.number_of_edges(), hash(frozenset(G.nodes)), hash(frozenset(G.edges)))
+
+
+def layered_layout(G: nx.DiGraph, sweeps: int = 4, layer_gap: int = LAYER_GAP, node_gap: int = NODE_GAP):
+    """
+    Sugiyama-style layered layout of a DAG:
+      1) layer every node by its longest path from a source,
+      2) reduce crossings with alternating barycenter sweeps (down on parents, up on children),
+      3) centre each layer horizontally, one layer per row.
+    Returns a dict node -> (x, y) in vis.js canvas coordinates.
+    """
+    order = list(nx.topological_sort(G))
+    layer = {}
+    for v in order:
+        layer[v] = max((layer[p] + 1 for p in G.predecessors(v)), default=0)
+
+    layers = [[] for _ in range(max(layer.values(), default=-1) + 1)]
+    for v in order:
+        layers[layer[v]].append(v)
+
+    x = {}
+    def place(nodes):
+        offset = (len(nodes) - 1) / 2
+        for i, v in enumerate(nodes):
+            x[v] = i - offset
+
+    for nodes in layers:
+        place(nodes)
+
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        sequence = layers[1:] if downward else layers[-2::-1]
+        for nodes in sequence:
+            neighbours = G.predecessors if downward else G.successors
+            def barycenter(v):
+                xs = [x[u] for u in neighbours(v)]
+                return sum(xs) / len(xs) if xs else x[v]
+            nodes.sort(key=barycenter)
+            place(nodes)
+
+    return {v: (x[v] * node_gap, layer[v] * layer_gap) for v in G.nodes}
+
+
+def cached_layered_layout(G: nx.DiGraph):
+    """layered_layout, computed once per graph structure and kept in a small LRU cache."""
+    key = graph_signature(G)
+    if key in _layout_cache:
+        _layout_cache.move_to_end(key)
+        return _layout_cache[key]
+
+    positions = layered_layout(G)
+    logger.debug(f"Computed layered layout for {G.number_of_nodes()} nodes.")
+    _layout_cache[key] = positions
+    if len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+    return positions
+
+
+def centroid_positions(summary_dag: nx.DiGraph, member_positions):
+    """
+    Place every summary node at the centroid of its members' positions in the
+    original layout, so a summary needs no layout pass of its own. Nodes whose
+    members are unknown get no position (vis.js places them).
+    """
+    if not member_positions:
+        return None
+    positions = {}
+    for n in summary_dag.nodes:
+        points = [member_positions[m] for m in str(n).split(CLUSTER_SEPARATOR) if m in member_positions]
+        if points:
+            positions[n] = (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+    return positions
+
+
+def bundle_edges(G: nx.DiGraph, positions, cell_height: int = BUNDLE_CELL_LAYERS * LAYER_GAP,
+                 cell_width: int = BUNDLE_CELL_NODES * NODE_GAP):
+    """
+    Edge bundling for the fixed-position renderer. Nodes are binned into cells
+    of BUNDLE_CELL_LAYERS layers by BUNDLE_CELL_NODES node slots, and every group
+    of at least BUNDLE_MIN_EDGES edges from one cell to another becomes a bundle:
+    the sources fan into a junction, one trunk runs to a second junction and fans
+    out to the targets, so the long lines crossing the drawing are one per bundle.
+    Other edges (within a cell, in small groups, of unplaced nodes) stay as they are.
+    Returns (junctions, segments):
+      junctions : junction id -> (x, y), ids start with JUNCTION_PREFIX
+      segments  : (source, target) -> (edges carried, ends at the real target)
+    """
+    def cell(v):
+        x, y = positions[v]
+        return int(y // cell_height), int(x // cell_width)
+
+    # 1) Group the edges by the cells of their endpoints
+    groups, segments = {}, {}
+    for u, v in G.edges:
+        if u in positions and v in positions:
+            groups.setdefault((cell(u), cell(v)), []).append((u, v))
+        else:
+            segments[(u, v)] = (1, True)
+
+    # 2) Bundle the groups: fan in, trunk, fan out
+    junctions = {}
+    for ((su, sc), (tu, tc)), edges in groups.items():
+        sources = {u for u, _ in edges}
+        targets = {v for _, v in edges}
+        if len(edges) < BUNDLE_MIN_EDGES or (su, sc) == (tu, tc):
+            segments.update(((u, v), (1, True)) for u, v in edges)
+            continue
+        sx, sy = (sum(positions[u][i] for u in sources) / len(sources) for i in (0, 1))
+        tx, ty = (sum(positions[v][i] for v in targets) / len(targets) for i in (0, 1))
+        j_in, j_out = (f"{JUNCTION_PREFIX}{su}:{sc}>{tu}:{tc}:{end}" for end in ("in", "out"))
+        junctions[j_in] = (0.75 * sx + 0.25 * tx, 0.75 * sy + 0.25 * ty)
+        junctions[j_out] = (0.25 * sx + 0.75 * tx, 0.25 * sy + 0.75 * ty)
+        segments[(j_in, j_out)] = (len(edges), False)
+        for u, v in edges:
+            segments[(u, j_in)] = (segments.get((u, j_in), (0,))[0] + 1, False)
+            segments[(j_out, v)] = (segments.get((j_out, v), (0,))[0] + 1, True)
+    return junctions, segments
@@ -0,0 +1,117 @@
+import io
+import logging
+import numpy as np
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CLUSTER_SEPARATOR = ",\n"
+
+
+def _pack_strings(strings):
+    """UTF-8 blob + offsets, much smaller than a fixed-width unicode array for uneven labels."""
+    encoded = [s.encode("utf-8") for s in strings]
+    ptr = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=ptr[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), ptr
+
+
+def _unpack_strings(blob, ptr):
+    data = blob.tobytes()
+    offsets = ptr.tolist()
+    if not data.isascii():
+        return [data[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+    # Byte offsets are character offsets for ASCII labels: decode once and slice
+    text = data.decode("ascii")
+    return [text[a:b] for a, b in zip(offsets, offsets[1:])]
+
+
+def graph_to_arrays(G: nx.DiGraph, membership=None) -> dict:
+    """
+    Flatten a DAG or summary DAG into plain NumPy arrays:
+      labels          : node label table (position = node id), as a UTF-8 blob + offsets
+      edges           : (E, 2) int32 array of node ids
+      member_labels   : table of the original variables inside clusters (blob + offsets)
+      cluster_ptr     : (V + 1) int32 CSR offsets into cluster_members
+      cluster_members : int32 ids into member_labels, node i owns
+                        cluster_members[cluster_ptr[i]:cluster_ptr[i + 1]]
+      merge_log       : (M, 2) int32 ids into merge_labels, in merge order
+    Node/edge attribute dicts are not kept.
+    'membership' maps node -> members; by default cluster labels are split on ',\\n'.
+    """
+    labels = [str(n) for n in G.nodes]
+    index = {n: i for i, n in enumerate(G.nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges], dtype=np.int32).reshape(-1, 2)
+
+    member_index = {}
+    cluster_ptr = np.zeros(len(labels) + 1, dtype=np.int32)
+    cluster_members = []
+    for i, (node, label) in enumerate(zip(G.nodes, labels)):
+        members = membership[node] if membership is not None else label.split(CLUSTER_SEPARATOR)
+        for m in members:
+            cluster_members.append(member_index.setdefault(str(m), len(member_index)))
+        cluster_ptr[i + 1] = len(cluster_members)
+
+    merge_index = {}
+    merge_log = [(merge_index.setdefault(str(a), len(merge_index)), merge_index.setdefault(str(b), len(merge_index)))
+                 for a, b in G.graph.get("merge_log", ())]
+
+    arrays = {
+        "version": np.array(FORMAT_VERSION, dtype=np.int32),
+        "directed": np.array(G.is_directed()),
+        "edges": edges,
+        "cluster_ptr": cluster_ptr,
+        "cluster_members": np.array(cluster_members, dtype=np.int32),
+        "merge_log": np.array(merge_log, dtype=np.int32).reshape(-1, 2),
+    }
+    for name, strings in (("labels", labels), ("member_labels", member_index), ("merge_labels", merge_index)):
+        arrays[f"{name}_blob"], arrays[f"{name}_ptr"] = _pack_strings(list(strings))
+    return arrays
+
+
+def _strings(arrays, name):
+    return _unpack_strings(arrays[f"{name}_blob"], arrays[f"{name}_ptr"])
+
+
+def arrays_to_graph(arrays) -> nx.DiGraph:
+    """Rebuild the networkx graph written by graph_to_arrays (merge log included)."""
+    version = int(arrays["version"])
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported graph format version {version}.")
+
+    labels = _strings(arrays, "labels")
+    G = nx.DiGraph() if bool(arrays["directed"]) else nx.Graph()
+    G.add_nodes_from(labels)
+    G.add_edges_from((labels[u], labels[v]) for u, v in arrays["edges"].tolist())
+    merge_labels = _strings(arrays, "merge_labels")
+    merge_log = tuple((merge_labels[a], merge_labels[b]) for a, b in arrays["merge_log"].tolist())
+    if merge_log:
+        G.graph["merge_log"] = merge_log
+    return G
+
+
+def save_graph(file, G: nx.DiGraph, membership=None, compressed: bool = True) -> None:
+    """Write G to a .npz file (path or binary buffer)."""
+    arrays = graph_to_arrays(G, membership)
+    if compressed:
+        np.savez_compressed(file, **arrays)
+    else:
+        np.savez(file, **arrays)
+
+
+def load_graph(file) -> nx.DiGraph:
+    """Read a graph written by save_graph. Pickled objects are never loaded."""
+    with np.load(file, allow_pickle=False) as arrays:
+        return arrays_to_graph(arrays)
+
+
+def dumps_graph(G: nx.DiGraph, membership=None, compressed: bool = False) -> bytes:
+    """In-memory variant of save_graph, for caches and shipping graphs to worker processes."""
+    buffer = io.BytesIO()
+    save_graph(buffer, G, membership, compressed=compressed)
+    return buffer.getvalue()
+
+
+def loads_graph(data: bytes) -> nx.DiGraph:
+    return load_graph(io.BytesIO(data))
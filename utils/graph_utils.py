@@ -1,10 +1,11 @@
 import networkx as nx
-from pandas.api.types import is_numeric_dtype
-from pandas import to_numeric
-from algorithms.algo import CaGreS
-import pandas as pd
-from networkx.drawing.nx_agraph import read_dot
-from algorithms.algo import discover_causal_dag
+from algorithms.beam_search import beam_search_CaGreS, INTERACTIVE_BEAM_WIDTH
+from algorithms.partition import partitioned_CaGreS
+from algorithms.semantic_index import get_semantic_index
+from algorithms.algo import discover_causal_dag, discover_causal_dag_from_store
+from algorithms.discovery import PValueStore, StreamingCovariance, dataset_fingerprint
+from utils.chunked_io import iter_chunks, DEFAULT_CHUNKSIZE
+from utils.dot_parser import read_dot_graph, DotParseError
 import streamlit as st
 import logging
 import tempfile
@@ -12,8 +13,7 @@ import os
 import numpy as np
 import networkx as nx
 import Utils
-from Utils import ensure_string_labels, convert_nodes_pascal_to_snake_case_inplace
-from utils.semantic_coloring import colorize_nodes_by_similarity
+from Utils import ensure_string_labels
 
 logger = logging.getLogger(__name__)
 
@@ -27,20 +27,16 @@ def is_valid_dag(G: nx.DiGraph):
 
 def load_dag_from_file(file):
     """
-    Loads a DAG from a DOT file by saving it to a temporary file and passing 
-    the file path to read_dot().
+    Loads a DAG from an uploaded DOT file. The upload buffer is parsed in memory
+    by utils.dot_parser; inputs outside its digraph subset fall back to graphviz.
     """
     try:
-        content = file.getvalue().decode("utf-8")
-        logger.debug("Received DOT file content for parsing.")
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dot') as tmp_file:
-            tmp_file.write(content.encode('utf-8'))
-            temp_filepath = tmp_file.name
-            logger.debug(f"Temporary DOT file created at: {temp_filepath}")
-
-        G = read_dot(temp_filepath)
-        DG = nx.DiGraph(G)
+        try:
+            DG = read_dot_graph(file.getvalue())
+            logger.debug("Parsed DOT file content in memory.")
+        except DotParseError as e:
+            logger.info(f"DOT input outside the in-memory parser subset ({e}), falling back to graphviz.")
+            DG = _load_dag_with_graphviz(file)
 
         if not is_valid_dag(DG):
             st.warning("The uploaded graph is not a valid Directed Acyclic Graph (DAG). Visualization may not be accurate.")
@@ -55,54 +51,138 @@ def load_dag_from_file(file):
         logger.exception("Exception occurred while loading DOT file: %s", e)
         return None
 
+def _load_dag_with_graphviz(file):
+    """
+    Loads a DAG from a DOT file by saving it to a temporary file and passing 
+    the file path to read_dot().
+    """
+    # pygraphviz is only needed for DOT inputs the in-memory parser does not cover
+    from networkx.drawing.nx_agraph import read_dot
+
+    try:
+        content = file.getvalue().decode("utf-8")
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.dot') as tmp_file:
+            tmp_file.write(content.encode('utf-8'))
+            temp_filepath = tmp_file.name
+            logger.debug(f"Temporary DOT file created at: {temp_filepath}")
+
+        G = read_dot(temp_filepath)
+        return nx.DiGraph(G)
+
     finally:
         if 'temp_filepath' in locals() and os.path.exists(temp_filepath):
             os.remove(temp_filepath)
             logger.debug(f"Temporary DOT file {temp_filepath} deleted.")
 
 
-def generate_dag_from_dataset(df, alpha):
+def _prepare_discovery_frame(df):
     """
-    Generate a DAG from the provided dataset.
+    Coerce every column to numeric, drop incomplete rows and switch the
+    column names to PascalCase - the frame PC is run on.
     """
+    from pandas.api.types import is_numeric_dtype
+    from pandas import to_numeric
+
     df_copy = df.copy()
-    
+
     for col in df_copy.columns:
         if not is_numeric_dtype(df_copy[col]):
             df_copy[col] = to_numeric(df_copy[col], errors='coerce')
-    
+
     df_copy.dropna(inplace=True)
-    df_copy = Utils.convert_df_columns_snake_to_pascal_inplace(df_copy)
-    G = discover_causal_dag(df_copy, alpha=alpha)
-    st.session_state.is_loading = False
-    return G
+    return Utils.convert_df_columns_snake_to_pascal_inplace(df_copy)
 
-def summarize_dag():
+def generate_dag_from_dataset(df, alpha, store=None, progress=None):
     """
-    Summarizes the given original DAG using CaGreS algorithm.
+    Generate a DAG from the provided dataset.
+    CI-test p-values don't depend on alpha: pass the PValueStore of a previous
+    run (the session's pvalue_store) so an alpha sweep only re-thresholds.
+    Touches no session state, so it can run as a background job (core.jobs).
+    Returns (dag, store).
     """
-    convert_nodes_pascal_to_snake_case_inplace(st.session_state.original_dag)
-    original_dag = st.session_state.original_dag
-    nodes_list = list(original_dag.nodes())
-    k_value = st.session_state.size_constraint
-    thr = st.session_state.semantic_threshold
+    df_copy = _prepare_discovery_frame(df)
 
-    mat = dict_of_dicts_to_numpy(colorize_nodes_by_similarity(nodes_list)[0])
-    df = pd.DataFrame(mat, index=nodes_list, columns=nodes_list)
+    fingerprint = dataset_fingerprint(df_copy)
+    if store is None or store.fingerprint != fingerprint:
+        store = PValueStore.from_dataframe(df_copy)
+    G = discover_causal_dag(df_copy, alpha=alpha, store=store, progress=progress)
+    return G, store
 
-    # Ensuring graph and df match the algorithm input asssumptions
+def generate_dag_from_stream(source, alpha, chunksize=DEFAULT_CHUNKSIZE, store=None, progress=None):
+    """
+    Generate a DAG from a dataset too large for memory (a .csv/.parquet path,
+    a CSV buffer or an iterable of DataFrames). The dataset is read chunk by
+    chunk into streaming covariance statistics and PC runs on those, so memory
+    depends on the number of columns, not rows.
+    Returns (dag, store) like generate_dag_from_dataset.
+    """
+    stats = None
+    for chunk in iter_chunks(source, chunksize):
+        chunk = _prepare_discovery_frame(chunk)
+        if stats is None:
+            stats = StreamingCovariance(chunk.columns)
+        stats.update(chunk)
+
+    if stats is None or stats.n < 4:
+        logger.warning("Not enough complete rows in the streamed dataset for causal discovery.")
+        return None, store
+    logger.info(f"Streamed {stats.n} complete rows over {len(stats.columns)} columns.")
+
+    if store is None or store.fingerprint != stats.fingerprint():
+        store = PValueStore.from_streaming_covariance(stats)
+    return discover_causal_dag_from_store(store, stats.columns, alpha=alpha, progress=progress), store
+
+def summarize_dag(original_dag, k_value, thr, progress=None, beam_width=INTERACTIVE_BEAM_WIDTH, partitioned=False):
+    """
+    Summarizes the given original DAG using CaGreS algorithm.
+    Inputs:
+      original_dag (nx.DiGraph) : The original causal DAG (not modified).
+      k_value (int)             : Size constraint, the number of summary nodes.
+      thr (float)               : Semantic threshold, 0.0 disables the similarity check.
+      progress                  : (Optional) progress(fraction, message) callback.
+      beam_width (int)          : Beam width, 1 (interactive default) is the greedy CaGreS.
+      partitioned (bool)        : Summarize partition by partition (algorithms.partition),
+                                  faster on very large DAGs but not the same summary.
+    Returns:
+      The summary DAG with display labels, or None. Touches no session state,
+      so it can run as a background job (core.jobs).
+    """
+    # Ensuring graph and df match the algorithm input asssumptions: one relabel
+    # straight to the CaGreS form, the session's DAG itself is left untouched
     G = Utils.prepare_graph_format(original_dag)
-    Utils.convert_underscores_to_asterisks_inplace(df)
+    nodes_list = list(G.nodes())
 
-    summary_dag = CaGreS(G, k_value, None if thr == 0.0 else df, thr)
-    
-    if summary_dag:
-        summary_dag = ensure_string_labels(summary_dag)
-        fix_nested_keys_in_edge_attrs(summary_dag)
+    # The similarity index is quadratic in the nodes, only build it when the threshold is used;
+    # it is kept per node set, so a threshold change reuses it and its cached results
+    index = get_semantic_index(tuple(sorted(nodes_list))) if thr != 0.0 else None
+    try:
+        df = index.value if index is not None else None
+        summary_dag = summarize_prepared_dag(G, k_value, df, thr, progress=progress, beam_width=beam_width,
+                                             partitioned=partitioned)
+    finally:
+        if index is not None:
+            index.release()
+    return to_display_summary(summary_dag) if summary_dag else None
 
-        G = Utils.convert_ast_underscore_nodes(summary_dag)
-        return G
-    return None
+
+def summarize_prepared_dag(G, k_value, similarity, thr, progress=None, beam_width=INTERACTIVE_BEAM_WIDTH, n_jobs=None,
+                           partitioned=False):
+    """
+    CaGreS summary of a DAG already in the CaGreS form (Utils.prepare_graph_format),
+    in that form too; None if it could not be summarized. With 'partitioned' the
+    DAG is summarized partition by partition in worker processes.
+    """
+    if partitioned:
+        return partitioned_CaGreS(G, k_value, similarity, thr, beam_width=beam_width, n_jobs=n_jobs,
+                                  progress=progress)
+    return beam_search_CaGreS(G, k_value, similarity, thr, beam_width=beam_width, n_jobs=n_jobs, progress=progress)
+
+
+def to_display_summary(summary_dag):
+    """A CaGreS-form summary with the display labels the rest of the app uses."""
+    summary_dag = ensure_string_labels(summary_dag)
+    return Utils.convert_ast_underscore_nodes(summary_dag)
 
 
 def to_pyvis_compatible(G: nx.DiGraph) -> nx.DiGraph:
@@ -111,7 +191,11 @@ def to_pyvis_compatible(G: nx.DiGraph) -> nx.DiGraph:
       1) String node IDs only
       2) No or minimal node/edge attributes with only string keys
     Thus PyVis can safely render it.
+    A graph that already satisfies both is returned as is.
     """
+    if _is_pyvis_compatible(G):
+        return G
+
     newG = nx.DiGraph()
 
     # 1) For each node in the old graph:
@@ -157,49 +241,10 @@ def to_pyvis_compatible(G: nx.DiGraph) -> nx.DiGraph:
 
     return newG
 
-def fix_nested_keys_in_edge_attrs(G: nx.DiGraph) -> None:
-    """
-    Modifies G in-place by finding any nested dictionary
-    inside edge attributes that has a non-string key,
-    converting that key into a string.
-
-    Example:
-      edge_data["contraction"] = {('NodeX','NodeY'): {...}}  -->  edge_data["contraction"]["NodeX,NodeY"] = {...}
-    """
-    for (u, v, attr_dict) in G.edges(data=True):
-        # We might have multiple layers of nested dicts.
-        # We'll do a small recursion or repeated scanning to fix them.
-        _fix_dict_recursively(attr_dict)
-
-def _fix_dict_recursively(d: dict) -> None:
-    """
-    Recursively replace any non-string keys in dictionary d
-    with a string. Modifies d in-place.
-    """
-    # We'll build up a list of replacements after iterating,
-    # so we don't change dict size while iterating
-    replacements = []
-
-    for key, value in list(d.items()):
-        if not isinstance(key, str):
-            # Convert the key to a string
-            if isinstance(key, tuple):
-                new_key = ",\n".join(str(x) for x in key)
-            else:
-                new_key = str(key)
-
-            replacements.append((key, new_key, value))
-
-    # Actually perform the replacements
-    for (old_key, new_key, old_value) in replacements:
-        del d[old_key]
-        d[new_key] = old_value
-
-    # Now check if any values are themselves dictionaries and recurse
-    for k, v in d.items():
-        if isinstance(v, dict):
-            _fix_dict_recursively(v)
-
+def _is_pyvis_compatible(G: nx.DiGraph) -> bool:
+    return (all(isinstance(n, str) for n in G.nodes)
+            and all(isinstance(k, str) for _, data in G.nodes(data=True) for k in data)
+            and all(isinstance(k, str) for _, _, data in G.edges(data=True) for k in data))
 
 def dict_of_dicts_to_numpy(similarity):
     # Get a stable, consistent ordering of the "outer" keys
@@ -0,0 +1,106 @@
+import re
+import threading
+import networkx as nx
+
+SNAKE = "snake"          # query_template       - CaGreS merges, summary source
+PASCAL = "pascal"        # QueryTemplate        - display, dataset columns, ATE
+ASTERISK = "asterisk"    # query*template       - CaGreS input, '_' is left to separate cluster members
+
+CLUSTER_SEPARATOR = ",\n"
+
+_SNAKE_CASE = re.compile(r'^[a-z0-9]+(?:_[a-z0-9]+)*$')
+_CAPITAL = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+def _to_snake(name: str) -> str:
+    name = name.replace("*", "_")
+    if _SNAKE_CASE.match(name):
+        return name
+    return _CAPITAL.sub('_', name).lower()
+
+
+class NodeLabelTable:
+    """
+    Interned variable names. Every variable gets one integer id the first time
+    any of its spellings is seen; the snake, Pascal and CaGreS ('*') forms are
+    derived once and every later conversion is a dict lookup.
+    Spellings that normalize to the same snake_case name share an id.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._forms = {SNAKE: [], PASCAL: [], ASTERISK: []}
+        self._clusters = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._forms[SNAKE])
+
+    def intern(self, name) -> int:
+        node_id = self._ids.get(name)
+        if node_id is not None:
+            return node_id
+        with self._lock:
+            snake = _to_snake(str(name))
+            node_id = self._ids.get(snake)
+            if node_id is None:
+                node_id = len(self)
+                forms = {
+                    SNAKE: snake,
+                    PASCAL: "".join(part.capitalize() for part in snake.split("_")),
+                    ASTERISK: snake.replace("_", "*"),
+                }
+                for form, label in forms.items():
+                    self._forms[form].append(label)
+                    self._ids.setdefault(label, node_id)
+            self._ids[name] = node_id
+        return node_id
+
+    def label(self, name, form: str = PASCAL) -> str:
+        return self._forms[form][self.intern(name)]
+
+    def labels(self, node_id: int) -> dict:
+        return {form: labels[node_id] for form, labels in self._forms.items()}
+
+    def mapping(self, nodes, form: str) -> dict:
+        """
+        node -> label in 'form', for the nodes whose label actually changes.
+        Summary nodes ('A,\nB') are relabeled member by member; non-string nodes are left alone.
+        """
+        mapping = {}
+        for n in nodes:
+            if not isinstance(n, str):
+                continue
+            if CLUSTER_SEPARATOR in n:
+                label = CLUSTER_SEPARATOR.join(self.label(m, form) for m in n.split(CLUSTER_SEPARATOR))
+            else:
+                label = self.label(n, form)
+            if label != n:
+                mapping[n] = label
+        return mapping
+
+    def cluster_label(self, name: str) -> str:
+        """CaGreS cluster name 'result*cache*hit_exec*time' -> 'ResultCacheHit,\\nExecTime'."""
+        label = self._clusters.get(name)
+        if label is None:
+            label = CLUSTER_SEPARATOR.join(self.label(part, PASCAL) for part in name.split("_"))
+            self._clusters[name] = label
+        return label
+
+
+# One table per process: variable names are shared by every session and graph.
+labels = NodeLabelTable()
+
+
+def relabel_graph(G: nx.Graph, form: str, copy: bool = True) -> nx.Graph:
+    """
+    Relabel G's nodes to 'form' through the label table. When no label changes,
+    G itself is returned (copy or not) instead of rebuilding the graph, so the
+    result may alias G: treat it as read-only and copy it before modifying it.
+    The callers only read it, or get a copy from the CaGreS merges
+    (merge_nodes, low_cost_merges) and the edit paths (edge_edit._editable).
+    """
+    mapping = labels.mapping(G.nodes, form)
+    if not mapping:
+        return G
+    return nx.relabel_nodes(G, mapping, copy=copy)
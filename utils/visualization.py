@@ -1,6 +1,7 @@
+import math
 import networkx as nx
-from pyvis.network import Network
 import logging
+from utils.graph_layout import HIDE_LABELS_NODES, BUNDLE_EDGES_EDGES, bundle_edges
 
 logger = logging.getLogger(__name__)
 
@@ -52,75 +53,152 @@ def _lighten_color(rgb_str, factor=0.4):
     nb = int(b + (255 - b)*factor)
     return f"rgb({nr},{ng},{nb})"
 
+def node_style(node_id, original_dag, color_map=None, positions=None, hide_labels=False) -> dict:
+    """vis.js attributes of one DAG node, shared by the PyVis page and the dag_view component."""
+    label = node_id if original_dag else node_id.replace('\n', '</b>,\n<b>')
+    if color_map and node_id in color_map:
+        background = _lighten_color(color_map[node_id], factor=0.4)
+    else:
+        background = "rgb(240,240,240)"
+
+    style = {
+        "shape": "circle",
+        "label": f"<b>{label}</b>",
+        "color": {
+            "border": "black",
+            "background": background,
+            "highlight": {
+                "border": "black",
+                "background": "#e5e5e5"
+            }
+        },
+        "borderWidth": 2,
+        "borderWidthSelected": 4,
+        "font": {
+            "size": 20,
+            "color": "black",
+            "face": "arial",
+            "bold": "18px",
+            "multi": True,
+        },
+    }
+
+    if positions is not None and node_id in positions:
+        style["x"], style["y"] = positions[node_id]
+        style["physics"] = False
+    if hide_labels:
+        style.update(title=node_id, label=" ", shape="dot", size=8, borderWidth=1)
+    return style
+
+def edge_style(bundle_edges=False) -> dict:
+    return {
+        "arrows": "to",
+        "color": "rgba(0,0,0,0.25)" if bundle_edges else "black",
+        "width": 0.5 if bundle_edges else 2,
+    }
+
+def junction_style(position) -> dict:
+    """vis.js attributes of a bundle junction (see utils.graph_layout.bundle_edges): a fixed, unlabelled point."""
+    return {"x": position[0], "y": position[1], "physics": False, "shape": "dot", "size": 1, "label": " ",
+            "borderWidth": 0, "color": "rgba(0,0,0,0.25)", "chosen": False}
+
+def segment_style(edges: int, arrow: bool) -> dict:
+    """vis.js attributes of a bundled edge segment, wider the more edges it carries."""
+    return {"arrows": "to" if arrow else "", "width": 0.5 + math.log2(edges), "color": "rgba(0,0,0,0.25)"}
+
+def bundled_edges(G: nx.DiGraph, positions):
+    """
+    The drawing of G's edges as bundles: (junction node id -> vis.js attributes,
+    (source, target) -> vis.js edge attributes).
+    """
+    junctions, segments = bundle_edges(G, positions)
+    return ({j: junction_style(p) for j, p in junctions.items()},
+            {pair: segment_style(edges, arrow) for pair, (edges, arrow) in segments.items()})
+
+def network_options(fixed=False, bundle_edges=False) -> dict:
+    """The vis.js options visualize_dag_with_pyvis ends up with, as a plain dict."""
+    if fixed:
+        physics = {"enabled": False}
+        smooth = {"enabled": True, "type": "cubicBezier", "forceDirection": "vertical"} if bundle_edges else {"enabled": False}
+    else:
+        physics = {
+            "enabled": True,
+            "barnesHut": {
+                "gravitationalConstant": -80000,
+                "centralGravity": 0.0,
+                "springLength": 200,
+                "springConstant": 0.05,
+                "damping": 0.09,
+                "avoidOverlap": 0,
+            },
+            "stabilization": {"enabled": True, "fit": True, "iterations": 1000, "updateInterval": 50},
+        }
+        smooth = {"enabled": True, "type": "dynamic"}
+    return {
+        "edges": {"color": {"inherit": True}, "smooth": smooth, **edge_style(bundle_edges)},
+        "interaction": {"dragNodes": True, "hideEdgesOnDrag": False, "hideNodesOnDrag": False},
+        "physics": physics,
+    }
+
 def visualize_dag_with_pyvis(G: nx.DiGraph,
                              original_dag,
                              color_map=None,
                              height="700px",
-                             width="100%"):
+                             width="100%",
+                             positions=None):
     """
     Visualize a NetworkX DiGraph using PyVis, filling the column width (width="100%").
     We'll keep a fixed height for the net, but let it stretch horizontally.
+
+    With 'positions' (node -> (x, y), see utils.graph_layout) the graph is drawn
+    at fixed coordinates with physics off, and level-of-detail rules apply:
+    labels become hover tooltips above HIDE_LABELS_NODES nodes, and edges are
+    bundled (utils.graph_layout.bundle_edges) above BUNDLE_EDGES_EDGES edges.
     """
     try:
+        from pyvis.network import Network  # only this standalone HTML export still needs PyVis
+
         logger.debug("Initializing PyVis network (directed).")
         net = Network(height=height, width=width, directed=True, notebook=False)
         H = G.copy()
         net.from_nx(H)
+        fixed = positions is not None
+        hide_labels = fixed and len(net.nodes) > HIDE_LABELS_NODES
+        bundle_edges = fixed and len(net.edges) > BUNDLE_EDGES_EDGES
 
         # Style nodes
         for node in net.nodes:
-            node["shape"] = "circle"
-            node_id = node["id"]
-
-            if not original_dag:
-                node_id = node_id.replace('\n', '</b>,\n<b>')
-            node["label"] = f"<b>{node_id}</b>"
-            
-
-            if color_map and node["id"] in color_map:
-                base_color = color_map[node["id"]]
-                lighter = _lighten_color(base_color, factor=0.4)
-                node["color"] = {
-                    "border": "black",
-                    "background": lighter,
-                    "highlight": {
-                        "border": "black",
-                        "background": "#e5e5e5"
-                    }
-                }
+            node.update(node_style(node["id"], original_dag, color_map, positions, hide_labels))
+
+        # Style edges; bundled, they are replaced by the bundles' segments
+        if bundle_edges:
+            junctions, segments = bundled_edges(G, positions)
+            net.edges = []
+            for junction, style in junctions.items():
+                net.add_node(junction, **style)
+            for (u, v), style in segments.items():
+                net.add_edge(u, v, **style)
+        else:
+            for edge in net.edges:
+                edge.update(edge_style(bundle_edges))
+
+        if fixed:
+            # Server-side layout: the browser only draws
+            net.toggle_physics(False)
+            if bundle_edges:
+                net.set_edge_smooth("cubicBezier")
+                net.options.edges.smooth.forceDirection = "vertical"
             else:
-                node["color"] = {
-                    "border": "black",
-                    "background": "rgb(240,240,240)",
-                    "highlight": {
-                        "border": "black",
-                        "background": "#e5e5e5"
-                    }
-                }
-            node["borderWidth"] = 2
-            node["borderWidthSelected"] = 4
-            node["font"] = {
-                "size": 20,
-                "color": "black",
-                "face": "arial",
-                "bold": "18px",
-                "multi": True,
-            }
-
-        # Style edges
-        for edge in net.edges:
-            edge["arrows"] = "to"
-            edge["color"] = "black"
-            edge["width"] = 2
-
-        # Barnes-Hut layout
-        net.barnes_hut(
-            central_gravity=0.0,
-            spring_length=200,
-            spring_strength=0.05,
-            damping=0.09,
-            overlap=0
-        )
+                net.options.edges.smooth.enabled = False
+        else:
+            # Barnes-Hut layout
+            net.barnes_hut(
+                central_gravity=0.0,
+                spring_length=200,
+                spring_strength=0.05,
+                damping=0.09,
+                overlap=0
+            )
 
         #net.toggle_physics(False)
         #net.set_edge_smooth('diagonalCross')